@@ -0,0 +1,98 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional: brotli is used when installed, gzip otherwise
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = 1000
+BROTLI_QUALITY = 4  # fast enough per request, still well ahead of gzip on JSON
+
+
+class CompressionMiddleware:
+    # Brotli for clients that accept it (when the brotli package is installed),
+    # Starlette's gzip otherwise. SSE and already-encoded responses pass through.
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and brotli is not None:
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            if "br" in [e.split(";")[0].strip() for e in accept.split(",")]:
+                responder = _BrotliResponder(self.app, self.minimum_size)
+                await responder(scope, receive, send)
+                return
+        await self.gzip(scope, receive, send)
+
+
+class _BrotliResponder:
+    def __init__(self, app: ASGIApp, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.send: Send = _unattached_send
+        self.start: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_brotli)
+
+    async def send_with_brotli(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # held until the first body chunk says whether to compress
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").split(";")[0].strip()
+            self.passthrough = (
+                "content-encoding" in headers
+                or content_type in DEFAULT_EXCLUDED_CONTENT_TYPES
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = brotli.compress(body, quality=BROTLI_QUALITY)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            # streamed body: compress chunk by chunk, flushing each one
+            del headers["Content-Length"]
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            await self.send(start)
+
+        chunk = self.compressor.process(body) + self.compressor.flush()
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+
+async def _unattached_send(message: Message) -> None:
+    raise RuntimeError("send awaitable not set")
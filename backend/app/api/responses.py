@@ -0,0 +1,41 @@
+from typing import Any
+
+import orjson
+from fastapi import Request, Response
+
+# Stored documents are already JSON-shaped, so they skip pydantic validation and
+# go straight to orjson. ETags let repeat views (polling, re-opening a result)
+# end with a 304 before anything is read or serialized.
+
+CACHE_CONTROL = "no-cache"  # always revalidate; the ETag makes that cheap
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison: W/"x" and "x" match
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def json_response(
+    content: Any, status_code: int = 200, etag: str | None = None
+) -> Response:
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if etag is not None:
+        headers["ETag"] = etag
+    return Response(
+        orjson.dumps(content),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -1,18 +1,37 @@
-from fastapi import APIRouter, Request, HTTPException, Response
-from app.db.deps import (
-    get_requests_collection,
-    get_agent_runs_collection,
-    get_results_collection,
-)
-from app.db.repos import RequestsRepo, AgentRunsRepo, ResultsRepo
-from app.graph.runner import GraphRunner
+import json
+from functools import partial
+from typing import Annotated, Any, AsyncIterator, Iterator, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Query, Request, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
 from app.models.schemas import (
+    AgentRunsResponse,
+    ExportFormat,
+    ExportHorizon,
+    ExportRequest,
     HealthCheckResponse,
+    JobStatus,
+    LearningPathsBatchRequest,
+    LearningPathsBatchResponse,
+    LearningPathsJobResponse,
     LearningPathsRequest,
     LearningPathsResponse,
+    RequestHistoryPage,
+)
+from app.api.responses import etag_matches, json_response, not_modified
+from app.services.admission import AdmissionController, Overloaded, Ticket
+from app.services.exports import HORIZONS, MEDIA_TYPES
+from app.services.history import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, InvalidCursor
+from app.services.learning_paths import (
+    AsyncLearningPathsService,
+    LearningPathsService,
+    StreamEvent,
+    job_etag,
 )
-from app.services.learning_paths import LearningPathsService
-from app.graph.deps import GraphDeps
 
 router = APIRouter(prefix="/api")
 
@@ -23,27 +42,290 @@ def health_check() -> HealthCheckResponse:
     return empty_response
 
 
-@router.post("/learning-paths")
-def generate_learning_paths(
-    request: Request, payload: LearningPathsRequest
-) -> LearningPathsResponse:
-    requests_repo = RequestsRepo(get_requests_collection(request))
-    agent_runs_repo = AgentRunsRepo(get_agent_runs_collection(request))
-    results_repo = ResultsRepo(get_results_collection(request))
-
-    openai_client = request.app.state.openai_client
-    tavily_client = request.app.state.tavily_client
-
-    deps = GraphDeps(openai_client=openai_client, tavily_client=tavily_client)
-
-    runner = GraphRunner(agent_runs_repo=agent_runs_repo, deps=deps)
-    service = LearningPathsService(
-        requests_repo=requests_repo,
-        agent_runs_repo=agent_runs_repo,
-        results_repo=results_repo,
-        runner=runner,
+def _learning_paths_service(request: Request) -> LearningPathsService:
+    # built once in lifespan (app.core.runtime)
+    return request.app.state.runtime.service
+
+
+def _async_learning_paths_service(request: Request) -> AsyncLearningPathsService:
+    return request.app.state.runtime.async_service
+
+
+def _wants_job(request: Request) -> bool:
+    # JOB_MODE=1 for every request, or per request with "Prefer: respond-async"
+    prefer = request.headers.get("prefer") or ""
+    return request.app.state.job_mode or "respond-async" in prefer.lower()
+
+
+def _admission(request: Request) -> AdmissionController:
+    return request.app.state.admission
+
+
+def _client_key(request: Request) -> str:
+    # fair-queuing key: X-Client-Key (set by the gateway), else the peer address
+    key = request.headers.get("x-client-key")
+    if key:
+        return key.strip()[:128]
+    return request.client.host if request.client else "unknown"
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"Server busy ({e.reason}), retry later",
+        headers={"Retry-After": str(e.retry_after_s)},
+    )
+
+
+async def _submit_job(
+    request: Request, payload: LearningPathsRequest, response: Response
+) -> LearningPathsJobResponse:
+    # the queue place is reserved first: an overloaded instance answers 429 / 503
+    # instead of accepting a job it cannot start soon
+    admission = _admission(request)
+    ticket = admission.ticket(_client_key(request))
+    # the running request doc is written before answering, so polling never 404s
+    jobs = request.app.state.jobs
+    try:
+        if request.app.state.async_pipeline:
+            service = _async_learning_paths_service(request)
+            request_id, graph_payload = await service.submit(payload)
+            run = service.run
+        else:
+            service = _learning_paths_service(request)
+            request_id, graph_payload = await run_in_threadpool(service.submit, payload)
+            run = partial(jobs.run_in_pool, service.run)
+    except BaseException:
+        admission.release(ticket)
+        raise
+    # job mode: the 202 is already sent, so a job waits for its turn untimed
+    jobs.spawn(
+        run,
+        request_id,
+        graph_payload,
+        gate=admission.admitted(ticket, timeout=None),
     )
+
+    response.status_code = 202
+    response.headers["Location"] = f"{router.prefix}/learning-paths/{request_id}"
+    return LearningPathsJobResponse(request_id=request_id, status="running")
+
+
+@router.post(
+    "/learning-paths",
+    responses={202: {"model": LearningPathsJobResponse}},
+)
+async def generate_learning_paths(
+    request: Request, payload: LearningPathsRequest, response: Response
+) -> LearningPathsResponse | LearningPathsJobResponse:
+    try:
+        if _wants_job(request):
+            return await _submit_job(request, payload, response)
+        async with _admission(request).slot(_client_key(request)):
+            if request.app.state.async_pipeline:
+                service = _async_learning_paths_service(request)
+                return await service.generate(payload)
+            # blocking clients: keep the event loop free
+            service = _learning_paths_service(request)
+            return await run_in_threadpool(service.generate, payload)
+    except Overloaded as e:
+        raise _overloaded(e)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Processing failed")
+
+
+@router.post("/learning-paths/batch")
+async def generate_learning_paths_batch(
+    request: Request, payload: LearningPathsBatchRequest
+) -> LearningPathsBatchResponse:
+    # items share searches, page extracts and LLM calls; per-item failures are
+    # reported in the item, so only a broken batch is a 500
+    batch = request.app.state.runtime.batch
     try:
-        return service.generate(payload)
+        # queued as heavy as its items, and holds a running slot per item it
+        # runs at once
+        async with _admission(request).slot(
+            _client_key(request),
+            cost=len(payload.items),
+            slots=min(len(payload.items), batch.max_concurrency),
+        ):
+            return await run_in_threadpool(batch.generate, payload)
+    except Overloaded as e:
+        raise _overloaded(e)
     except Exception:
         raise HTTPException(status_code=500, detail="Processing failed")
+
+
+@router.get("/admission")
+def admission_status(request: Request) -> dict[str, Any]:
+    # queue depth / wait times of this instance, for autoscaling and dashboards
+    return _admission(request).snapshot()
+
+
+@router.get("/internal/mongo")
+def mongo_metrics(request: Request) -> dict[str, Any]:
+    # per-client command latency and pool checkout / saturation, for pool sizing
+    return {
+        name: metrics.snapshot()
+        for name, metrics in request.app.state.mongo_metrics.items()
+    }
+
+
+async def _call_service(request: Request, method: str, *args: Any) -> Any:
+    # async service when ASYNC_PIPELINE=1, else the sync one off the event loop
+    if request.app.state.async_pipeline:
+        return await getattr(_async_learning_paths_service(request), method)(*args)
+    service = _learning_paths_service(request)
+    return await run_in_threadpool(getattr(service, method), *args)
+
+
+@router.get("/learning-paths/{request_id}", response_model=LearningPathsJobResponse)
+async def get_learning_paths(request: Request, request_id: UUID) -> Response:
+    try:
+        request_doc = await _call_service(request, "get_request", str(request_id))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Lookup failed")
+    if request_doc is None:
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    # the ETag comes from the requests doc alone: a 304 skips the results read
+    etag = job_etag(request_doc)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        payload = await _call_service(request, "job_payload", request_doc)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Lookup failed")
+    return json_response(payload, etag=etag)
+
+
+async def _call_history(request: Request, method: str, *args: Any) -> Any:
+    runtime = request.app.state.runtime
+    if request.app.state.async_pipeline:
+        return await getattr(runtime.async_history, method)(*args)
+    return await run_in_threadpool(getattr(runtime.history, method), *args)
+
+
+@router.get("/requests")
+async def list_requests(
+    request: Request,
+    status: Optional[JobStatus] = None,
+    fingerprint: Annotated[Optional[str], Query(max_length=128)] = None,
+    cursor: Annotated[Optional[str], Query(max_length=512)] = None,
+    limit: Annotated[int, Query(ge=1, le=HISTORY_MAX_PAGE_SIZE)] = HISTORY_PAGE_SIZE,
+) -> RequestHistoryPage:
+    # newest first; ?cursor=<next_cursor of the previous page> continues the list
+    try:
+        return await _call_history(request, "page", status, fingerprint, cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception:
+        raise HTTPException(status_code=500, detail="Lookup failed")
+
+
+@router.get("/requests/{request_id}/runs")
+async def get_request_runs(request: Request, request_id: UUID) -> AgentRunsResponse:
+    try:
+        runs = await _call_history(request, "runs", str(request_id))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Lookup failed")
+    if runs is None:
+        raise HTTPException(status_code=404, detail="Request not found")
+    return runs
+
+
+def _sse(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_stream(events: Iterator[StreamEvent]) -> Iterator[str]:
+    # sync service: iterated in the threadpool (iterate_in_threadpool)
+    for kind, data in events:
+        yield _sse(kind, data)
+
+
+async def _sse_stream_async(events: AsyncIterator[StreamEvent]) -> AsyncIterator[str]:
+    async for kind, data in events:
+        yield _sse(kind, data)
+
+
+async def _released_after(
+    body: AsyncIterator[str], admission: AdmissionController, ticket: Ticket
+) -> AsyncIterator[str]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        admission.release(ticket)
+
+
+@router.post("/learning-paths/stream")
+async def stream_learning_paths(
+    request: Request, payload: LearningPathsRequest
+) -> StreamingResponse:
+    # Server-Sent Events: "started", "node" after each graph node, "program" per
+    # extracted program, then "results" (same body as POST /learning-paths) or
+    # "error". Failures after the first event are reported in-stream.
+    admission = _admission(request)
+    try:
+        # admitted before the response starts, so overload is a real 429 / 503
+        ticket = admission.ticket(_client_key(request))
+        await admission.wait(ticket)
+    except Overloaded as e:
+        raise _overloaded(e)
+    if request.app.state.async_pipeline:
+        service = _async_learning_paths_service(request)
+        body = _sse_stream_async(service.stream(payload))
+    else:
+        service = _learning_paths_service(request)
+        body = iterate_in_threadpool(_sse_stream(service.stream(payload)))
+    return StreamingResponse(
+        # the slot is held until the stream ends; release is idempotent, the
+        # background task covers a client gone before the body started
+        _released_after(body, admission, ticket),
+        media_type="text/event-stream",
+        # proxies (nginx) must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(admission.release, ticket),
+    )
+
+
+def _export_response(
+    request: Request, request_ids: List[UUID], horizon: str, fmt: str
+) -> StreamingResponse:
+    # streamed straight from a results cursor; ids without a stored result are
+    # skipped. The sync iterator is consumed in the threadpool by Starlette.
+    ids = list(dict.fromkeys(str(i) for i in request_ids))
+    horizons = HORIZONS if horizon == "all" else [horizon]
+    runtime = request.app.state.runtime
+    if request.app.state.async_pipeline:
+        body = runtime.async_exports.export(ids, horizons, fmt)
+    else:
+        body = runtime.exports.export(ids, horizons, fmt)
+    filename = f"learning-paths-{horizon}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/exports")
+async def export_learning_paths(
+    request: Request,
+    request_id: Annotated[List[UUID], Query(min_length=1, max_length=100)],
+    horizon: ExportHorizon = "all",
+    format: ExportFormat = "csv",
+) -> StreamingResponse:
+    # ?request_id=<id>&request_id=<id>&horizon=short_term&format=ndjson
+    return _export_response(request, request_id, horizon, format)
+
+
+@router.post("/exports")
+async def export_learning_paths_bulk(
+    request: Request, payload: ExportRequest
+) -> StreamingResponse:
+    # same export for id lists too long for a query string
+    return _export_response(
+        request, payload.request_ids, payload.horizon, payload.format
+    )
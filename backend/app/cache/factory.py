@@ -0,0 +1,53 @@
+from pymongo.database import Database
+
+from app.cache.memory import MemoryCache
+from app.cache.tiered import TieredCache
+from app.core.env import env_bool, env_float, env_int
+from app.db.mongo import (
+    LLM_CACHE_COLLECTION,
+    PAGE_CACHE_COLLECTION,
+    SEARCH_CACHE_COLLECTION,
+)
+from app.db.repos import CacheRepo
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def make_llm_cache(db: Database) -> TieredCache:
+    ttl = env_float("LLM_CACHE_TTL_SECONDS", 7 * DAY_SECONDS)
+    memory = MemoryCache(
+        max_entries=env_int("LLM_CACHE_MAX_ENTRIES", 2000), ttl_seconds=ttl
+    )
+    store = (
+        CacheRepo(db[LLM_CACHE_COLLECTION])
+        if env_bool("LLM_CACHE_SHARED", True)
+        else None
+    )
+    return TieredCache(memory=memory, store=store)
+
+
+def make_search_cache(db: Database) -> TieredCache:
+    ttl = env_float("SEARCH_CACHE_TTL_SECONDS", 60 * 60)
+    memory = MemoryCache(
+        max_entries=env_int("SEARCH_CACHE_MAX_ENTRIES", 500), ttl_seconds=ttl
+    )
+    store = (
+        CacheRepo(db[SEARCH_CACHE_COLLECTION])
+        if env_bool("SEARCH_CACHE_SHARED", False)
+        else None
+    )
+    return TieredCache(memory=memory, store=store)
+
+
+def make_page_cache(db: Database) -> TieredCache:
+    # page texts are stored zlib-compressed, so entries stay a few KB each
+    ttl = env_float("PAGE_CACHE_TTL_SECONDS", 6 * 60 * 60)
+    memory = MemoryCache(
+        max_entries=env_int("PAGE_CACHE_MAX_ENTRIES", 500), ttl_seconds=ttl
+    )
+    store = (
+        CacheRepo(db[PAGE_CACHE_COLLECTION])
+        if env_bool("PAGE_CACHE_SHARED", True)
+        else None
+    )
+    return TieredCache(memory=memory, store=store)
@@ -0,0 +1,61 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.cache.memory import MemoryCache
+from app.db.protocols import CacheRepoProtocol
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TieredCache:
+    # L1: process memory, L2 (optional): shared Mongo collection.
+    # Store failures are logged and treated as misses, never raised to callers.
+    memory: MemoryCache
+    store: Optional[CacheRepoProtocol] = None
+
+    def get(self, key: str) -> Any | None:
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        self.set_many({key: value}, ttl_seconds=ttl_seconds)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        found: dict[str, Any] = {}
+        missing: list[str] = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing and self.store is not None:
+            try:
+                from_store = self.store.get_many(missing)
+            except Exception:
+                logger.warning(
+                    "cache_store_get_failed. keys=%d", len(missing), exc_info=True
+                )
+                from_store = {}
+            for key, (value, ttl_left) in from_store.items():
+                self.memory.set(key, value, ttl_seconds=ttl_left)
+                found[key] = value
+
+        return found
+
+    def set_many(self, items: dict[str, Any], ttl_seconds: float | None = None) -> None:
+        if not items:
+            return
+        ttl = self.memory.ttl_seconds if ttl_seconds is None else ttl_seconds
+        for key, value in items.items():
+            self.memory.set(key, value, ttl_seconds=ttl)
+
+        if self.store is not None:
+            try:
+                self.store.set_many(items, ttl_seconds=ttl)
+            except Exception:
+                logger.warning(
+                    "cache_store_set_failed. keys=%d", len(items), exc_info=True
+                )
@@ -12,3 +12,30 @@ def validate_env() -> None:
     missing = [k for k in REQUIRED_ENV_VARS if not os.getenv(k)]
     if missing:
         raise RuntimeError(f"Missing required env vars: {', '.join(missing)}")
+
+
+def env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError as e:
+        raise RuntimeError(f"Env var {name} must be an integer (got '{raw}')") from e
+
+
+def env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError as e:
+        raise RuntimeError(f"Env var {name} must be a number (got '{raw}')") from e
+
+
+def env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
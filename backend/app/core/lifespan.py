@@ -1,32 +1,216 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from openai import OpenAI
-from tavily import TavilyClient
+from openai import AsyncOpenAI, OpenAI
+from tavily import AsyncTavilyClient, TavilyClient
+import asyncio
 import os
-from app.external.mocks import make_mock_tavily_client, make_mock_openai_client
-from app.core.env import validate_env
-from app.db.mongo import connect_mongo, disconnect_mongo, get_db_name, init_db
+from app.cache.factory import make_llm_cache, make_page_cache, make_search_cache
+from app.external.mocks import (
+    make_mock_async_openai_client,
+    make_mock_async_tavily_client,
+    make_mock_tavily_client,
+    make_mock_openai_client,
+)
+from app.core.env import env_bool, env_float, env_int, validate_env
+from app.core.runtime import (
+    Runtime,
+    build_async_export_service,
+    build_async_history_service,
+    build_async_learning_paths_service,
+    build_export_service,
+    build_history_service,
+    build_learning_paths_service,
+)
+from app.graph.deps import AsyncGraphDeps, GraphDeps
+from app.services.admission import (
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_CLIENT_QUEUE,
+    ADMISSION_MAX_RUNNING,
+    ADMISSION_MAX_WAIT_SECONDS,
+    AdmissionController,
+    parse_weights,
+)
+from app.services.batch import BATCH_MAX_CONCURRENCY, LearningPathsBatchService
+from app.services.coalescing import make_async_coalescer, make_coalescer
+from app.graph.domains import make_domain_policy
+from app.graph.ratelimit import make_rate_limiter
+from app.db.monitoring import make_mongo_metrics
+from app.db.retention import ARCHIVE_INTERVAL_SECONDS, init_retention, run_archiver
+from app.db.writers import make_agent_runs_writer, make_async_agent_runs_writer
+from app.db.mongo import (
+    connect_async_mongo,
+    connect_mongo,
+    disconnect_async_mongo,
+    disconnect_mongo,
+    get_db_name,
+    init_db,
+)
+from app.services.learning_paths import RESULT_REUSE_MAX_AGE_SECONDS
+from app.services.jobs import JOB_SHUTDOWN_GRACE_SECONDS, JOB_WORKERS, BackgroundJobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     validate_env()
     # Startup
-    mongo_client = connect_mongo()
+    # per-client command latency / pool checkout metrics (GET /api/internal/mongo)
+    app.state.mongo_metrics = {"sync": make_mongo_metrics()}
+    mongo_client = connect_mongo(app.state.mongo_metrics["sync"])
     app.state.mongo_client = mongo_client
     db_name = get_db_name()
-    init_db(mongo_client[db_name])
+    db = mongo_client[db_name]
+    init_db(db)
+    # TTL indexes per collection; expired documents are archived first if
+    # ARCHIVE_DIR is set
+    archiver = init_retention(db)
+    archive_task = None
+    if archiver is not None:
+        archive_task = asyncio.create_task(
+            run_archiver(
+                archiver,
+                env_float("ARCHIVE_INTERVAL_SECONDS", ARCHIVE_INTERVAL_SECONDS),
+            )
+        )
+
+    # process-wide caches, shared by every request on this instance
+    app.state.llm_cache = make_llm_cache(db)
+    app.state.search_cache = make_search_cache(db)
+    app.state.page_cache = make_page_cache(db)
+    # per-host yield stats + allow / deny list used when selecting URLs to extract
+    app.state.domain_policy = make_domain_policy(db)
+
+    # OpenAI / Tavily quotas and retries, shared by the sync and async graphs; the
+    # OpenAI SDK's own retries are turned off so backoff happens in one place
+    app.state.rate_limiter = make_rate_limiter()
+    openai_retries = {} if app.state.rate_limiter is None else {"max_retries": 0}
 
     mock_external = os.getenv("MOCK_EXTERNAL", "0") == "1"
     if mock_external:
         app.state.openai_client = make_mock_openai_client()
         app.state.tavily_client = make_mock_tavily_client()
     else:
-        app.state.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        app.state.openai_client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"), **openai_retries
+        )
         app.state.tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
 
+    # asyncio end-to-end: async route, AsyncOpenAI, AsyncTavilyClient, AsyncMongoClient
+    app.state.async_pipeline = env_bool("ASYNC_PIPELINE", False)
+    async_mongo_client = None
+    if app.state.async_pipeline:
+        app.state.mongo_metrics["async"] = make_mongo_metrics()
+        async_mongo_client = await connect_async_mongo(app.state.mongo_metrics["async"])
+        app.state.async_mongo_client = async_mongo_client
+        if mock_external:
+            app.state.async_openai_client = make_mock_async_openai_client()
+            app.state.async_tavily_client = make_mock_async_tavily_client()
+        else:
+            app.state.async_openai_client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), **openai_retries
+            )
+            app.state.async_tavily_client = AsyncTavilyClient(
+                api_key=os.getenv("TAVILY_API_KEY")
+            )
+
+    # a completed result for the same normalized request is served this long
+    result_max_age_s = env_float(
+        "RESULT_REUSE_MAX_AGE_SECONDS", RESULT_REUSE_MAX_AGE_SECONDS
+    )
+
+    # blocking / streamed / batch requests write their requests doc once, at the end
+    consolidated_writes = env_bool("CONSOLIDATED_WRITES", False)
+
+    # agent_runs are buffered and written in batches off the request path
+    agent_runs_writer = make_agent_runs_writer(db)
+    async_agent_runs_writer = None
+    if app.state.async_pipeline:
+        async_agent_runs_writer = make_async_agent_runs_writer(
+            async_mongo_client[db_name]
+        )
+
+    # repos, deps and the compiled graph are built once and shared by all requests
+    deps = GraphDeps(
+        openai_client=app.state.openai_client,
+        tavily_client=app.state.tavily_client,
+        llm_cache=app.state.llm_cache,
+        search_cache=app.state.search_cache,
+        page_cache=app.state.page_cache,
+        domain_policy=app.state.domain_policy,
+        rate_limiter=app.state.rate_limiter,
+    )
+    service = build_learning_paths_service(
+        db,
+        deps,
+        # identical concurrent requests share one graph run
+        coalescer=make_coalescer(db),
+        result_max_age_s=result_max_age_s,
+        agent_runs_writer=agent_runs_writer,
+        consolidated_writes=consolidated_writes,
+    )
+    app.state.runtime = Runtime(
+        service=service,
+        # batches get their own graph over batch-scoped (deduplicating) clients
+        batch=LearningPathsBatchService(
+            service=service,
+            deps=deps,
+            max_concurrency=env_int("BATCH_MAX_CONCURRENCY", BATCH_MAX_CONCURRENCY),
+        ),
+        exports=build_export_service(db),
+        history=build_history_service(db),
+    )
+    if app.state.async_pipeline:
+        app.state.runtime.async_service = build_async_learning_paths_service(
+            async_mongo_client[db_name],
+            AsyncGraphDeps(
+                openai_client=app.state.async_openai_client,
+                tavily_client=app.state.async_tavily_client,
+                llm_cache=app.state.llm_cache,
+                search_cache=app.state.search_cache,
+                page_cache=app.state.page_cache,
+                domain_policy=app.state.domain_policy,
+                rate_limiter=app.state.rate_limiter,
+            ),
+            coalescer=make_async_coalescer(async_mongo_client[db_name]),
+            result_max_age_s=result_max_age_s,
+            agent_runs_writer=async_agent_runs_writer,
+            consolidated_writes=consolidated_writes,
+        )
+        app.state.runtime.async_exports = build_async_export_service(
+            async_mongo_client[db_name]
+        )
+        app.state.runtime.async_history = build_async_history_service(
+            async_mongo_client[db_name]
+        )
+
+    # every graph run waits for a slot here; overload answers 429 / 503
+    app.state.admission = AdmissionController(
+        max_running=env_int("ADMISSION_MAX_RUNNING", ADMISSION_MAX_RUNNING),
+        max_queue=env_int("ADMISSION_MAX_QUEUE", ADMISSION_MAX_QUEUE),
+        max_queued_per_client=env_int(
+            "ADMISSION_CLIENT_QUEUE", ADMISSION_CLIENT_QUEUE
+        ),
+        max_wait_s=env_float("ADMISSION_MAX_WAIT_SECONDS", ADMISSION_MAX_WAIT_SECONDS),
+        weights=parse_weights(os.getenv("ADMISSION_CLIENT_WEIGHTS")),
+    )
+
+    # job mode: POST answers 202 and the graph runs on this executor
+    app.state.job_mode = env_bool("JOB_MODE", False)
+    app.state.jobs = BackgroundJobs(max_workers=env_int("JOB_WORKERS", JOB_WORKERS))
+
     try:
         yield
     finally:
         # Shutdown
+        if archive_task is not None:
+            archive_task.cancel()
+        await app.state.jobs.shutdown(
+            env_float("JOB_SHUTDOWN_GRACE_SECONDS", JOB_SHUTDOWN_GRACE_SECONDS)
+        )
+        # after the jobs, so their last agent_runs are written too
+        if agent_runs_writer is not None:
+            await asyncio.to_thread(agent_runs_writer.close)
+        if async_agent_runs_writer is not None:
+            await async_agent_runs_writer.aclose()
+        if async_mongo_client is not None:
+            await disconnect_async_mongo(async_mongo_client)
         disconnect_mongo(mongo_client)
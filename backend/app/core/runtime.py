@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+from app.db.async_repos import AsyncAgentRunsRepo, AsyncRequestsRepo, AsyncResultsRepo
+from app.db.mongo import AGENT_RUNS_COLLECTION, REQUESTS_COLLECTION, RESULTS_COLLECTION
+from app.db.protocols import AgentRunsRepoProtocol, AsyncAgentRunsRepoProtocol
+from app.db.repos import AgentRunsRepo, RequestsRepo, ResultsRepo
+from app.graph.deps import AsyncGraphDeps, GraphDeps
+from app.graph.runner import AsyncGraphRunner, GraphRunner
+from app.services.batch import LearningPathsBatchService
+from app.services.coalescing import AsyncRequestCoalescer, RequestCoalescer
+from app.services.exports import AsyncExportService, ExportService
+from app.services.history import AsyncRequestHistoryService, RequestHistoryService
+from app.services.learning_paths import (
+    AsyncLearningPathsService,
+    LearningPathsService,
+)
+
+# Everything a request needs is assembled once in lifespan and shared: repos wrap
+# thread-safe pymongo collections, and a compiled graph without a checkpointer
+# keeps no per-run state, so one instance serves concurrent requests.
+
+
+@dataclass
+class Runtime:
+    service: LearningPathsService
+    async_service: Optional[AsyncLearningPathsService] = None
+    batch: Optional[LearningPathsBatchService] = None
+    exports: Optional[ExportService] = None
+    async_exports: Optional[AsyncExportService] = None
+    history: Optional[RequestHistoryService] = None
+    async_history: Optional[AsyncRequestHistoryService] = None
+
+
+def build_learning_paths_service(
+    db: Database,
+    deps: GraphDeps,
+    coalescer: Optional[RequestCoalescer] = None,
+    result_max_age_s: float = 0.0,
+    agent_runs_writer: Optional[AgentRunsRepoProtocol] = None,
+    consolidated_writes: bool = False,
+) -> LearningPathsService:
+    # agent_runs_writer: a buffered writer, else one insert per node
+    agent_runs_repo = agent_runs_writer or AgentRunsRepo(db[AGENT_RUNS_COLLECTION])
+    return LearningPathsService(
+        requests_repo=RequestsRepo(db[REQUESTS_COLLECTION]),
+        agent_runs_repo=agent_runs_repo,
+        results_repo=ResultsRepo(db[RESULTS_COLLECTION]),
+        runner=GraphRunner(agent_runs_repo=agent_runs_repo, deps=deps),
+        coalescer=coalescer,
+        result_max_age_s=result_max_age_s,
+        consolidated_writes=consolidated_writes,
+    )
+
+
+def build_async_learning_paths_service(
+    db: AsyncDatabase,
+    deps: AsyncGraphDeps,
+    coalescer: Optional[AsyncRequestCoalescer] = None,
+    result_max_age_s: float = 0.0,
+    agent_runs_writer: Optional[AsyncAgentRunsRepoProtocol] = None,
+    consolidated_writes: bool = False,
+) -> AsyncLearningPathsService:
+    agent_runs_repo = agent_runs_writer or AsyncAgentRunsRepo(db[AGENT_RUNS_COLLECTION])
+    return AsyncLearningPathsService(
+        requests_repo=AsyncRequestsRepo(db[REQUESTS_COLLECTION]),
+        agent_runs_repo=agent_runs_repo,
+        results_repo=AsyncResultsRepo(db[RESULTS_COLLECTION]),
+        runner=AsyncGraphRunner(agent_runs_repo=agent_runs_repo, deps=deps),
+        coalescer=coalescer,
+        result_max_age_s=result_max_age_s,
+        consolidated_writes=consolidated_writes,
+    )
+
+
+def build_export_service(db: Database) -> ExportService:
+    return ExportService(results_repo=ResultsRepo(db[RESULTS_COLLECTION]))
+
+
+def build_async_export_service(db: AsyncDatabase) -> AsyncExportService:
+    return AsyncExportService(results_repo=AsyncResultsRepo(db[RESULTS_COLLECTION]))
+
+
+def build_history_service(db: Database) -> RequestHistoryService:
+    return RequestHistoryService(
+        requests_repo=RequestsRepo(db[REQUESTS_COLLECTION]),
+        agent_runs_repo=AgentRunsRepo(db[AGENT_RUNS_COLLECTION]),
+    )
+
+
+def build_async_history_service(db: AsyncDatabase) -> AsyncRequestHistoryService:
+    return AsyncRequestHistoryService(
+        requests_repo=AsyncRequestsRepo(db[REQUESTS_COLLECTION]),
+        agent_runs_repo=AsyncAgentRunsRepo(db[AGENT_RUNS_COLLECTION]),
+    )
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import DuplicateKeyError
+
+from app.db.models import RequestDoc, AgentRunDoc, Paths
+from app.db.repos import (
+    EXPORT_CURSOR_BATCH_SIZE,
+    EXPORT_IDS_PER_QUERY,
+    HISTORY_PROJECTION,
+    HISTORY_SORT,
+    LEASE_ACQUIRE_ATTEMPTS,
+    export_query,
+    history_query,
+    lease_claim,
+    result_fields,
+)
+
+
+@dataclass
+class AsyncRequestsRepo:
+    col: AsyncCollection
+
+    async def create_running(self, doc: RequestDoc) -> None:
+        await self.col.insert_one(doc.model_dump())
+
+    async def mark_completed(
+        self,
+        request_id: str,
+        usage: dict[str, Any] | None = None,
+        reused_from: str | None = None,
+    ) -> None:
+        await self.col.update_one(
+            {"request_id": request_id},
+            {
+                "$set": {
+                    "status": "completed",
+                    "usage": usage,
+                    "reused_from": reused_from,
+                }
+            },
+        )
+
+    async def mark_failed(self, request_id: str, error: str) -> None:
+        await self.col.update_one(
+            {"request_id": request_id}, {"$set": {"status": "failed", "error": error}}
+        )
+
+    async def finish(self, doc: RequestDoc) -> None:
+        await self.col.update_one(
+            {"request_id": doc.request_id}, {"$set": doc.model_dump()}, upsert=True
+        )
+
+    async def get(self, request_id: str) -> dict[str, Any] | None:
+        return await self.col.find_one({"request_id": request_id}, {"_id": 0})
+
+    async def find_completed(
+        self, fingerprint: str, since: datetime
+    ) -> dict[str, Any] | None:
+        return await self.col.find_one(
+            {
+                "fingerprint": fingerprint,
+                "status": "completed",
+                "created_at": {"$gte": since},
+            },
+            {"_id": 0, "request_id": 1},
+            sort=[("created_at", -1)],
+        )
+
+    async def list_page(
+        self,
+        status: str | None,
+        fingerprint: str | None,
+        after: tuple[datetime, str] | None,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        cursor = self.col.find(
+            history_query(status, fingerprint, after),
+            HISTORY_PROJECTION,
+            sort=HISTORY_SORT,
+            limit=limit,
+        )
+        return await cursor.to_list()
+
+
+@dataclass
+class AsyncAgentRunsRepo:
+    col: AsyncCollection
+
+    async def insert_run(self, doc: AgentRunDoc) -> None:
+        await self.col.insert_one(doc.model_dump())
+
+    async def insert_runs(self, docs: list[AgentRunDoc]) -> None:
+        await self.col.insert_many([d.model_dump() for d in docs], ordered=False)
+
+    async def list_for_request(self, request_id: str) -> list[dict[str, Any]]:
+        cursor = self.col.find(
+            {"request_id": request_id},
+            {"_id": 0, "request_id": 0},
+            sort=[("started_at", 1)],
+        )
+        return await cursor.to_list()
+
+
+@dataclass
+class AsyncResultsRepo:
+    col: AsyncCollection
+
+    async def upsert_result(
+        self, request_id: str, paths: Paths, warnings: list[str], error: str | None
+    ) -> None:
+        await self.col.update_one(
+            {"request_id": request_id},
+            {"$set": result_fields(request_id, paths, warnings, error)},
+            upsert=True,
+        )
+
+    async def get(self, request_id: str) -> dict[str, Any] | None:
+        return await self.col.find_one({"request_id": request_id}, {"_id": 0})
+
+    async def iter_paths(
+        self, request_ids: list[str], horizons: list[str]
+    ) -> AsyncIterator[dict[str, Any]]:
+        for i in range(0, len(request_ids), EXPORT_IDS_PER_QUERY):
+            query, projection = export_query(
+                request_ids[i : i + EXPORT_IDS_PER_QUERY], horizons
+            )
+            async for doc in self.col.find(
+                query, projection, batch_size=EXPORT_CURSOR_BATCH_SIZE
+            ):
+                yield doc
+
+
+@dataclass
+class AsyncLeaseRepo:
+    col: AsyncCollection
+
+    async def acquire(self, key: str, owner: str, ttl_seconds: float) -> Optional[str]:
+        for _ in range(LEASE_ACQUIRE_ATTEMPTS):
+            try:
+                await self.col.update_one(
+                    *lease_claim(key, owner, ttl_seconds), upsert=True
+                )
+                return owner
+            except DuplicateKeyError:
+                doc = await self.col.find_one({"_id": key}, {"owner": 1})
+                if doc is not None:
+                    return doc["owner"]
+        return None
+
+    async def renew(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        res = await self.col.update_one(
+            {"_id": key, "owner": owner}, {"$set": {"expires_at": expires_at}}
+        )
+        return res.matched_count == 1
+
+    async def release(self, key: str, owner: str) -> None:
+        await self.col.delete_one({"_id": key, "owner": owner})
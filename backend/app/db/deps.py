@@ -1,6 +1,8 @@
 from fastapi import Request
 from pymongo.database import Database
 from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
 from app.db.mongo import (
     get_db_name,
     REQUESTS_COLLECTION,
@@ -24,3 +26,20 @@ def get_agent_runs_collection(request: Request) -> Collection:
 
 def get_results_collection(request: Request) -> Collection:
     return get_db(request)[RESULTS_COLLECTION]
+
+
+def get_async_db(request: Request) -> AsyncDatabase:
+    client = request.app.state.async_mongo_client
+    return client[get_db_name()]
+
+
+def get_async_requests_collection(request: Request) -> AsyncCollection:
+    return get_async_db(request)[REQUESTS_COLLECTION]
+
+
+def get_async_agent_runs_collection(request: Request) -> AsyncCollection:
+    return get_async_db(request)[AGENT_RUNS_COLLECTION]
+
+
+def get_async_results_collection(request: Request) -> AsyncCollection:
+    return get_async_db(request)[RESULTS_COLLECTION]
@@ -28,7 +28,13 @@ class RequestDoc(BaseModel):
     created_at: datetime
     status: RequestStatus
     input: RequestInput
+    # normalized (query, prefs) hash, see app.services.fingerprint
+    fingerprint: Optional[str] = None
     error: Optional[str] = None
+    # token / credit / cost totals and per-node breakdown (set on completion)
+    usage: Optional[Dict[str, Any]] = None
+    # request whose graph run produced these results (coalesced duplicate)
+    reused_from: Optional[str] = None
 
 
 # ---------- agent_runs collection ----------
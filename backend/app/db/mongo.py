@@ -1,15 +1,37 @@
 import os
+from typing import Optional
+
 import certifi
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
 from pymongo.errors import ServerSelectionTimeoutError
+from pymongo.synchronous.collection import Collection
 from pymongo.synchronous.database import Database
 
+from app.db.monitoring import MongoMetrics, pool_options
+
 REQUESTS_COLLECTION = "requests"
 AGENT_RUNS_COLLECTION = "agent_runs"
 RESULTS_COLLECTION = "results"
+LLM_CACHE_COLLECTION = "llm_cache"
+SEARCH_CACHE_COLLECTION = "search_cache"
+PAGE_CACHE_COLLECTION = "page_cache"
+DOMAIN_STATS_COLLECTION = "domain_stats"  # keyed by host
+# hosts not updated for this long are dropped by the TTL index; their counters
+# have decayed to nothing by then (see app.graph.domains)
+DOMAIN_STATS_IDLE_SECONDS = 60 * 24 * 3600
+# one doc per lease key: request fingerprint (singleflight) or retention:archive
+LEASES_COLLECTION = "leases"
+
+
+def _client_options(metrics: Optional[MongoMetrics]) -> dict:
+    # pool sizing from MONGO_* env, plus command / pool listeners when given
+    options = pool_options()
+    if metrics is not None:
+        options["event_listeners"] = metrics.listeners()
+    return options
 
 
-def connect_mongo() -> MongoClient:
+def connect_mongo(metrics: Optional[MongoMetrics] = None) -> MongoClient:
     uri = os.getenv("MONGODB_URI")
     if not uri:
         raise RuntimeError("MONGODB_URI not set")
@@ -18,6 +40,7 @@ def connect_mongo() -> MongoClient:
         uri,
         serverSelectionTimeoutMS=5000,
         tlsCAFile=certifi.where(),
+        **_client_options(metrics),
     )
 
     try:
@@ -32,11 +55,68 @@ def disconnect_mongo(client: MongoClient) -> None:
     client.close()
 
 
+async def connect_async_mongo(
+    metrics: Optional[MongoMetrics] = None,
+) -> AsyncMongoClient:
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        raise RuntimeError("MONGODB_URI not set")
+
+    client = AsyncMongoClient(
+        uri,
+        serverSelectionTimeoutMS=5000,
+        tlsCAFile=certifi.where(),
+        **_client_options(metrics),
+    )
+
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError as e:
+        raise RuntimeError("MongoDB ping failed (URI / IP allowlist / network)") from e
+
+    return client
+
+
+async def disconnect_async_mongo(client: AsyncMongoClient) -> None:
+    await client.close()
+
+
 def get_db_name() -> str:
     return os.getenv("MONGODB_DB", "learning_path_explorer")
 
 
+def _drop_index(col: Collection, name: str) -> None:
+    # superseded by a compound index with the same prefix
+    if name in col.index_information():
+        col.drop_index(name)
+
+
 def init_db(db: Database):
     db[REQUESTS_COLLECTION].create_index("request_id", unique=True)
-    db[AGENT_RUNS_COLLECTION].create_index("request_id")
+    # newest completed request per fingerprint (result reuse)
+    db[REQUESTS_COLLECTION].create_index(
+        [("fingerprint", 1), ("status", 1), ("created_at", -1)]
+    )
+    # request history (GET /api/requests): keyset pages on (created_at,
+    # request_id), overall and per status; the status one also serves the
+    # operational running / failed by age queries. A fingerprint filter uses the
+    # reuse index above, a fingerprint matches few requests.
+    db[REQUESTS_COLLECTION].create_index([("created_at", -1), ("request_id", -1)])
+    db[REQUESTS_COLLECTION].create_index(
+        [("status", 1), ("created_at", -1), ("request_id", -1)]
+    )
+    _drop_index(db[REQUESTS_COLLECTION], "status_1_created_at_-1")
+    # a request's runs in order; also serves lookups by request_id alone, so the
+    # former single-field index is dropped
+    db[AGENT_RUNS_COLLECTION].create_index([("request_id", 1), ("started_at", 1)])
+    _drop_index(db[AGENT_RUNS_COLLECTION], "request_id_1")
     db[RESULTS_COLLECTION].create_index("request_id", unique=True)
+    # cache entries carry their own expiry; Mongo's TTL monitor removes them
+    db[LLM_CACHE_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+    db[SEARCH_CACHE_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+    db[PAGE_CACHE_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+    db[DOMAIN_STATS_COLLECTION].create_index(
+        "updated_at", expireAfterSeconds=DOMAIN_STATS_IDLE_SECONDS
+    )
+    # leases of crashed instances are reclaimed by expiry; TTL only tidies up
+    db[LEASES_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
@@ -0,0 +1,236 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from pymongo import monitoring
+
+from app.core.env import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+# pymongo command and connection-pool listeners for one client: per-command
+# latency, how long operations wait to check a connection out of the pool and
+# how close the pool is to maxPoolSize. Slow commands and checkouts are logged;
+# snapshot() feeds GET /api/internal/mongo.
+
+MONGO_MAX_POOL_SIZE = 100  # pymongo's default
+MONGO_MIN_POOL_SIZE = 0
+MONGO_SLOW_COMMAND_MS = 500.0
+MONGO_SLOW_CHECKOUT_MS = 100.0
+
+_RECENT_SAMPLES = 256
+
+
+def pool_options() -> dict[str, Any]:
+    # MongoClient keyword arguments; idle / wait-queue timeouts only when set
+    options: dict[str, Any] = {
+        "maxPoolSize": env_int("MONGO_MAX_POOL_SIZE", MONGO_MAX_POOL_SIZE),
+        "minPoolSize": env_int("MONGO_MIN_POOL_SIZE", MONGO_MIN_POOL_SIZE),
+    }
+    for name, option in (
+        ("MONGO_MAX_IDLE_TIME_MS", "maxIdleTimeMS"),
+        ("MONGO_WAIT_QUEUE_TIMEOUT_MS", "waitQueueTimeoutMS"),
+        ("MONGO_MAX_CONNECTING", "maxConnecting"),
+    ):
+        value = env_int(name, 0)
+        if value > 0:
+            options[option] = value
+    return options
+
+
+def _summary(samples: deque[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)}
+
+
+@dataclass
+class _CommandStats:
+    count: int = 0
+    failed: int = 0
+    total_ms: float = 0.0
+    recent_ms: deque[float] = field(
+        default_factory=lambda: deque(maxlen=_RECENT_SAMPLES)
+    )
+
+
+@dataclass
+class MongoMetrics:
+    max_pool_size: int = MONGO_MAX_POOL_SIZE
+    slow_command_ms: float = MONGO_SLOW_COMMAND_MS
+    slow_checkout_ms: float = MONGO_SLOW_CHECKOUT_MS
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._commands: dict[str, _CommandStats] = {}
+        self._checkout_ms: deque[float] = deque(maxlen=_RECENT_SAMPLES)
+        self._pool = {
+            "checked_out": 0,
+            "max_checked_out": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+            "checkouts": 0,
+            "checkout_failed": 0,
+            "slow_checkouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "pool_cleared": 0,
+        }
+
+    def listeners(self) -> list[Any]:
+        return [_CommandListener(self), _PoolListener(self)]
+
+    def command(self, name: str, duration_ms: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = _CommandStats()
+            stats.count += 1
+            stats.failed += int(failed)
+            stats.total_ms += duration_ms
+            stats.recent_ms.append(duration_ms)
+        if duration_ms >= self.slow_command_ms:
+            logger.warning(
+                "mongo_slow_command. command=%s duration_ms=%.1f failed=%s",
+                name,
+                duration_ms,
+                failed,
+            )
+
+    def checkout_started(self) -> None:
+        with self._lock:
+            self._pool["waiting"] += 1
+            self._pool["max_waiting"] = max(
+                self._pool["max_waiting"], self._pool["waiting"]
+            )
+
+    def checkout_done(self, wait_ms: float, failed: str | None = None) -> None:
+        # failed: the pymongo reason ("timeout", "poolClosed", "connectionError")
+        with self._lock:
+            pool = self._pool
+            pool["waiting"] = max(pool["waiting"] - 1, 0)
+            if failed is not None:
+                pool["checkout_failed"] += 1
+            else:
+                pool["checkouts"] += 1
+                pool["checked_out"] += 1
+                pool["max_checked_out"] = max(
+                    pool["max_checked_out"], pool["checked_out"]
+                )
+                self._checkout_ms.append(wait_ms)
+            slow = wait_ms >= self.slow_checkout_ms
+            pool["slow_checkouts"] += int(slow)
+            checked_out, waiting = pool["checked_out"], pool["waiting"]
+        if failed is not None or slow:
+            logger.warning(
+                "mongo_slow_checkout. wait_ms=%.1f failed=%s checked_out=%d "
+                "waiting=%d max_pool_size=%d",
+                wait_ms,
+                failed,
+                checked_out,
+                waiting,
+                self.max_pool_size,
+            )
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self._pool["checked_out"] = max(self._pool["checked_out"] - 1, 0)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._pool[key] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            pool = dict(self._pool)
+            checkout_ms = _summary(self._checkout_ms)
+            commands = {
+                name: {
+                    "count": s.count,
+                    "failed": s.failed,
+                    "avg_ms": round(s.total_ms / s.count, 3) if s.count else 0.0,
+                    "ms": _summary(s.recent_ms),
+                }
+                for name, s in sorted(self._commands.items())
+            }
+        return {
+            "pool": {
+                **pool,
+                "max_pool_size": self.max_pool_size,
+                # share of the pool in use now / at the peak
+                "saturation": round(pool["checked_out"] / self.max_pool_size, 3),
+                "peak_saturation": round(
+                    pool["max_checked_out"] / self.max_pool_size, 3
+                ),
+                "checkout_wait_ms": checkout_ms,
+            },
+            "commands": commands,
+        }
+
+
+class _CommandListener(monitoring.CommandListener):
+    def __init__(self, metrics: MongoMetrics):
+        self.metrics = metrics
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.metrics.command(event.command_name, event.duration_micros / 1000, False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.metrics.command(event.command_name, event.duration_micros / 1000, True)
+
+
+class _PoolListener(monitoring.ConnectionPoolListener):
+    def __init__(self, metrics: MongoMetrics):
+        self.metrics = metrics
+
+    def connection_check_out_started(self, event: Any) -> None:
+        self.metrics.checkout_started()
+
+    def connection_checked_out(self, event: Any) -> None:
+        self.metrics.checkout_done(event.duration * 1000)
+
+    def connection_check_out_failed(self, event: Any) -> None:
+        self.metrics.checkout_done(event.duration * 1000, failed=str(event.reason))
+
+    def connection_checked_in(self, event: Any) -> None:
+        self.metrics.checked_in()
+
+    def connection_created(self, event: Any) -> None:
+        self.metrics.count("connections_created")
+
+    def connection_closed(self, event: Any) -> None:
+        self.metrics.count("connections_closed")
+
+    def pool_cleared(self, event: Any) -> None:
+        self.metrics.count("pool_cleared")
+
+    def pool_created(self, event: Any) -> None:
+        pass
+
+    def pool_ready(self, event: Any) -> None:
+        pass
+
+    def pool_closed(self, event: Any) -> None:
+        pass
+
+    def connection_ready(self, event: Any) -> None:
+        pass
+
+
+def make_mongo_metrics() -> MongoMetrics:
+    return MongoMetrics(
+        # maxPoolSize=0 means unbounded; saturation is then against 1
+        max_pool_size=max(pool_options()["maxPoolSize"], 1),
+        slow_command_ms=env_float("MONGO_SLOW_COMMAND_MS", MONGO_SLOW_COMMAND_MS),
+        slow_checkout_ms=env_float("MONGO_SLOW_CHECKOUT_MS", MONGO_SLOW_CHECKOUT_MS),
+    )
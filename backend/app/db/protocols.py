@@ -1,18 +1,130 @@
-from typing import Protocol
-from app.db.models import RequestDoc, Paths
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterator, Optional, Protocol
+from app.db.models import AgentRunDoc, RequestDoc, Paths
 
 
 class RequestsRepoProtocol(Protocol):
     def create_running(self, doc: RequestDoc) -> None: ...
-    def mark_completed(self, request_id: str) -> None: ...
+    def mark_completed(
+        self,
+        request_id: str,
+        usage: dict[str, Any] | None = None,
+        reused_from: str | None = None,
+    ) -> None: ...
     def mark_failed(self, request_id: str, error: str) -> None: ...
+    def finish(self, doc: RequestDoc) -> None: ...
+    def get(self, request_id: str) -> dict[str, Any] | None: ...
+    def find_completed(
+        self, fingerprint: str, since: datetime
+    ) -> dict[str, Any] | None: ...
 
 
 class ResultsRepoProtocol(Protocol):
+    # iter_paths streams {"request_id", "paths": {horizon: [...]}} of successful
+    # results
     def upsert_result(
         self, request_id: str, paths: Paths, warnings: list[str], error: str | None
     ) -> None: ...
+    def get(self, request_id: str) -> dict[str, Any] | None: ...
+    def iter_paths(
+        self, request_ids: list[str], horizons: list[str]
+    ) -> Iterator[dict[str, Any]]: ...
 
 
 class AgentRunsRepoProtocol(Protocol):
     def insert_run(self, doc: RequestDoc) -> None: ...
+    def insert_runs(self, docs: list[AgentRunDoc]) -> None: ...
+
+
+class RequestHistoryRepoProtocol(Protocol):
+    # list_page: one page of HISTORY_PROJECTION docs, newest first, after the
+    # (created_at, request_id) keyset
+    def list_page(
+        self,
+        status: str | None,
+        fingerprint: str | None,
+        after: tuple[datetime, str] | None,
+        limit: int,
+    ) -> list[dict[str, Any]]: ...
+    def get(self, request_id: str) -> dict[str, Any] | None: ...
+
+
+class AgentRunsReaderProtocol(Protocol):
+    def list_for_request(self, request_id: str) -> list[dict[str, Any]]: ...
+
+
+class CacheRepoProtocol(Protocol):
+    # get_many returns {key: (value, seconds_until_expiry)} for live entries only
+    def get_many(self, keys: list[str]) -> dict[str, tuple[Any, float]]: ...
+    def set_many(self, items: dict[str, Any], ttl_seconds: float) -> None: ...
+
+
+class DomainStatsRepoProtocol(Protocol):
+    # get_many returns {host: counter doc with decayed_at}; inc_many decays a
+    # host's counters to now, then adds the deltas
+    def get_many(self, hosts: list[str]) -> dict[str, dict[str, Any]]: ...
+    def inc_many(
+        self, deltas: dict[str, dict[str, float]], half_life_seconds: float
+    ) -> None: ...
+
+
+class LeaseRepoProtocol(Protocol):
+    # acquire returns the current holder (owner itself when the lease was taken),
+    # None when the holder could not be read; only owner means "acquired"
+    def acquire(self, key: str, owner: str, ttl_seconds: float) -> Optional[str]: ...
+    def renew(self, key: str, owner: str, ttl_seconds: float) -> bool: ...
+    def release(self, key: str, owner: str) -> None: ...
+
+
+class AsyncRequestsRepoProtocol(Protocol):
+    async def create_running(self, doc: RequestDoc) -> None: ...
+    async def mark_completed(
+        self,
+        request_id: str,
+        usage: dict[str, Any] | None = None,
+        reused_from: str | None = None,
+    ) -> None: ...
+    async def mark_failed(self, request_id: str, error: str) -> None: ...
+    async def finish(self, doc: RequestDoc) -> None: ...
+    async def get(self, request_id: str) -> dict[str, Any] | None: ...
+    async def find_completed(
+        self, fingerprint: str, since: datetime
+    ) -> dict[str, Any] | None: ...
+
+
+class AsyncResultsRepoProtocol(Protocol):
+    async def upsert_result(
+        self, request_id: str, paths: Paths, warnings: list[str], error: str | None
+    ) -> None: ...
+    async def get(self, request_id: str) -> dict[str, Any] | None: ...
+    def iter_paths(
+        self, request_ids: list[str], horizons: list[str]
+    ) -> AsyncIterator[dict[str, Any]]: ...
+
+
+class AsyncAgentRunsRepoProtocol(Protocol):
+    async def insert_run(self, doc: AgentRunDoc) -> None: ...
+    async def insert_runs(self, docs: list[AgentRunDoc]) -> None: ...
+
+
+class AsyncRequestHistoryRepoProtocol(Protocol):
+    async def list_page(
+        self,
+        status: str | None,
+        fingerprint: str | None,
+        after: tuple[datetime, str] | None,
+        limit: int,
+    ) -> list[dict[str, Any]]: ...
+    async def get(self, request_id: str) -> dict[str, Any] | None: ...
+
+
+class AsyncAgentRunsReaderProtocol(Protocol):
+    async def list_for_request(self, request_id: str) -> list[dict[str, Any]]: ...
+
+
+class AsyncLeaseRepoProtocol(Protocol):
+    async def acquire(
+        self, key: str, owner: str, ttl_seconds: float
+    ) -> Optional[str]: ...
+    async def renew(self, key: str, owner: str, ttl_seconds: float) -> bool: ...
+    async def release(self, key: str, owner: str) -> None: ...
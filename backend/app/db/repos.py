@@ -1,11 +1,80 @@
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
+from pymongo import UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 
 from app.db.models import RequestDoc, AgentRunDoc, Paths
 
 
+LEASE_ACQUIRE_ATTEMPTS = 3
+
+
+def lease_claim(key: str, owner: str, ttl_seconds: float) -> tuple[dict, dict]:
+    # (filter, update) taking the lease if it is free or expired; a live lease
+    # makes the upsert collide on _id
+    now = datetime.now(timezone.utc)
+    return (
+        {"_id": key, "expires_at": {"$lte": now}},
+        {
+            "$set": {
+                "owner": owner,
+                "expires_at": now + timedelta(seconds=ttl_seconds),
+            }
+        },
+    )
+
+
+def result_fields(
+    request_id: str, paths: Paths, warnings: list[str], error: str | None
+) -> dict[str, Any]:
+    return {
+        "request_id": request_id,
+        "created_at": datetime.now(timezone.utc),
+        "paths": paths.model_dump(mode="json"),
+        "warnings": warnings,  # full-request warnings (final)
+        "error": error,
+    }
+
+
+# request history: newest first, (created_at, request_id) keyset so every page is
+# an index range scan however deep it goes; the projection leaves out usage's
+# per-node breakdown
+HISTORY_SORT = [("created_at", -1), ("request_id", -1)]
+HISTORY_PROJECTION = {
+    "_id": 0,
+    "request_id": 1,
+    "created_at": 1,
+    "status": 1,
+    "input": 1,
+    "fingerprint": 1,
+    "error": 1,
+    "reused_from": 1,
+    "usage.cost_usd": 1,
+}
+
+
+def history_query(
+    status: str | None,
+    fingerprint: str | None,
+    after: tuple[datetime, str] | None,
+) -> dict[str, Any]:
+    # after: (created_at, request_id) of the last document of the previous page
+    query: dict[str, Any] = {}
+    if status is not None:
+        query["status"] = status
+    if fingerprint is not None:
+        query["fingerprint"] = fingerprint
+    if after is not None:
+        created_at, request_id = after
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "request_id": {"$lt": request_id}},
+        ]
+    return query
+
+
 @dataclass
 class RequestsRepo:
     col: Collection
@@ -13,9 +82,21 @@ class RequestsRepo:
     def create_running(self, doc: RequestDoc) -> None:
         self.col.insert_one(doc.model_dump())
 
-    def mark_completed(self, request_id: str) -> None:
+    def mark_completed(
+        self,
+        request_id: str,
+        usage: dict[str, Any] | None = None,
+        reused_from: str | None = None,
+    ) -> None:
         self.col.update_one(
-            {"request_id": request_id}, {"$set": {"status": "completed"}}
+            {"request_id": request_id},
+            {
+                "$set": {
+                    "status": "completed",
+                    "usage": usage,
+                    "reused_from": reused_from,
+                }
+            },
         )
 
     def mark_failed(self, request_id: str, error: str) -> None:
@@ -23,6 +104,45 @@ class RequestsRepo:
             {"request_id": request_id}, {"$set": {"status": "failed", "error": error}}
         )
 
+    def finish(self, doc: RequestDoc) -> None:
+        # the whole final doc in one write (consolidated mode, no running doc)
+        self.col.update_one(
+            {"request_id": doc.request_id}, {"$set": doc.model_dump()}, upsert=True
+        )
+
+    def get(self, request_id: str) -> Optional[dict[str, Any]]:
+        return self.col.find_one({"request_id": request_id}, {"_id": 0})
+
+    def find_completed(
+        self, fingerprint: str, since: datetime
+    ) -> Optional[dict[str, Any]]:
+        # newest completed request with this fingerprint created after `since`
+        return self.col.find_one(
+            {
+                "fingerprint": fingerprint,
+                "status": "completed",
+                "created_at": {"$gte": since},
+            },
+            {"_id": 0, "request_id": 1},
+            sort=[("created_at", -1)],
+        )
+
+    def list_page(
+        self,
+        status: str | None,
+        fingerprint: str | None,
+        after: tuple[datetime, str] | None,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        return list(
+            self.col.find(
+                history_query(status, fingerprint, after),
+                HISTORY_PROJECTION,
+                sort=HISTORY_SORT,
+                limit=limit,
+            )
+        )
+
 
 @dataclass
 class AgentRunsRepo:
@@ -31,6 +151,30 @@ class AgentRunsRepo:
     def insert_run(self, doc: AgentRunDoc) -> None:
         self.col.insert_one(doc.model_dump())
 
+    def insert_runs(self, docs: list[AgentRunDoc]) -> None:
+        self.col.insert_many([d.model_dump() for d in docs], ordered=False)
+
+    def list_for_request(self, request_id: str) -> list[dict[str, Any]]:
+        # the (request_id, started_at) index returns them in execution order
+        return list(
+            self.col.find(
+                {"request_id": request_id},
+                {"_id": 0, "request_id": 0},
+                sort=[("started_at", 1)],
+            )
+        )
+
+
+EXPORT_IDS_PER_QUERY = 500
+EXPORT_CURSOR_BATCH_SIZE = 100
+
+
+def export_query(request_ids: list[str], horizons: list[str]) -> tuple[dict, dict]:
+    # (filter, projection): successful results only, just the requested buckets
+    projection = {"_id": 0, "request_id": 1}
+    projection.update({f"paths.{h}": 1 for h in horizons})
+    return {"request_id": {"$in": request_ids}, "error": None}, projection
+
 
 @dataclass
 class ResultsRepo:
@@ -41,14 +185,121 @@ class ResultsRepo:
     ) -> None:
         self.col.update_one(
             {"request_id": request_id},
-            {
-                "$set": {
-                    "request_id": request_id,
-                    "created_at": datetime.now(timezone.utc),
-                    "paths": paths.model_dump(mode="json"),
-                    "warnings": warnings,  # full-request warnings (final)
-                    "error": error,
-                }
-            },
+            {"$set": result_fields(request_id, paths, warnings, error)},
             upsert=True,
         )
+
+    def get(self, request_id: str) -> Optional[dict[str, Any]]:
+        return self.col.find_one({"request_id": request_id}, {"_id": 0})
+
+    def iter_paths(
+        self, request_ids: list[str], horizons: list[str]
+    ) -> Iterator[dict[str, Any]]:
+        # one cursor per slice of ids; documents are pulled batch by batch
+        for i in range(0, len(request_ids), EXPORT_IDS_PER_QUERY):
+            query, projection = export_query(
+                request_ids[i : i + EXPORT_IDS_PER_QUERY], horizons
+            )
+            yield from self.col.find(
+                query, projection, batch_size=EXPORT_CURSOR_BATCH_SIZE
+            )
+
+
+@dataclass
+class CacheRepo:
+    col: Collection
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        now = datetime.now(timezone.utc)
+        # TTL monitor runs about once a minute, so filter expired docs explicitly
+        cursor = self.col.find(
+            {"_id": {"$in": keys}, "expires_at": {"$gt": now}},
+            {"value": 1, "expires_at": 1},
+        )
+        out: dict[str, tuple[Any, float]] = {}
+        for doc in cursor:
+            expires_at = doc["expires_at"]
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            out[doc["_id"]] = (doc["value"], (expires_at - now).total_seconds())
+        return out
+
+    def set_many(self, items: dict[str, Any], ttl_seconds: float) -> None:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        ops = [
+            UpdateOne(
+                {"_id": key},
+                {"$set": {"value": value, "created_at": now, "expires_at": expires_at}},
+                upsert=True,
+            )
+            for key, value in items.items()
+        ]
+        if ops:
+            self.col.bulk_write(ops, ordered=False)
+
+
+def _decayed_inc(
+    counts: dict[str, float], half_life_seconds: float
+) -> list[dict[str, Any]]:
+    factor: Any = 1
+    if half_life_seconds > 0:
+        age_ms = {"$subtract": ["$$NOW", {"$ifNull": ["$decayed_at", "$$NOW"]}]}
+        factor = {"$pow": [0.5, {"$divide": [age_ms, half_life_seconds * 1000]}]}
+    fields = {
+        name: {"$add": [{"$multiply": [{"$ifNull": [f"${name}", 0]}, factor]}, delta]}
+        for name, delta in counts.items()
+    }
+    return [{"$set": {**fields, "decayed_at": "$$NOW", "updated_at": "$$NOW"}}]
+
+
+@dataclass
+class DomainStatsRepo:
+    col: Collection
+
+    def get_many(self, hosts: list[str]) -> dict[str, dict[str, Any]]:
+        return {doc.pop("_id"): doc for doc in self.col.find({"_id": {"$in": hosts}})}
+
+    def inc_many(
+        self, deltas: dict[str, dict[str, float]], half_life_seconds: float
+    ) -> None:
+        # counts are decayed to now and the deltas added in one pipeline update,
+        # so concurrent instances never lose each other's increments
+        ops = [
+            UpdateOne(
+                {"_id": host}, _decayed_inc(counts, half_life_seconds), upsert=True
+            )
+            for host, counts in deltas.items()
+        ]
+        if ops:
+            self.col.bulk_write(ops, ordered=False)
+
+
+@dataclass
+class LeaseRepo:
+    col: Collection
+
+    def acquire(self, key: str, owner: str, ttl_seconds: float) -> Optional[str]:
+        # returns the lease holder: owner itself if the lease was taken, None if
+        # it was held on every attempt but released before we could read it
+        for _ in range(LEASE_ACQUIRE_ATTEMPTS):
+            try:
+                self.col.update_one(*lease_claim(key, owner, ttl_seconds), upsert=True)
+                return owner
+            except DuplicateKeyError:
+                doc = self.col.find_one({"_id": key}, {"owner": 1})
+                if doc is not None:
+                    return doc["owner"]
+                # released in between: try again
+        return None
+
+    def renew(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        # extends a lease still held by owner; False once it is lost
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        res = self.col.update_one(
+            {"_id": key, "owner": owner}, {"$set": {"expires_at": expires_at}}
+        )
+        return res.matched_count == 1
+
+    def release(self, key: str, owner: str) -> None:
+        self.col.delete_one({"_id": key, "owner": owner})
@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Callable, Optional
+
+from bson import json_util
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+from app.core.env import env_float, env_int
+from app.db.mongo import (
+    AGENT_RUNS_COLLECTION,
+    LEASES_COLLECTION,
+    REQUESTS_COLLECTION,
+    RESULTS_COLLECTION,
+)
+from app.db.repos import LeaseRepo
+
+try:  # optional: .ndjson.zst when zstandard is installed, .ndjson.gz otherwise
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# requests / results / agent_runs are kept for a configurable number of days
+# (0 = forever). With ARCHIVE_DIR set, an archiver moves expired documents to
+# compressed NDJSON files (Extended JSON, one file per batch) and deletes them
+# only once the file is on disk; a TTL index ARCHIVE_GRACE_DAYS later is the
+# backstop for anything the archiver missed. Without ARCHIVE_DIR the TTL index
+# alone expires documents at the retention age.
+
+REQUESTS_RETENTION_DAYS = 0.0
+RESULTS_RETENTION_DAYS = 0.0
+AGENT_RUNS_RETENTION_DAYS = 0.0
+ARCHIVE_GRACE_DAYS = 7.0
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_INTERVAL_SECONDS = 3600.0
+ARCHIVE_LEASE_SECONDS = 300.0  # renewed before every batch
+ARCHIVE_ZSTD_LEVEL = 10
+
+_ARCHIVE_LEASE_KEY = "retention:archive"
+_DAY_S = 86400
+
+
+@dataclass
+class RetentionPolicy:
+    collection: str
+    date_field: str
+    days: float
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+
+def retention_policies() -> list[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            REQUESTS_COLLECTION,
+            "created_at",
+            env_float("REQUESTS_RETENTION_DAYS", REQUESTS_RETENTION_DAYS),
+        ),
+        RetentionPolicy(
+            RESULTS_COLLECTION,
+            "created_at",
+            env_float("RESULTS_RETENTION_DAYS", RESULTS_RETENTION_DAYS),
+        ),
+        RetentionPolicy(
+            AGENT_RUNS_COLLECTION,
+            "started_at",
+            env_float("AGENT_RUNS_RETENTION_DAYS", AGENT_RUNS_RETENTION_DAYS),
+        ),
+    ]
+
+
+_INDEX_OPTIONS_CONFLICT = 85  # same key pattern, other options
+
+
+def _ttl_index_on(col: Any, date_field: str) -> Optional[str]:
+    # name of an existing TTL index on exactly {date_field: 1}
+    for name, info in col.index_information().items():
+        if info.get("key") == [(date_field, 1)] and "expireAfterSeconds" in info:
+            return name
+    return None
+
+
+def ensure_ttl_indexes(
+    db: Database, policies: list[RetentionPolicy], grace_days: float
+) -> None:
+    # idempotent: creates, retunes (collMod) or drops each TTL index
+    for policy in policies:
+        col = db[policy.collection]
+        name = f"{policy.date_field}_ttl"
+        if not policy.enabled:
+            if name in col.index_information():
+                col.drop_index(name)
+            continue
+        seconds = int((policy.days + grace_days) * _DAY_S)
+        try:
+            col.create_index(policy.date_field, name=name, expireAfterSeconds=seconds)
+        except OperationFailure as e:
+            # only a TTL index on the same field with another expireAfterSeconds
+            # is retuned in place; anything else needs an operator
+            existing = _ttl_index_on(col, policy.date_field)
+            if e.code != _INDEX_OPTIONS_CONFLICT or existing is None:
+                logger.error(
+                    "retention_ttl_index_failed. collection=%s field=%s code=%s "
+                    "error=%s",
+                    policy.collection,
+                    policy.date_field,
+                    e.code,
+                    e,
+                )
+                raise
+            db.command(
+                "collMod",
+                policy.collection,
+                index={"name": existing, "expireAfterSeconds": seconds},
+            )
+
+
+def _open_archive(path: str) -> IO[bytes]:
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL)
+        return compressor.stream_writer(open(path, "wb"))  # closes the file
+    return gzip.open(path, "wb")
+
+
+def archive_extension() -> str:
+    return ".ndjson.zst" if zstandard is not None else ".ndjson.gz"
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+@dataclass
+class RetentionArchiver:
+    db: Database
+    policies: list[RetentionPolicy]
+    archive_dir: str
+    batch_size: int = ARCHIVE_BATCH_SIZE
+    # one archiver at a time across instances (None: single instance)
+    lease_repo: Optional[LeaseRepo] = None
+    lease_ttl_s: float = ARCHIVE_LEASE_SECONDS
+    owner: str = field(default_factory=lambda: uuid.uuid4().hex)
+    clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)
+
+    def run_once(self) -> dict[str, int]:
+        # returns archived (= deleted) document counts per collection
+        if self.lease_repo is not None:
+            holder = self.lease_repo.acquire(
+                _ARCHIVE_LEASE_KEY, self.owner, self.lease_ttl_s
+            )
+            if holder != self.owner:
+                return {}
+        archived: dict[str, int] = {}
+        try:
+            for policy in self.policies:
+                if policy.enabled:
+                    self._archive(policy, archived)
+            return archived
+        except _LeaseLost:
+            logger.warning("retention_lease_lost. archived=%s", archived)
+            return archived
+        finally:
+            if self.lease_repo is not None:
+                self.lease_repo.release(_ARCHIVE_LEASE_KEY, self.owner)
+
+    def _archive(self, policy: RetentionPolicy, archived: dict[str, int]) -> None:
+        # counts go straight into `archived`, so a pass cut short still reports
+        col = self.db[policy.collection]
+        cutoff = self.clock() - timedelta(days=policy.days)
+        archived[policy.collection] = 0
+        while True:
+            self._renew_lease()
+            docs = list(
+                col.find({policy.date_field: {"$lt": cutoff}})
+                .sort(policy.date_field, 1)
+                .limit(self.batch_size)
+            )
+            if not docs:
+                break
+            path = self._write(policy, docs)
+            # the file is durable before anything is deleted; a crash in between
+            # archives the batch twice, never loses it
+            col.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+            archived[policy.collection] += len(docs)
+            logger.info(
+                "retention_archived. collection=%s docs=%d file=%s",
+                policy.collection,
+                len(docs),
+                path,
+            )
+
+    def _renew_lease(self) -> None:
+        # a pass outliving its lease would let another instance archive the
+        # same documents again, so the lease is extended before every batch
+        if self.lease_repo is None:
+            return
+        if not self.lease_repo.renew(_ARCHIVE_LEASE_KEY, self.owner, self.lease_ttl_s):
+            raise _LeaseLost()
+
+    def _write(self, policy: RetentionPolicy, docs: list[dict[str, Any]]) -> str:
+        first = docs[0][policy.date_field]
+        directory = os.path.join(
+            self.archive_dir, policy.collection, first.strftime("%Y/%m/%d")
+        )
+        os.makedirs(directory, exist_ok=True)
+        name = f"{first.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, name + archive_extension())
+        part = path + ".part"
+        with _open_archive(part) as out:
+            for doc in docs:
+                line = json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS)
+                out.write(line.encode() + b"\n")
+        with open(part, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(part, path)
+        return path
+
+
+def make_archiver(db: Database) -> Optional[RetentionArchiver]:
+    archive_dir = os.getenv("ARCHIVE_DIR")
+    policies = retention_policies()
+    if not archive_dir or not any(p.enabled for p in policies):
+        return None
+    return RetentionArchiver(
+        db=db,
+        policies=policies,
+        archive_dir=archive_dir,
+        batch_size=env_int("ARCHIVE_BATCH_SIZE", ARCHIVE_BATCH_SIZE),
+        lease_repo=LeaseRepo(db[LEASES_COLLECTION]),
+    )
+
+
+def init_retention(db: Database) -> Optional[RetentionArchiver]:
+    # TTL indexes for the configured policies, plus the archiver if ARCHIVE_DIR
+    archiver = make_archiver(db)
+    grace = env_float("ARCHIVE_GRACE_DAYS", ARCHIVE_GRACE_DAYS) if archiver else 0.0
+    ensure_ttl_indexes(db, retention_policies(), grace)
+    return archiver
+
+
+async def run_archiver(archiver: RetentionArchiver, interval_s: float) -> None:
+    # lifespan task: one pass per interval on a worker thread (sync pymongo)
+    while True:
+        try:
+            archived = await asyncio.to_thread(archiver.run_once)
+            if archived:
+                logger.info("retention_pass_done. archived=%s", archived)
+        except Exception:
+            logger.warning("retention_pass_failed.", exc_info=True)
+        await asyncio.sleep(interval_s)
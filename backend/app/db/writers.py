@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from app.core.env import env_bool, env_float, env_int
+from app.db.async_repos import AsyncAgentRunsRepo
+from app.db.models import AgentRunDoc
+from app.db.mongo import AGENT_RUNS_COLLECTION
+from app.db.protocols import AgentRunsRepoProtocol, AsyncAgentRunsRepoProtocol
+from app.db.repos import AgentRunsRepo
+
+logger = logging.getLogger(__name__)
+
+# agent_runs are telemetry: the runner hands each doc to a writer that buffers it
+# and returns at once, and a background thread (task, for the async pipeline)
+# writes the buffer with one insert_many when it reaches flush_size or every
+# flush_interval_s. A failure doc (error set) is the exception: insert_run waits
+# until it and everything buffered before it is written. A failed insert_many
+# is retried with backoff; what still fails is logged and dropped, except
+# failure docs, which get one insert_one each and, if that fails too, raise
+# AgentRunWriteError in the insert_run waiting for them.
+
+AGENT_RUNS_FLUSH_SIZE = 50
+AGENT_RUNS_FLUSH_SECONDS = 1.0
+AGENT_RUNS_MAX_BUFFER = 10_000  # oldest docs are dropped beyond this (Mongo down)
+AGENT_RUNS_WRITE_ATTEMPTS = 3
+AGENT_RUNS_RETRY_SECONDS = 0.25  # doubled per attempt
+
+
+class AgentRunWriteError(RuntimeError):
+    pass
+
+
+def _unwritten(docs: list[AgentRunDoc], e: Exception) -> list[AgentRunDoc]:
+    # an unordered insert_many reports the docs it could not write; retrying
+    # only those keeps the others from being inserted twice
+    if isinstance(e, BulkWriteError):
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        if failed:
+            return [d for i, d in enumerate(docs) if i in failed]
+    return docs
+
+
+def _lost_error(doc: AgentRunDoc) -> AgentRunWriteError:
+    return AgentRunWriteError(
+        f"failure agent run not stored (request_id={doc.request_id}, "
+        f"agent={doc.agent_name})"
+    )
+
+
+class AgentRunsWriter:
+    def __init__(
+        self,
+        repo: AgentRunsRepoProtocol,
+        flush_size: int = AGENT_RUNS_FLUSH_SIZE,
+        flush_interval_s: float = AGENT_RUNS_FLUSH_SECONDS,
+        max_buffer: int = AGENT_RUNS_MAX_BUFFER,
+        retry_s: float = AGENT_RUNS_RETRY_SECONDS,
+    ):
+        self.repo = repo
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer = max(max_buffer, self.flush_size)
+        self.retry_s = retry_s
+        self.stats = {"written": 0, "dropped": 0, "flushes": 0}
+        # (sequence number, doc); failure docs that could not be written are
+        # reported to their insert_run through _lost
+        self._buffer: list[tuple[int, AgentRunDoc]] = []
+        self._lost: set[int] = set()
+        self._cond = threading.Condition()
+        # docs ever buffered / written (or given up on), for flush() waiters
+        self._enqueued = 0
+        self._done = 0
+        self._flush_to = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="agent-runs-writer", daemon=True
+        )
+        self._thread.start()
+
+    def insert_run(self, doc: AgentRunDoc) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("agent runs writer is closed")
+            if len(self._buffer) >= self.max_buffer:
+                seq, dropped = self._buffer.pop(0)
+                if dropped.error is not None:
+                    self._lost.add(seq)
+                self._done += 1
+                self.stats["dropped"] += 1
+            self._enqueued += 1
+            seq = self._enqueued
+            self._buffer.append((seq, doc))
+            if len(self._buffer) == 1 or len(self._buffer) >= self.flush_size:
+                self._cond.notify_all()
+        if doc.error is not None:
+            self.flush()
+            with self._cond:
+                if seq in self._lost:
+                    self._lost.discard(seq)
+                    raise _lost_error(doc)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # blocks until everything buffered so far is written; False on timeout
+        with self._cond:
+            target = self._enqueued
+            self._flush_to = max(self._flush_to, target)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        # drain the buffer and stop the thread (lifespan shutdown)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _due(self) -> bool:
+        return (
+            self._closed
+            or len(self._buffer) >= self.flush_size
+            or self._flush_to > self._done
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._buffer and not self._due():
+                    # a partial batch waits at most one interval
+                    self._cond.wait_for(self._due, self.flush_interval_s)
+                batch, self._buffer = self._buffer, []
+                if not batch and self._closed:
+                    return
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[tuple[int, AgentRunDoc]]) -> None:
+        remaining = [doc for _, doc in batch]
+        for attempt in range(AGENT_RUNS_WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(self.retry_s * 2 ** (attempt - 1))
+            try:
+                self.repo.insert_runs(remaining)
+                remaining = []
+                break
+            except Exception as e:
+                remaining = _unwritten(remaining, e)
+                logger.warning(
+                    "agent_runs_flush_failed. docs=%d attempt=%d error=%s",
+                    len(remaining),
+                    attempt + 1,
+                    e,
+                )
+        lost = set()
+        for seq, doc in batch:
+            if doc.error is None or not any(d is doc for d in remaining):
+                continue
+            try:
+                self.repo.insert_run(doc)
+                remaining = [d for d in remaining if d is not doc]
+            except Exception as e:
+                lost.add(seq)
+                logger.error(
+                    "agent_runs_failure_doc_lost. request_id=%s error=%s",
+                    doc.request_id,
+                    e,
+                )
+        with self._cond:
+            self.stats["written"] += len(batch) - len(remaining)
+            self.stats["dropped"] += len(remaining)
+            self.stats["flushes"] += 1
+            self._lost |= lost
+            self._done += len(batch)
+            self._cond.notify_all()
+
+
+class AsyncAgentRunsWriter:
+    # same contract on the event loop; the flush task starts with the first doc
+
+    def __init__(
+        self,
+        repo: AsyncAgentRunsRepoProtocol,
+        flush_size: int = AGENT_RUNS_FLUSH_SIZE,
+        flush_interval_s: float = AGENT_RUNS_FLUSH_SECONDS,
+        max_buffer: int = AGENT_RUNS_MAX_BUFFER,
+        retry_s: float = AGENT_RUNS_RETRY_SECONDS,
+    ):
+        self.repo = repo
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer = max(max_buffer, self.flush_size)
+        self.retry_s = retry_s
+        self.stats = {"written": 0, "dropped": 0, "flushes": 0}
+        self._buffer: list[tuple[int, AgentRunDoc]] = []
+        self._lost: set[int] = set()
+        self._enqueued = 0
+        self._done = 0
+        self._waiters: list[tuple[int, asyncio.Future]] = []
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def insert_run(self, doc: AgentRunDoc) -> None:
+        if self._closed:
+            raise RuntimeError("agent runs writer is closed")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= self.max_buffer:
+            seq, dropped = self._buffer.pop(0)
+            if dropped.error is not None:
+                self._lost.add(seq)
+            self._done += 1
+            self.stats["dropped"] += 1
+        self._enqueued += 1
+        seq = self._enqueued
+        self._buffer.append((seq, doc))
+        if len(self._buffer) >= self.flush_size:
+            self._wake.set()
+        if doc.error is not None:
+            await self.flush()
+            if seq in self._lost:
+                self._lost.discard(seq)
+                raise _lost_error(doc)
+
+    async def flush(self) -> None:
+        if self._done >= self._enqueued or self._task is None:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((self._enqueued, waiter))
+        self._wake.set()
+        await waiter
+
+    async def aclose(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+
+    async def _run(self) -> None:
+        while True:
+            if not self._closed and not self._waiters:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            batch, self._buffer = self._buffer, []
+            if batch:
+                await self._write(batch)
+            self._release_waiters()
+            if self._closed and not self._buffer:
+                return
+
+    async def _write(self, batch: list[tuple[int, AgentRunDoc]]) -> None:
+        remaining = [doc for _, doc in batch]
+        for attempt in range(AGENT_RUNS_WRITE_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self.retry_s * 2 ** (attempt - 1))
+            try:
+                await self.repo.insert_runs(remaining)
+                remaining = []
+                break
+            except Exception as e:
+                remaining = _unwritten(remaining, e)
+                logger.warning(
+                    "agent_runs_flush_failed. docs=%d attempt=%d error=%s",
+                    len(remaining),
+                    attempt + 1,
+                    e,
+                )
+        for seq, doc in batch:
+            if doc.error is None or not any(d is doc for d in remaining):
+                continue
+            try:
+                await self.repo.insert_run(doc)
+                remaining = [d for d in remaining if d is not doc]
+            except Exception as e:
+                self._lost.add(seq)
+                logger.error(
+                    "agent_runs_failure_doc_lost. request_id=%s error=%s",
+                    doc.request_id,
+                    e,
+                )
+        self.stats["written"] += len(batch) - len(remaining)
+        self.stats["dropped"] += len(remaining)
+        self.stats["flushes"] += 1
+        self._done += len(batch)
+
+    def _release_waiters(self) -> None:
+        pending = []
+        for target, waiter in self._waiters:
+            if self._done >= target:
+                if not waiter.done():
+                    waiter.set_result(None)
+            else:
+                pending.append((target, waiter))
+        self._waiters = pending
+
+
+def _writer_settings() -> dict:
+    return {
+        "flush_size": env_int("AGENT_RUNS_FLUSH_SIZE", AGENT_RUNS_FLUSH_SIZE),
+        "flush_interval_s": env_float(
+            "AGENT_RUNS_FLUSH_SECONDS", AGENT_RUNS_FLUSH_SECONDS
+        ),
+    }
+
+
+def make_agent_runs_writer(db: Database) -> Optional[AgentRunsWriter]:
+    # AGENT_RUNS_BUFFERED=0 keeps one insert_one per node on the request path
+    if not env_bool("AGENT_RUNS_BUFFERED", True):
+        return None
+    return AgentRunsWriter(
+        AgentRunsRepo(db[AGENT_RUNS_COLLECTION]), **_writer_settings()
+    )
+
+
+def make_async_agent_runs_writer(db: AsyncDatabase) -> Optional[AsyncAgentRunsWriter]:
+    if not env_bool("AGENT_RUNS_BUFFERED", True):
+        return None
+    return AsyncAgentRunsWriter(
+        AsyncAgentRunsRepo(db[AGENT_RUNS_COLLECTION]), **_writer_settings()
+    )
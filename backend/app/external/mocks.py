@@ -1,11 +1,12 @@
 import os
+import re
 from openai.types.responses import (
     ParsedResponse,
     ParsedResponseOutputMessage,
     ParsedResponseOutputText,
 )
 from types import SimpleNamespace
-from app.graph.state import ProgramRecordGraph
+from app.graph.state import ProgramRecordBatch, ProgramRecordGraph
 
 
 def _get_mock_mode() -> str:
@@ -115,7 +116,18 @@ def make_mock_openai_client():
                 status="completed",
             )
 
-    return SimpleNamespace(responses=SimpleNamespace(parse=_parse))
+    def _parse_any(**kwargs):
+        if kwargs.get("text_format") is not ProgramRecordBatch:
+            return _parse(**kwargs)
+        # multi-page mode: the canned record, once per page URL in the prompt
+        record = _parse(**kwargs).output_parsed
+        urls = re.findall(r"^URL: (\S+)$", kwargs["input"][-1]["content"], re.M)
+        records = [
+            record.model_copy(update={"source_link": u, "citation": u}) for u in urls
+        ]
+        return SimpleNamespace(output_parsed=ProgramRecordBatch(records=records))
+
+    return SimpleNamespace(responses=SimpleNamespace(parse=_parse_any))
 
 
 def make_mock_tavily_client():
@@ -365,3 +377,24 @@ def make_mock_tavily_client():
             }
 
     return SimpleNamespace(extract=_extract, search=_search)
+
+
+def make_mock_async_openai_client():
+    sync_client = make_mock_openai_client()
+
+    async def _parse(**kwargs):
+        return sync_client.responses.parse(**kwargs)
+
+    return SimpleNamespace(responses=SimpleNamespace(parse=_parse))
+
+
+def make_mock_async_tavily_client():
+    sync_client = make_mock_tavily_client()
+
+    async def _search(query, max_results=10, **kwargs):
+        return sync_client.search(query, max_results=max_results, **kwargs)
+
+    async def _extract(urls, extract_depth="basic", **kwargs):
+        return sync_client.extract(urls, extract_depth=extract_depth, **kwargs)
+
+    return SimpleNamespace(extract=_extract, search=_search)
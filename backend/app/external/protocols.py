@@ -1,7 +1,10 @@
 from typing import Any, Protocol, Type
 from openai.types.responses import ParsedResponse
 
-from app.graph.state import ProgramRecordGraph
+from app.graph.state import ProgramRecordBatch, ProgramRecordGraph
+
+# single-page records, or a batch of records in multi-page extraction mode
+ParsedRecord = ProgramRecordGraph | ProgramRecordBatch
 
 
 class OpenAIResponsesProtocol(Protocol):
@@ -12,10 +15,10 @@ class OpenAIResponsesProtocol(Protocol):
         model: str,
         temperature: float = 0,
         input: str | list[dict[str, Any]],
-        text_format: Type[ProgramRecordGraph],
+        text_format: Type[ParsedRecord],
         max_output_tokens: int | None = None,
         **kwargs: Any,
-    ) -> ParsedResponse[ProgramRecordGraph]: ...
+    ) -> ParsedResponse[ParsedRecord]: ...
 
 
 class OpenAIClientProtocol(Protocol):
@@ -29,3 +32,30 @@ class TavilyClientProtocol(Protocol):
     def extract(
         self, urls: str | list[str], extract_depth: str | None = None, **kwargs: Any
     ) -> dict[str, Any]: ...
+
+
+class AsyncOpenAIResponsesProtocol(Protocol):
+
+    async def parse(
+        self,
+        *,
+        model: str,
+        temperature: float = 0,
+        input: str | list[dict[str, Any]],
+        text_format: Type[ParsedRecord],
+        max_output_tokens: int | None = None,
+        **kwargs: Any,
+    ) -> ParsedResponse[ParsedRecord]: ...
+
+
+class AsyncOpenAIClientProtocol(Protocol):
+    responses: AsyncOpenAIResponsesProtocol
+
+
+class AsyncTavilyClientProtocol(Protocol):
+    async def search(
+        self, query: str, max_results: int | None = None, **kwargs: Any
+    ) -> dict[str, Any]: ...
+    async def extract(
+        self, urls: str | list[str], extract_depth: str | None = None, **kwargs: Any
+    ) -> dict[str, Any]: ...
@@ -1,25 +1,78 @@
 from langgraph.graph import StateGraph, START, END
 from functools import partial
 
-from app.graph.deps import GraphDeps
+from app.graph.deps import AsyncGraphDeps, GraphDeps
 from app.graph.state import GraphState
-from app.graph.nodes import adaptive_scout, extraction_specialist, path_organizer
+from app.graph.nodes import (
+    adaptive_scout,
+    adaptive_scout_async,
+    extraction_specialist,
+    extraction_specialist_async,
+    path_organizer,
+    streaming_pipeline,
+)
 
 
 def _after_scout(state: GraphState):
     return "extract" if state.get("raw_leads") else END
 
 
-def build_graph(deps: GraphDeps):
+def _build_streaming_graph(deps: GraphDeps):
+    # scout / extract / organize overlap inside a single node
+    openai_client, tavily_client = deps.clients()
+    builder = StateGraph(GraphState)
+
+    builder.add_node(
+        "pipeline",
+        partial(
+            streaming_pipeline,
+            tavily_client=tavily_client,
+            openai_client=openai_client,
+            max_concurrency=deps.llm_max_concurrency,
+            llm_timeout=deps.llm_timeout_s,
+            search_cache=deps.search_cache,
+            llm_cache=deps.llm_cache,
+            page_cache=deps.page_cache,
+            page_failure_ttl=deps.page_failure_ttl_s,
+            page_token_budget=deps.page_token_budget,
+            domain_policy=deps.domain_policy,
+            spend_ceiling_usd=deps.spend_ceiling_usd,
+        ),
+    )
+    builder.add_edge(START, "pipeline")
+    builder.add_edge("pipeline", END)
+
+    return builder.compile()
+
+
+def _build_pipeline_graph(deps: GraphDeps, scout_node, extract_node):
+    openai_client, tavily_client = deps.clients()
     builder = StateGraph(GraphState)
 
-    builder.add_node("scout", partial(adaptive_scout, tavily_client=deps.tavily_client))
+    builder.add_node(
+        "scout",
+        partial(
+            scout_node,
+            tavily_client=tavily_client,
+            search_cache=deps.search_cache,
+            spend_ceiling_usd=deps.spend_ceiling_usd,
+        ),
+    )
     builder.add_node(
         "extract",
         partial(
-            extraction_specialist,
-            tavily_client=deps.tavily_client,
-            openai_client=deps.openai_client,
+            extract_node,
+            tavily_client=tavily_client,
+            openai_client=openai_client,
+            max_concurrency=deps.llm_max_concurrency,
+            llm_batch_size=deps.llm_batch_size,
+            llm_timeout=deps.llm_timeout_s,
+            llm_cache=deps.llm_cache,
+            page_cache=deps.page_cache,
+            page_failure_ttl=deps.page_failure_ttl_s,
+            page_token_budget=deps.page_token_budget,
+            domain_policy=deps.domain_policy,
+            spend_ceiling_usd=deps.spend_ceiling_usd,
         ),
     )
     builder.add_node("organize", path_organizer)
@@ -36,3 +89,16 @@ def build_graph(deps: GraphDeps):
     builder.add_edge("organize", END)
 
     return builder.compile()
+
+
+def build_graph(deps: GraphDeps):
+    if deps.pipeline_mode == "streaming":
+        return _build_streaming_graph(deps)
+    return _build_pipeline_graph(deps, adaptive_scout, extraction_specialist)
+
+
+def build_async_graph(deps: AsyncGraphDeps):
+    # same topology; scout / extract are coroutines, run with graph.astream
+    return _build_pipeline_graph(
+        deps, adaptive_scout_async, extraction_specialist_async
+    )
@@ -0,0 +1,239 @@
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Tavily raw_content is markdown-ish page text: nav menus, cookie banners, image
+# markdown and inline base64 assets often fill the first few thousand characters.
+# condense_page() strips that noise, splits the page into sections and keeps the
+# sections most likely to hold the ProgramRecord fields, within a token budget.
+
+TOKENIZER_ENCODING = "o200k_base"  # gpt-4o / gpt-4o-mini
+CHARS_PER_TOKEN = 4  # fallback estimate when tiktoken is unavailable
+MAX_SECTION_CHARS = 1200
+MIN_SECTION_TOKENS = 40  # don't bother appending a sliver of a section
+
+_DATA_URI_RE = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]\n]*)\]\([^)]*\)")
+_MULTILINE_LINK_RE = re.compile(r"\[([^\]]*\n[^\]]*)\]\([^)]*\)")  # promo cards
+_BARE_URL_RE = re.compile(r"https?://\S+")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_TABLE_RULE_RE = re.compile(r"^[\s|:\-]*$")
+_INLINE_RULE_RE = re.compile(r"(\|\s*:?-{3,}:?\s*)+\|?")
+_EMPHASIS_RE = re.compile(r"\*\*|__")
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+
+# Boilerplate goes in two ways: short lines containing a phrase only site chrome
+# uses, and lines that are nothing but a nav / consent label. Words a syllabus
+# also uses ("JavaScript", "Login flows", "subscribe") never match on their own.
+_BOILERPLATE_RE = re.compile(
+    r"we use cookies|cookies? (policy|settings|preferences|consent)|"
+    r"privacy policy|terms of (use|service)|all rights reserved|©|"
+    r"skip to (main )?content|upgrade your browser|manage preferences",
+    re.IGNORECASE,
+)
+_NAV_LINE_RE = re.compile(
+    r"^\s*(accept (all )?cookies|accept all|reject all|sign (in|up)|log ?in|"
+    r"log ?out|register|subscribe|newsletter|follow us|share( this)?|"
+    r"back to top)[\s.!:]*$",
+    re.IGNORECASE,
+)
+BOILERPLATE_MAX_LINE_CHARS = 160  # long lines mentioning these words are content
+
+# ProgramRecord fields that pages tend to bury below the fold
+FIELD_PATTERNS: dict[str, re.Pattern] = {
+    "price": re.compile(
+        r"\$\s?\d|\busd\b|tuition|\bfees?\b|\bcost\b|\bprice\b|\bfree\b|"
+        r"scholarship|financial aid|per (month|course|class|session)",
+        re.IGNORECASE,
+    ),
+    "duration": re.compile(
+        r"\b\d+\s*(-\s*\d+\s*)?(weeks?|months?|hours?|hrs?|days?|years?|sessions?)\b|"
+        r"self-paced|duration|semester|full-time|part-time",
+        re.IGNORECASE,
+    ),
+    "format": re.compile(
+        r"\bonline\b|in-person|in person|hybrid|remote|on-campus|\bcampus\b|"
+        r"live (classes|sessions|online)|virtual|on-demand",
+        re.IGNORECASE,
+    ),
+    "prerequisites": re.compile(
+        r"prerequisite|requirements?|no (prior )?experience|beginners?|"
+        r"eligib|who (this|it) is for|ideal for|recommended background",
+        re.IGNORECASE,
+    ),
+    "syllabus": re.compile(
+        r"curriculum|syllabus|modules?\b|topics|you will learn|you'll learn|"
+        r"what you learn|course outline|lessons?\b|projects?\b|certificate",
+        re.IGNORECASE,
+    ),
+}
+
+
+def _mentions_field(text: str) -> bool:
+    return any(p.search(text) for p in FIELD_PATTERNS.values())
+
+
+def _is_link_row(line: str) -> bool:
+    # menus / breadcrumbs: two or more links and nothing else on the line
+    links = _LINK_RE.findall(line)
+    if len(links) < 2 or _mentions_field(" ".join(links)):
+        return False
+    return not _LINK_RE.sub("", line).strip(" *-•|>/·,")
+
+
+@lru_cache(maxsize=1)
+def _token_counter() -> Callable[[str], int]:
+    # tiktoken is optional (and downloads its BPE files on first use)
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.info("tiktoken unavailable, estimating tokens from length (%s)", e)
+        return lambda text: (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: str) -> int:
+    return _token_counter()(text)
+
+
+def clean_page(text: str) -> str:
+    text = _DATA_URI_RE.sub("", text)
+    text = _IMAGE_RE.sub("", text)
+    text = _MULTILINE_LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _EMPHASIS_RE.sub("", text)
+
+    out: list[str] = []
+    seen: set[str] = set()
+    for raw in text.splitlines():
+        line = raw.strip()
+        if _is_link_row(line):
+            continue
+        line = _BARE_URL_RE.sub("", _LINK_RE.sub(r"\1", line))
+        if "|" in line:
+            if _TABLE_RULE_RE.match(line):
+                continue
+            # nested tables flatten into one line with inline "| --- |" rules
+            line = _INLINE_RULE_RE.sub(" | ", line)
+            cells = [c.strip() for c in line.strip("|").split("|")]
+            line = " | ".join(c for c in cells if c)
+        line = re.sub(r"\s+", " ", line).strip(" *-•")
+        if not line:
+            # keep paragraph breaks, they delimit sections
+            if out and out[-1]:
+                out.append("")
+            continue
+        if _NAV_LINE_RE.match(line) or (
+            len(line) <= BOILERPLATE_MAX_LINE_CHARS
+            and _BOILERPLATE_RE.search(line)
+            and not _mentions_field(line)
+        ):
+            continue
+        # listing pages repeat the same card text; keep the first copy
+        key = line.lower()
+        if key in seen and len(line) > 3:
+            continue
+        seen.add(key)
+        out.append(line)
+    return "\n".join(out).strip()
+
+
+@dataclass
+class _Section:
+    index: int
+    text: str
+    score: float = 0.0
+
+
+def _split_sections(text: str) -> list[_Section]:
+    blocks: list[list[str]] = [[]]
+    for line in text.split("\n"):
+        if _HEADING_RE.match(line) and blocks[-1]:
+            blocks.append([])
+        if not line and blocks[-1] and sum(len(x) for x in blocks[-1]) >= 400:
+            blocks.append([])
+            continue
+        blocks[-1].append(line)
+
+    sections: list[_Section] = []
+    for block in blocks:
+        body = "\n".join(block).strip()
+        # oversized blocks (one-line tables, long paragraphs) become several sections
+        while body:
+            chunk = body[:MAX_SECTION_CHARS]
+            if len(body) > MAX_SECTION_CHARS:
+                cut = max(chunk.rfind("\n"), chunk.rfind(". "))
+                if cut > MAX_SECTION_CHARS // 2:
+                    chunk = chunk[: cut + 1]
+            sections.append(_Section(index=len(sections), text=chunk.strip()))
+            body = body[len(chunk) :].strip()
+    return sections
+
+
+def _score(section: _Section, query_terms: set[str]) -> float:
+    text = section.text
+    matched = [p for p in FIELD_PATTERNS.values() if p.search(text)]
+    if not matched:
+        score = 0.0
+    else:
+        hits = sum(len(p.findall(text)) for p in matched)
+        # breadth across fields matters more than repeating one keyword
+        score = len(matched) * 2.0 + min(hits, 10) * 0.3
+    if query_terms:
+        lowered = text.lower()
+        score += sum(1 for t in query_terms if t in lowered) * 0.5
+    if section.index == 0:
+        score += 3.0  # title / intro usually carries program name and provider
+    # prefer dense prose over short fragments
+    return score / (1.0 + 200.0 / max(len(text), 1))
+
+
+def _fit(text: str, budget: int) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "..."
+
+
+def condense_page(text: str, token_budget: int, query: str | None = None) -> str:
+    if not text:
+        return ""
+    cleaned = clean_page(text)
+    if count_tokens(cleaned) <= token_budget:
+        return cleaned
+
+    query_terms = {t for t in re.findall(r"[a-z0-9]{4,}", (query or "").lower())}
+    sections = _split_sections(cleaned)
+    for s in sections:
+        s.score = _score(s, query_terms)
+
+    chosen: list[tuple[int, str]] = []
+    remaining = token_budget
+    for s in sorted(sections, key=lambda s: (-s.score, s.index)):
+        if remaining < MIN_SECTION_TOKENS:
+            break
+        if s.score <= 0 and chosen:
+            break
+        cost = count_tokens(s.text) + 1
+        if cost <= remaining:
+            chosen.append((s.index, s.text))
+            remaining -= cost
+        elif remaining >= MIN_SECTION_TOKENS:
+            chosen.append((s.index, _fit(s.text, remaining - 1)))
+            remaining = 0
+
+    # original page order reads better to the model than score order
+    return "\n\n".join(t for _, t in sorted(chosen))
@@ -1,9 +1,87 @@
-from dataclasses import dataclass
-from typing import Optional
-from app.external.protocols import OpenAIClientProtocol, TavilyClientProtocol
+import os
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional
+from app.cache.tiered import TieredCache
+from app.core.env import env_float, env_int
+from app.graph.domains import DomainPolicy
+from app.graph.ratelimit import RateLimiter
+from app.graph.usage import REQUEST_SPEND_CEILING_USD
+from app.external.protocols import (
+    AsyncOpenAIClientProtocol,
+    AsyncTavilyClientProtocol,
+    OpenAIClientProtocol,
+    TavilyClientProtocol,
+)
+from app.graph.nodes.extraction_specialist import (
+    LLM_BATCH_SIZE,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_TOKEN_LIMIT_PER_PAGE,
+    PAGE_FAILURE_TTL_SECONDS,
+)
+
+PipelineMode = Literal["batch", "streaming"]
+
+
+def _pipeline_mode_from_env() -> PipelineMode:
+    mode = (os.getenv("PIPELINE_MODE") or "batch").strip().lower()
+    if mode not in {"batch", "streaming"}:
+        raise RuntimeError(
+            f"PIPELINE_MODE must be 'batch' or 'streaming' (got '{mode}')"
+        )
+    return mode
 
 
 @dataclass
 class GraphDeps:
     openai_client: Optional[OpenAIClientProtocol] = None
     tavily_client: Optional[TavilyClientProtocol] = None
+    llm_max_concurrency: int = field(
+        default_factory=lambda: env_int("LLM_MAX_CONCURRENCY", LLM_MAX_CONCURRENCY)
+    )
+    llm_timeout_s: float = field(
+        default_factory=lambda: env_float("LLM_TIMEOUT_SECONDS", LLM_TIMEOUT_SECONDS)
+    )
+    # pages per structured-output call (batch graph only; streaming is per page)
+    llm_batch_size: int = field(
+        default_factory=lambda: env_int("LLM_BATCH_SIZE", LLM_BATCH_SIZE)
+    )
+    page_token_budget: int = field(
+        default_factory=lambda: env_int(
+            "LLM_PAGE_TOKEN_BUDGET", LLM_TOKEN_LIMIT_PER_PAGE
+        )
+    )
+    llm_cache: Optional[TieredCache] = None
+    search_cache: Optional[TieredCache] = None
+    page_cache: Optional[TieredCache] = None
+    page_failure_ttl_s: float = field(
+        default_factory=lambda: env_float(
+            "PAGE_CACHE_FAILURE_TTL_SECONDS", PAGE_FAILURE_TTL_SECONDS
+        )
+    )
+    domain_policy: Optional[DomainPolicy] = None
+    # stop calling OpenAI / Tavily once a request has spent this much (0 = off)
+    spend_ceiling_usd: float = field(
+        default_factory=lambda: env_float(
+            "REQUEST_SPEND_CEILING_USD", REQUEST_SPEND_CEILING_USD
+        )
+    )
+    pipeline_mode: PipelineMode = field(default_factory=_pipeline_mode_from_env)
+    # process-wide quotas + retry for every OpenAI / Tavily call (None = direct)
+    rate_limiter: Optional[RateLimiter] = None
+
+    def clients(self) -> tuple[Any, Any]:
+        # (openai, tavily) as the nodes should call them
+        if self.rate_limiter is None:
+            return self.openai_client, self.tavily_client
+        return (
+            self.rate_limiter.wrap_openai(self.openai_client),
+            self.rate_limiter.wrap_tavily(self.tavily_client),
+        )
+
+
+@dataclass
+class AsyncGraphDeps(GraphDeps):
+    # same knobs, asyncio clients; pipeline_mode does not apply to the async graph
+    openai_client: Optional[AsyncOpenAIClientProtocol] = None
+    tavily_client: Optional[AsyncTavilyClientProtocol] = None
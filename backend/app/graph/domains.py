@@ -0,0 +1,313 @@
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from pymongo.database import Database
+
+from app.core.env import env_bool, env_float, env_int
+from app.db.mongo import DOMAIN_STATS_COLLECTION
+from app.db.protocols import DomainStatsRepoProtocol
+from app.db.repos import DomainStatsRepo
+from app.graph.state import ProgramRecordGraph
+
+logger = logging.getLogger(__name__)
+
+# Hosts such as forums, salary pages and directory listings burn a Tavily extract
+# and an LLM call, then fail or yield a record that is mostly "Not specified".
+# DomainStats keeps per-host outcome counters; DomainPolicy uses them (plus a
+# configured allow / deny list) to skip or down-rank hosts before extraction.
+# Counters decay exponentially (half-life), so an outage stops counting against a
+# host once it is old, and a skipped host is still extracted now and then (probe)
+# to collect fresh outcomes.
+
+DOMAIN_MIN_SAMPLES = 5
+DOMAIN_SKIP_BELOW_YIELD = 0.15
+DOMAIN_DOWNRANK_BELOW_YIELD = 0.5
+DOMAIN_STATS_REFRESH_SECONDS = 5 * 60
+DOMAIN_STATS_HALF_LIFE_SECONDS = 3 * 24 * 3600
+DOMAIN_PROBE_RATE = 0.05  # chance a skipped host is extracted anyway
+
+# verdict -> counter name reported in metrics["domains"]
+VERDICT_COUNTERS = {
+    "deny": "denied",
+    "skip": "skipped",
+    "downrank": "downranked",
+    "probe": "probed",
+}
+DROP_VERDICTS = {"deny", "skip"}
+
+# ProgramRecord fields the extraction prompt fills with "Not specified"
+NOT_SPECIFIED_FIELDS = (
+    "format",
+    "duration",
+    "cost_text",
+    "prerequisites",
+    "location",
+    "who_this_is_for",
+)
+
+
+def host_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+def _host_matches(host: str, patterns: list[str]) -> bool:
+    # "example.com" also matches its subdomains
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+
+def _decay(age_s: float, half_life_s: float) -> float:
+    if half_life_s <= 0:
+        return 1.0
+    return 0.5 ** (max(age_s, 0.0) / half_life_s)
+
+
+def _epoch(value: Any, default: float) -> float:
+    # decayed_at as stored by Mongo (naive UTC datetime)
+    if not isinstance(value, datetime):
+        return default
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@dataclass
+class DomainCounts:
+    # decayed counts, hence floats
+    extract_attempts: float = 0
+    extract_failures: float = 0
+    llm_attempts: float = 0
+    llm_failures: float = 0
+    fields_total: float = 0
+    fields_not_specified: float = 0
+
+    def add(self, other: "DomainCounts") -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def scaled(self, factor: float) -> "DomainCounts":
+        return DomainCounts(**{k: v * factor for k, v in self.to_dict().items()})
+
+    def to_dict(self) -> dict[str, float]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_dict(cls, doc: dict) -> "DomainCounts":
+        return cls(**{f.name: float(doc.get(f.name) or 0) for f in fields(cls)})
+
+    def yield_score(self) -> float:
+        # fraction of attempts that end as a filled-in program record
+        extract_ok = 1.0
+        if self.extract_attempts:
+            extract_ok -= self.extract_failures / self.extract_attempts
+        llm_ok = 1.0
+        if self.llm_attempts:
+            llm_ok -= self.llm_failures / self.llm_attempts
+        filled = 1.0
+        if self.fields_total:
+            filled -= self.fields_not_specified / self.fields_total
+        return extract_ok * llm_ok * filled
+
+
+class DomainObservations:
+    # per-request outcome tally, flushed into DomainStats once per node run
+
+    def __init__(self) -> None:
+        self.deltas: dict[str, DomainCounts] = {}
+
+    def _counts(self, url: str) -> DomainCounts:
+        return self.deltas.setdefault(host_of(url), DomainCounts())
+
+    def extract(self, url: str, ok: bool) -> None:
+        counts = self._counts(url)
+        counts.extract_attempts += 1
+        counts.extract_failures += int(not ok)
+
+    def llm(self, url: str, program: ProgramRecordGraph | None) -> None:
+        counts = self._counts(url)
+        counts.llm_attempts += 1
+        if program is None:
+            counts.llm_failures += 1
+            return
+        counts.fields_total += len(NOT_SPECIFIED_FIELDS)
+        counts.fields_not_specified += sum(
+            1
+            for name in NOT_SPECIFIED_FIELDS
+            if getattr(program, name) == "Not specified"
+        )
+
+
+class DomainStats:
+    # Per-host counters. With a store, counters live in Mongo (shared across
+    # instances) and are re-read every refresh_seconds; store failures are logged.
+    # Counts are kept as of _as_of[host] and decayed to the clock when read.
+
+    def __init__(
+        self,
+        store: Optional[DomainStatsRepoProtocol] = None,
+        refresh_seconds: float = DOMAIN_STATS_REFRESH_SECONDS,
+        half_life_seconds: float = DOMAIN_STATS_HALF_LIFE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.refresh_seconds = refresh_seconds
+        self.half_life_seconds = half_life_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counts: dict[str, DomainCounts] = {}
+        self._as_of: dict[str, float] = {}
+        self._loaded_at: dict[str, float] = {}
+
+    def _decayed(self, host: str, now: float) -> DomainCounts:
+        age = now - self._as_of[host]
+        return self._counts[host].scaled(_decay(age, self.half_life_seconds))
+
+    def get_many(self, hosts: list[str]) -> dict[str, DomainCounts]:
+        now = self._clock()
+        with self._lock:
+            stale = [
+                h
+                for h in set(hosts)
+                if self.store is not None
+                and now - self._loaded_at.get(h, float("-inf")) >= self.refresh_seconds
+            ]
+
+        if stale:
+            try:
+                docs = self.store.get_many(stale)
+            except Exception:
+                logger.warning(
+                    "domain_stats_get_failed. hosts=%d", len(stale), exc_info=True
+                )
+                docs = None
+            if docs is not None:
+                with self._lock:
+                    for h in stale:
+                        doc = docs.get(h) or {}
+                        self._counts[h] = DomainCounts.from_dict(doc)
+                        self._as_of[h] = _epoch(doc.get("decayed_at"), now)
+                        self._loaded_at[h] = now
+
+        with self._lock:
+            return {h: self._decayed(h, now) for h in hosts if h in self._counts}
+
+    def record(self, deltas: dict[str, DomainCounts]) -> None:
+        if not deltas:
+            return
+        now = self._clock()
+        with self._lock:
+            for h, delta in deltas.items():
+                counts = self._decayed(h, now) if h in self._counts else DomainCounts()
+                counts.add(delta)
+                self._counts[h] = counts
+                self._as_of[h] = now
+
+        if self.store is not None:
+            try:
+                self.store.inc_many(
+                    {h: d.to_dict() for h, d in deltas.items()},
+                    self.half_life_seconds,
+                )
+            except Exception:
+                logger.warning(
+                    "domain_stats_record_failed. hosts=%d", len(deltas), exc_info=True
+                )
+
+
+@dataclass
+class DomainPolicy:
+    allowlist: list[str] = field(default_factory=list)
+    denylist: list[str] = field(default_factory=list)
+    stats: Optional[DomainStats] = None
+    min_samples: int = DOMAIN_MIN_SAMPLES
+    skip_below: float = DOMAIN_SKIP_BELOW_YIELD
+    downrank_below: float = DOMAIN_DOWNRANK_BELOW_YIELD
+    probe_rate: float = DOMAIN_PROBE_RATE
+    rng: Callable[[], float] = random.random
+
+    def _verdicts(self, urls: list[str]) -> dict[str, str]:
+        # host -> "allow" | "deny" | "skip" | "probe" | "downrank" | "ok"
+        hosts = {host_of(u) for u in urls}
+        counts = self.stats.get_many(list(hosts)) if self.stats is not None else {}
+
+        verdicts: dict[str, str] = {}
+        for h in hosts:
+            if _host_matches(h, self.allowlist):
+                verdicts[h] = "allow"
+            elif _host_matches(h, self.denylist):
+                verdicts[h] = "deny"
+            elif h in counts and counts[h].extract_attempts >= self.min_samples:
+                score = counts[h].yield_score()
+                if score < self.skip_below:
+                    # probed hosts are extracted last, like down-ranked ones
+                    probe = self.rng() < self.probe_rate
+                    verdicts[h] = "probe" if probe else "skip"
+                elif score < self.downrank_below:
+                    verdicts[h] = "downrank"
+                else:
+                    verdicts[h] = "ok"
+            else:
+                verdicts[h] = "ok"
+        return verdicts
+
+    def rank(self, urls: list[str]) -> tuple[list[str], dict[str, int]]:
+        # returns (urls to extract, in order; counts of denied / skipped / downranked)
+        verdicts = self._verdicts(urls)
+        kept = [u for u in urls if verdicts[host_of(u)] not in DROP_VERDICTS]
+        # stable: healthy hosts keep their search order, poor hosts go last
+        kept.sort(key=lambda u: verdicts[host_of(u)] in ("downrank", "probe"))
+
+        counts = {name: 0 for name in VERDICT_COUNTERS.values()}
+        for u in urls:
+            verdict = verdicts[host_of(u)]
+            if verdict in VERDICT_COUNTERS:
+                counts[VERDICT_COUNTERS[verdict]] += 1
+        return kept, counts
+
+    def verdict(self, url: str) -> str:
+        return self._verdicts([url])[host_of(url)]
+
+    def record(self, observations: DomainObservations) -> None:
+        if self.stats is not None:
+            self.stats.record(observations.deltas)
+
+
+def _env_hosts(name: str) -> list[str]:
+    # comma-separated hosts; full URLs are accepted too
+    entries = [h.strip() for h in (os.getenv(name) or "").split(",") if h.strip()]
+    return [host_of(h if "://" in h else f"//{h}") for h in entries]
+
+
+def make_domain_policy(db: Database) -> DomainPolicy:
+    store = (
+        DomainStatsRepo(db[DOMAIN_STATS_COLLECTION])
+        if env_bool("DOMAIN_STATS_SHARED", True)
+        else None
+    )
+    stats = DomainStats(
+        store=store,
+        refresh_seconds=env_float(
+            "DOMAIN_STATS_REFRESH_SECONDS", DOMAIN_STATS_REFRESH_SECONDS
+        ),
+        half_life_seconds=env_float(
+            "DOMAIN_STATS_HALF_LIFE_SECONDS", DOMAIN_STATS_HALF_LIFE_SECONDS
+        ),
+    )
+    return DomainPolicy(
+        allowlist=_env_hosts("DOMAIN_ALLOWLIST"),
+        denylist=_env_hosts("DOMAIN_DENYLIST"),
+        stats=stats,
+        min_samples=env_int("DOMAIN_MIN_SAMPLES", DOMAIN_MIN_SAMPLES),
+        skip_below=env_float("DOMAIN_SKIP_BELOW_YIELD", DOMAIN_SKIP_BELOW_YIELD),
+        downrank_below=env_float(
+            "DOMAIN_DOWNRANK_BELOW_YIELD", DOMAIN_DOWNRANK_BELOW_YIELD
+        ),
+        probe_rate=env_float("DOMAIN_PROBE_RATE", DOMAIN_PROBE_RATE),
+    )
@@ -1,3 +1,4 @@
-from .adaptive_scout import adaptive_scout
-from .extraction_specialist import extraction_specialist
+from .adaptive_scout import adaptive_scout, adaptive_scout_async
+from .extraction_specialist import extraction_specialist, extraction_specialist_async
 from .path_organizer import path_organizer
+from .streaming_pipeline import streaming_pipeline
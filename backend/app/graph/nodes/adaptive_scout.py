@@ -1,9 +1,16 @@
-from app.external.protocols import TavilyClientProtocol
+import asyncio
+from typing import Any
+
+from app.cache.keys import make_key
+from app.cache.tiered import TieredCache
+from app.external.protocols import AsyncTavilyClientProtocol, TavilyClientProtocol
 from app.graph.state import GraphState, InputPrefs, RawLead
+from app.graph.usage import REQUEST_SPEND_CEILING_USD, UsageMeter, spent_usd
 
 MAX_SEARCH_QUERIES = 3
 RESULTS_PER_QUERY = 6
 MAX_LEADS_TOTAL = 12
+SEARCH_DEPTH = "basic"
 
 
 def _build_queries(query: str, prefs: InputPrefs | None) -> list[str]:
@@ -32,8 +39,82 @@ def _build_queries(query: str, prefs: InputPrefs | None) -> list[str]:
     return search_queries[:MAX_SEARCH_QUERIES]
 
 
+def _search_cache_key(q: str) -> str:
+    normalized = " ".join(q.lower().split())
+    return make_key("search", normalized, RESULTS_PER_QUERY, SEARCH_DEPTH)
+
+
+def _search(tavily_client: TavilyClientProtocol, q: str) -> list[dict[str, Any]]:
+    res = tavily_client.search(
+        query=q,
+        max_results=RESULTS_PER_QUERY,
+        search_depth=SEARCH_DEPTH,
+    )
+    # [title, url, content, score, raw_content, favicon]
+    return res.get("results") or []
+
+
+def _to_lead(res: dict[str, Any]) -> RawLead | None:
+    url = res.get("url")
+    if not url:
+        return None
+    return {
+        "url": url,
+        "title": res.get("title"),
+        "snippet": res.get("content"),
+        "source": url.split("//")[-1].split("/")[0].replace("www.", ""),
+    }
+
+
+def _lookup_searches(
+    search_cache: TieredCache | None, search_queries: list[str]
+) -> tuple[dict[str, str], dict[str, list[dict[str, Any]]]]:
+    # returns (query -> cache key, query -> cached results)
+    if search_cache is None:
+        return {}, {}
+    cache_keys = {q: _search_cache_key(q) for q in search_queries}
+    found = search_cache.get_many(list(cache_keys.values()))
+    return cache_keys, {q: found[k] for q, k in cache_keys.items() if k in found}
+
+
+def _scout_updates(
+    search_queries: list[str],
+    results_by_query: dict[str, list[dict[str, Any]]],
+    warnings: list[str],
+    cache_stats: dict[str, int] | None,
+    meter: UsageMeter,
+) -> GraphState:
+    # 3) map to RawLead list (query order, then result order)
+    new_leads: list[RawLead] = []
+    seen_urls: set[str] = set()
+
+    raw_results = [r for q in search_queries for r in results_by_query.get(q, [])]
+    for res in raw_results:
+        lead = _to_lead(res)
+        if lead and lead["url"] not in seen_urls:
+            seen_urls.add(lead["url"])
+            new_leads.append(lead)
+            if len(new_leads) >= MAX_LEADS_TOTAL:
+                break
+
+    if not new_leads:
+        warnings.append("Adaptive Scout: No relevant learning leads found.")
+
+    updates: GraphState = {"raw_leads": new_leads}
+    if warnings:
+        updates["warnings"] = warnings
+    metrics: dict[str, Any] = {"usage": {"scout": meter.to_dict()}}
+    if cache_stats is not None:
+        metrics["search_cache"] = cache_stats
+    updates["metrics"] = metrics
+    return updates
+
+
 def adaptive_scout(
-    state: GraphState, tavily_client: TavilyClientProtocol
+    state: GraphState,
+    tavily_client: TavilyClientProtocol,
+    search_cache: TieredCache | None = None,
+    spend_ceiling_usd: float = REQUEST_SPEND_CEILING_USD,
 ) -> GraphState:
     inp = state.get("input") or {}
     query = inp.get("query")
@@ -44,47 +125,86 @@ def adaptive_scout(
 
     # 1) build 2–3 search queries from query + prefs
     search_queries = _build_queries(query, prefs)
+    meter = UsageMeter(spent_usd(state.get("metrics")), spend_ceiling_usd)
+    tavily_client = meter.wrap_tavily(tavily_client)
 
-    # 2) call Tavily search
+    # 2) call Tavily search (served from the search cache when possible)
     warnings: list[str] = []
-    raw_results = []
-    for q in search_queries:
-        try:
-            res = tavily_client.search(
-                query=q,
-                max_results=RESULTS_PER_QUERY,
-                search_depth="basic",
-            )
+    cache_keys, results_by_query = _lookup_searches(search_cache, search_queries)
+    misses = [q for q in search_queries if q not in results_by_query]
 
-            raw_results.extend(
-                res.get("results") or []
-            )  # [title, url, content, score, raw_content, favicon]
+    to_cache: dict[str, Any] = {}
+    for q in misses:
+        try:
+            results_by_query[q] = _search(tavily_client, q)
+            if search_cache is not None:
+                to_cache[cache_keys[q]] = results_by_query[q]
         except Exception as e:
             warnings.append(f"Adaptive Scout: Search failed for query '{q}' ({str(e)})")
 
-    # 3) map to RawLead list
-    new_leads: list[RawLead] = []
-    seen_urls: set[str] = set()
+    if to_cache:
+        search_cache.set_many(to_cache)
 
-    for res in raw_results:
-        url = res.get("url")
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            new_leads.append(
-                {
-                    "url": url,
-                    "title": res.get("title"),
-                    "snippet": res.get("content"),
-                    "source": url.split("//")[-1].split("/")[0].replace("www.", ""),
-                }
-            )
-            if len(new_leads) >= MAX_LEADS_TOTAL:
-                break
+    cache_stats = None
+    if search_cache is not None:
+        cache_stats = {"hits": len(search_queries) - len(misses), "misses": len(misses)}
+    return _scout_updates(
+        search_queries, results_by_query, warnings, cache_stats, meter
+    )
 
-    if not new_leads:
-        warnings.append("Adaptive Scout: No relevant learning leads found.")
 
-    updates: GraphState = {"raw_leads": new_leads}
-    if warnings:
-        updates["warnings"] = warnings
-    return updates
+async def adaptive_scout_async(
+    state: GraphState,
+    tavily_client: AsyncTavilyClientProtocol,
+    search_cache: TieredCache | None = None,
+    spend_ceiling_usd: float = REQUEST_SPEND_CEILING_USD,
+) -> GraphState:
+    inp = state.get("input") or {}
+    query = inp.get("query")
+    prefs = inp.get("prefs")
+
+    if not query:
+        return {"warnings": ["Adaptive Scout: Missing input.query."]}
+
+    search_queries = _build_queries(query, prefs)
+    meter = UsageMeter(spent_usd(state.get("metrics")), spend_ceiling_usd)
+    tavily_client = meter.wrap_tavily(tavily_client)
+
+    # cache tiers are synchronous (Mongo tier included), keep them off the loop
+    warnings: list[str] = []
+    cache_keys, results_by_query = await asyncio.to_thread(
+        _lookup_searches, search_cache, search_queries
+    )
+    misses = [q for q in search_queries if q not in results_by_query]
+
+    # all cache-miss searches run concurrently
+    responses = await asyncio.gather(
+        *[
+            tavily_client.search(
+                query=q, max_results=RESULTS_PER_QUERY, search_depth=SEARCH_DEPTH
+            )
+            for q in misses
+        ],
+        return_exceptions=True,
+    )
+
+    to_cache: dict[str, Any] = {}
+    for q, res in zip(misses, responses):
+        if isinstance(res, Exception):
+            warnings.append(
+                f"Adaptive Scout: Search failed for query '{q}' ({str(res)})"
+            )
+            continue
+        results_by_query[q] = res.get("results") or []
+        if search_cache is not None:
+            to_cache[cache_keys[q]] = results_by_query[q]
+
+    if to_cache:
+        await asyncio.to_thread(search_cache.set_many, to_cache)
+
+    cache_stats = None
+    if search_cache is not None:
+        cache_stats = {"hits": len(search_queries) - len(misses), "misses": len(misses)}
+    return _scout_updates(
+        search_queries, results_by_query, warnings, cache_stats, meter
+    )
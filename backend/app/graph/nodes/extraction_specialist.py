@@ -1,15 +1,52 @@
+import asyncio
+import hashlib
+import logging
 import re
-
-from app.external.protocols import TavilyClientProtocol, OpenAIClientProtocol
-from app.graph.state import GraphState, ProgramRecordGraph, RawLead
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from app.cache.keys import canonical_url, make_key
+from app.cache.tiered import TieredCache
+from app.graph.condense import condense_page
+from app.graph.domains import DomainObservations, DomainPolicy
+from app.graph.progress import ProgramCallback, program_emitter
+from app.external.protocols import (
+    AsyncOpenAIClientProtocol,
+    AsyncTavilyClientProtocol,
+    OpenAIClientProtocol,
+    TavilyClientProtocol,
+)
+from app.graph.state import (
+    GraphState,
+    ProgramRecordBatch,
+    ProgramRecordGraph,
+    RawLead,
+)
+from app.graph.usage import (
+    REQUEST_SPEND_CEILING_USD,
+    SpendCeilingExceeded,
+    UsageMeter,
+    spent_usd,
+)
+
+logger = logging.getLogger(__name__)
 
 
 MAX_URLS_TO_EXTRACT = 10
 LLM_TOKEN_LIMIT_PER_PAGE = 1800
-MAX_CHARS_PER_PAGE = LLM_TOKEN_LIMIT_PER_PAGE * 4
-
-
-def _dedupe_and_select_urls(leads: list[RawLead], max_urls: int) -> list[str]:
+LLM_MAX_CONCURRENCY = 5
+LLM_TIMEOUT_SECONDS = 30.0
+LLM_MODEL = "gpt-4o-mini"
+LLM_BATCH_SIZE = 1  # pages per structured-output call; 1 = one call per page
+LLM_MAX_OUTPUT_TOKENS = 600
+PAGE_FAILURE_TTL_SECONDS = 15 * 60
+
+
+def _dedupe_and_select_urls(
+    leads: list[RawLead], max_urls: int, domain_policy: DomainPolicy | None = None
+) -> tuple[list[str], dict[str, int]]:
+    # returns (selected urls, domain filter counts)
     seen: set[str] = set()
     out: list[str] = []
     for lead in leads:
@@ -20,25 +57,41 @@ def _dedupe_and_select_urls(leads: list[RawLead], max_urls: int) -> list[str]:
             continue
         seen.add(url)
         out.append(url)
-        if len(out) >= max_urls:
+        if domain_policy is None and len(out) >= max_urls:
             break
-    return out
+
+    if domain_policy is None:
+        return out, {}
+    # denied / low-yield hosts are dropped, poor hosts move behind healthy ones
+    ranked, domain_counts = domain_policy.rank(out)
+    return ranked[:max_urls], domain_counts
 
 
 def _extract_pages(
     tavily_client: TavilyClientProtocol, urls: list[str]
-) -> tuple[dict[str, str], list[str]]:
-    url_to_text: dict[str, str] = {}
-    warnings: list[str] = []
-
+) -> tuple[dict[str, str], list[str], dict[str, str]]:
     if not urls:
-        return {}, []
+        return {}, [], {}
     res = tavily_client.extract(urls=urls, extract_depth="basic")
+    return _parse_extract_response(res)
+
+
+def _parse_extract_response(
+    res: Any,
+) -> tuple[dict[str, str], list[str], dict[str, str]]:
+    # returns (url -> text, warnings, url -> error for Tavily failed_results)
+    url_to_text: dict[str, str] = {}
+    warnings: list[str] = []
+    failed: dict[str, str] = {}
 
     if not isinstance(res, dict):
-        return {}, [
-            "Extraction Specialist: Tavily extract returned unexpected response type."
-        ]
+        return (
+            {},
+            [
+                "Extraction Specialist: Tavily extract returned unexpected response type."
+            ],
+            {},
+        )
 
     results = res.get("results") or []  # [url, raw_content]
     if isinstance(results, list):
@@ -66,21 +119,52 @@ def _extract_pages(
             warnings.append(
                 f"Extraction Specialist: Tavily extract failed for {u} ({err})"
             )
-
-    return url_to_text, warnings
-
-
-def _truncate_for_llm(text: str, max_chars: int) -> str:
-    if not text:
-        return ""
-    text = text.strip()
-    if len(text) <= max_chars:
-        return text
-
-    head_len = int(max_chars * 0.7)
-    tail_len = max_chars - head_len - 3  # "..."
-
-    return text[:head_len] + "..." + text[-tail_len:]
+            if item.get("url"):
+                failed[u] = err
+
+    return url_to_text, warnings, failed
+
+
+def _cached_pages(
+    page_cache: TieredCache, urls: list[str]
+) -> tuple[dict[str, str], dict[str, str]]:
+    # returns (url -> text, url -> error) for fresh and negatively cached pages
+    keys = {url: make_key("page", canonical_url(url)) for url in urls}
+    found = page_cache.get_many(list(keys.values()))
+    texts: dict[str, str] = {}
+    failures: dict[str, str] = {}
+    for url, key in keys.items():
+        entry = found.get(key)
+        if not isinstance(entry, dict):
+            continue
+        if entry.get("error"):
+            failures[url] = entry["error"]
+        elif entry.get("text"):
+            try:
+                texts[url] = zlib.decompress(entry["text"]).decode("utf-8")
+            except (zlib.error, TypeError, UnicodeDecodeError):
+                continue
+    return texts, failures
+
+
+def _store_pages(
+    page_cache: TieredCache,
+    texts: dict[str, str],
+    failures: dict[str, str],
+    failure_ttl: float,
+) -> None:
+    page_cache.set_many(
+        {
+            make_key("page", canonical_url(u)): {
+                "text": zlib.compress(t.encode("utf-8"))
+            }
+            for u, t in texts.items()
+        }
+    )
+    page_cache.set_many(
+        {make_key("page", canonical_url(u)): {"error": e} for u, e in failures.items()},
+        ttl_seconds=failure_ttl,
+    )
 
 
 _SYSTEM_PROMPT = """
@@ -116,28 +200,91 @@ Field rules:
 - source_link and citation: always set both to the provided URL exactly.
 """.strip()
 
+# Changes whenever the prompt text changes, invalidating cached extractions
+_SYSTEM_PROMPT_VERSION = hashlib.sha256(_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
 
-def _llm_program_record(
-    openai_client: OpenAIClientProtocol, url: str, page_text: str
-) -> dict:
+_BATCH_PREAMBLE = """
+The user message contains several webpages, each introduced by a "=== PAGE n ===" line
+followed by "URL: <url>". Treat every page independently and return {"records": [...]}
+with exactly one ProgramRecord per page, in page order. Never mix facts across pages.
+The rules below describe a single record; source_link and citation must be that page's URL.
+""".strip()
+
+_BATCH_SYSTEM_PROMPT = _BATCH_PREAMBLE + "\n\n" + _SYSTEM_PROMPT
+
+
+def _llm_request(url: str, page_text: str, timeout: float | None) -> dict[str, Any]:
     messages: list[dict[str, Any]] = [
         {"role": "system", "content": str(_SYSTEM_PROMPT)},
         {"role": "user", "content": f"URL: {url}\n\nText:\n{page_text}"},
     ]
+    return {
+        "model": LLM_MODEL,
+        "temperature": 0,  # ensure deterministic output
+        "input": messages,
+        "text_format": ProgramRecordGraph,
+        "max_output_tokens": LLM_MAX_OUTPUT_TOKENS,
+        "timeout": timeout,
+    }
 
-    resp = openai_client.responses.parse(
-        model="gpt-4o-mini",
-        temperature=0,  # ensure deterministic output
-        input=messages,
-        text_format=ProgramRecordGraph,
-        max_output_tokens=600,
-    )
 
+def _parsed_record(resp: Any) -> dict:
     parsed = getattr(resp, "output_parsed", None) or resp.output[0].parsed
-
     return parsed.model_dump()
 
 
+def _llm_program_record(
+    openai_client: OpenAIClientProtocol,
+    url: str,
+    page_text: str,
+    timeout: float | None = None,
+) -> dict:
+    resp = openai_client.responses.parse(**_llm_request(url, page_text, timeout))
+    return _parsed_record(resp)
+
+
+def _batch_request(
+    pages: list[tuple[str, str]], timeout: float | None
+) -> dict[str, Any]:
+    body = "\n\n".join(
+        f"=== PAGE {i + 1} ===\nURL: {url}\n\nText:\n{text}"
+        for i, (url, text) in enumerate(pages)
+    )
+    return {
+        "model": LLM_MODEL,
+        "temperature": 0,
+        "input": [
+            {"role": "system", "content": _BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": body},
+        ],
+        "text_format": ProgramRecordBatch,
+        "max_output_tokens": LLM_MAX_OUTPUT_TOKENS * len(pages),
+        "timeout": timeout,
+    }
+
+
+def _batch_records(
+    resp: Any, pages: list[tuple[str, str]]
+) -> dict[str, ProgramRecordGraph]:
+    # url -> validated record; pages without a usable record are left out
+    parsed = getattr(resp, "output_parsed", None) or resp.output[0].parsed
+    by_url: dict[str, ProgramRecordGraph] = {}
+    for rec in getattr(parsed, "records", None) or []:
+        by_url.setdefault(canonical_url(rec.source_link), rec)
+
+    out: dict[str, ProgramRecordGraph] = {}
+    for url, _ in pages:
+        rec = by_url.get(canonical_url(url))
+        if rec is None:
+            continue
+        try:
+            rec_dict = _enforce_invariants(rec.model_dump(), url)
+            out[url] = ProgramRecordGraph.model_validate(rec_dict)
+        except Exception:
+            continue
+    return out
+
+
 _USD_RE = re.compile(r"\$?\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?)\s*(USD|usd|\$)?")
 
 
@@ -166,58 +313,509 @@ def _enforce_invariants(rec: dict, url: str) -> dict:
     return rec
 
 
-def extraction_specialist(
-    state: GraphState,
-    tavily_client: TavilyClientProtocol,
+def _llm_cache_key(url: str, llm_text: str) -> str:
+    # (URL, hash of the text actually sent to the LLM, prompt version, model)
+    text_hash = hashlib.sha256(llm_text.encode("utf-8")).hexdigest()
+    return make_key("llm", url, text_hash, _SYSTEM_PROMPT_VERSION, LLM_MODEL)
+
+
+def _cached_programs(
+    llm_cache: TieredCache, keys: dict[str, str]
+) -> dict[str, ProgramRecordGraph]:
+    # url -> cached program; entries that no longer validate count as misses
+    found = llm_cache.get_many(list(keys.values()))
+    out: dict[str, ProgramRecordGraph] = {}
+    for url, key in keys.items():
+        if key not in found:
+            continue
+        try:
+            out[url] = ProgramRecordGraph.model_validate(found[key])
+        except Exception:
+            continue
+    return out
+
+
+def _extract_program(
+    openai_client: OpenAIClientProtocol, url: str, llm_text: str, timeout: float
+) -> ProgramRecordGraph:
+    # mapping text → structured ProgramRecord + Enforce no-guessing
+    rec_dict = _llm_program_record(openai_client, url, llm_text, timeout=timeout)
+    #  normalize + set source_link/citation
+    rec_dict = _enforce_invariants(rec_dict, url)
+    return ProgramRecordGraph.model_validate(rec_dict)
+
+
+async def _extract_program_async(
+    openai_client: AsyncOpenAIClientProtocol,
+    url: str,
+    llm_text: str,
+    timeout: float,
+) -> ProgramRecordGraph:
+    resp = await openai_client.responses.parse(**_llm_request(url, llm_text, timeout))
+    rec_dict = _enforce_invariants(_parsed_record(resp), url)
+    return ProgramRecordGraph.model_validate(rec_dict)
+
+
+def _extract_each(
     openai_client: OpenAIClientProtocol,
-) -> GraphState:
+    pages: list[tuple[str, str]],
+    max_concurrency: int,
+    timeout: float,
+    on_program: ProgramCallback | None = None,
+) -> list[ProgramRecordGraph | Exception]:
+    # Returns one outcome per (url, page_text), in the same order as `pages`;
+    # on_program sees each program as soon as its call completes
+    def run_one(page: tuple[str, str]) -> ProgramRecordGraph | Exception:
+        url, page_text = page
+        try:
+            program = _extract_program(openai_client, url, page_text, timeout)
+        except Exception as e:
+            return e
+        if on_program is not None:
+            on_program(program)
+        return program
+
+    workers = min(max(max_concurrency, 1), len(pages))
+    if workers <= 1:
+        return [run_one(page) for page in pages]
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="llm-extract"
+    ) as pool:
+        return list(pool.map(run_one, pages))
+
+
+def _batches(
+    pages: list[tuple[str, str]], batch_size: int
+) -> list[list[tuple[str, str]]]:
+    return [pages[i : i + batch_size] for i in range(0, len(pages), batch_size)]
+
+
+def _merge_batched(
+    pages: list[tuple[str, str]],
+    found: dict[str, ProgramRecordGraph],
+    fallback: dict[str, ProgramRecordGraph | Exception],
+) -> list[ProgramRecordGraph | Exception]:
+    return [found[url] if url in found else fallback[url] for url, _ in pages]
+
+
+def _extract_batch(
+    openai_client: OpenAIClientProtocol, batch: list[tuple[str, str]], timeout: float
+) -> dict[str, ProgramRecordGraph]:
+    try:
+        resp = openai_client.responses.parse(**_batch_request(batch, timeout))
+        return _batch_records(resp, batch)
+    except Exception as e:
+        logger.warning("llm_batch_failed. pages=%d error=%s", len(batch), e)
+        return {}
+
+
+def _extract_programs(
+    openai_client: OpenAIClientProtocol,
+    pages: list[tuple[str, str]],
+    max_concurrency: int,
+    timeout: float,
+    batch_size: int = LLM_BATCH_SIZE,
+    on_program: ProgramCallback | None = None,
+) -> list[ProgramRecordGraph | Exception]:
+    # Returns one outcome per (url, page_text), in the same order as `pages`.
+    # With batch_size > 1 pages share structured-output calls; any page without a
+    # valid record in its batch falls back to its own call.
+    if batch_size <= 1 or len(pages) <= 1:
+        return _extract_each(openai_client, pages, max_concurrency, timeout, on_program)
+
+    batches = _batches(pages, batch_size)
+    workers = min(max(max_concurrency, 1), len(batches))
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="llm-batch"
+    ) as pool:
+        found: dict[str, ProgramRecordGraph] = {}
+        for records in pool.map(
+            lambda batch: _extract_batch(openai_client, batch, timeout), batches
+        ):
+            found.update(records)
+            if on_program is not None:
+                for program in records.values():
+                    on_program(program)
+
+    retry = [(url, text) for url, text in pages if url not in found]
+    fallback = dict(
+        zip(
+            [url for url, _ in retry],
+            _extract_each(openai_client, retry, max_concurrency, timeout, on_program),
+        )
+    )
+    return _merge_batched(pages, found, fallback)
+
+
+async def _extract_batch_async(
+    openai_client: AsyncOpenAIClientProtocol,
+    batch: list[tuple[str, str]],
+    timeout: float,
+) -> dict[str, ProgramRecordGraph]:
+    try:
+        resp = await openai_client.responses.parse(**_batch_request(batch, timeout))
+        return _batch_records(resp, batch)
+    except Exception as e:
+        logger.warning("llm_batch_failed. pages=%d error=%s", len(batch), e)
+        return {}
+
+
+async def _extract_each_async(
+    openai_client: AsyncOpenAIClientProtocol,
+    pages: list[tuple[str, str]],
+    sem: asyncio.Semaphore,
+    timeout: float,
+    on_program: ProgramCallback | None = None,
+) -> list[ProgramRecordGraph | Exception]:
+    async def run_one(url: str, page_text: str) -> ProgramRecordGraph:
+        async with sem:
+            program = await _extract_program_async(
+                openai_client, url, page_text, timeout
+            )
+        if on_program is not None:
+            on_program(program)
+        return program
+
+    return list(
+        await asyncio.gather(
+            *[run_one(url, text) for url, text in pages], return_exceptions=True
+        )
+    )
+
+
+async def _extract_programs_async(
+    openai_client: AsyncOpenAIClientProtocol,
+    pages: list[tuple[str, str]],
+    max_concurrency: int,
+    timeout: float,
+    batch_size: int = LLM_BATCH_SIZE,
+    on_program: ProgramCallback | None = None,
+) -> list[ProgramRecordGraph | Exception]:
+    # Same contract as _extract_programs, bounded by a semaphore instead of a pool
+    sem = asyncio.Semaphore(max(max_concurrency, 1))
+    if batch_size <= 1 or len(pages) <= 1:
+        return await _extract_each_async(openai_client, pages, sem, timeout, on_program)
+
+    async def run_batch(batch: list[tuple[str, str]]) -> dict[str, ProgramRecordGraph]:
+        async with sem:
+            records = await _extract_batch_async(openai_client, batch, timeout)
+        if on_program is not None:
+            for program in records.values():
+                on_program(program)
+        return records
+
+    found: dict[str, ProgramRecordGraph] = {}
+    for records in await asyncio.gather(
+        *[run_batch(batch) for batch in _batches(pages, batch_size)]
+    ):
+        found.update(records)
+
+    retry = [(url, text) for url, text in pages if url not in found]
+    fallback = dict(
+        zip(
+            [url for url, _ in retry],
+            await _extract_each_async(openai_client, retry, sem, timeout, on_program),
+        )
+    )
+    return _merge_batched(pages, found, fallback)
+
+
+class _ExtractionRun:
+    # Per-request bookkeeping shared by the sync and async nodes; the nodes only
+    # differ in how they call Tavily / OpenAI (and the caches) in between steps.
+
+    def __init__(
+        self,
+        selected_urls: list[str],
+        llm_cache: TieredCache | None,
+        page_cache: TieredCache | None,
+        page_failure_ttl: float,
+        page_token_budget: int,
+        query: str | None,
+        meter: UsageMeter,
+        domain_policy: DomainPolicy | None = None,
+        domain_counts: dict[str, int] | None = None,
+    ):
+        self.selected_urls = selected_urls
+        self.llm_cache = llm_cache
+        self.page_cache = page_cache
+        self.page_failure_ttl = page_failure_ttl
+        self.page_token_budget = page_token_budget
+        self.query = query
+        self.meter = meter
+        self.domain_policy = domain_policy
+        self.domain_counts = domain_counts or {}
+        self.observations = DomainObservations()
+        self.warnings: list[str] = []
+        self.extracted: list[ProgramRecordGraph] = []
+        self.url_to_text: dict[str, str] = {}
+        self.cached_texts: dict[str, str] = {}
+        self.cached_failures: dict[str, str] = {}
+        self.to_fetch: list[str] = []
+        self.pages: list[tuple[str, str]] = []
+        self.cache_keys: dict[str, str] = {}
+        self.cached: dict[str, ProgramRecordGraph] = {}
+        self.misses: list[tuple[str, str]] = []
+        self.ceiling_skipped: list[str] = []
+
+    def lookup_pages(self) -> list[str]:
+        # returns the URLs that still need a Tavily extract
+        if self.page_cache is not None:
+            self.cached_texts, self.cached_failures = _cached_pages(
+                self.page_cache, self.selected_urls
+            )
+            for u, err in self.cached_failures.items():
+                self.warnings.append(
+                    f"Extraction Specialist: Tavily extract failed for {u} ({err}, cached)"
+                )
+        self.to_fetch = [
+            u
+            for u in self.selected_urls
+            if u not in self.cached_texts and u not in self.cached_failures
+        ]
+        return self.to_fetch
+
+    def add_fetched(
+        self, fetched: tuple[dict[str, str], list[str], dict[str, str]]
+    ) -> None:
+        url_to_text, extract_warnings, failed = fetched
+        self.warnings.extend(extract_warnings)
+        if self.page_cache is not None:
+            _store_pages(self.page_cache, url_to_text, failed, self.page_failure_ttl)
+        self.url_to_text = url_to_text
+        for u in self.to_fetch:
+            self.observations.extract(u, ok=bool((url_to_text.get(u) or "").strip()))
+
+    def fetch_failed(self, e: Exception) -> None:
+        self.warnings.append(
+            f"Extraction Specialist: Tavily batch extract failed ({str(e)})"
+        )
+        self.url_to_text = {}
+
+    def lookup_programs(self) -> list[tuple[str, str]]:
+        # returns the (url, llm_text) pages that still need an LLM call
+        url_to_text = {**self.cached_texts, **self.url_to_text}
+        for url in self.selected_urls:
+            page_text = (url_to_text.get(url) or "").strip()
+            if page_text:
+                # strip boilerplate, keep the most field-relevant sections in budget
+                llm_text = condense_page(page_text, self.page_token_budget, self.query)
+                self.pages.append((url, llm_text))
+
+        if self.llm_cache is not None:
+            self.cache_keys = {
+                url: _llm_cache_key(url, text) for url, text in self.pages
+            }
+            self.cached = _cached_programs(self.llm_cache, self.cache_keys)
+
+        self.misses = [
+            (url, text) for url, text in self.pages if url not in self.cached
+        ]
+        return self.misses
+
+    def add_outcomes(self, outcomes: list[ProgramRecordGraph | Exception]) -> None:
+        by_url = dict(zip([url for url, _ in self.misses], outcomes))
+        to_cache: dict[str, Any] = {}
+        for url, _ in self.pages:
+            if url in self.cached:
+                self.extracted.append(self.cached[url])
+                continue
+            outcome = by_url[url]
+            if isinstance(outcome, SpendCeilingExceeded):
+                # never sent, so not a failure of the host
+                self.ceiling_skipped.append(url)
+                continue
+            if isinstance(outcome, Exception):
+                self.observations.llm(url, None)
+                self.warnings.append(
+                    f"Extraction Specialist: Failed for {url} ({str(outcome)})"
+                )
+                continue
+            self.observations.llm(url, outcome)
+            self.extracted.append(outcome)
+            if self.llm_cache is not None:
+                to_cache[self.cache_keys[url]] = outcome.model_dump()
+
+        if to_cache:
+            self.llm_cache.set_many(to_cache)
+        if self.domain_policy is not None:
+            # only fresh outcomes count; cache hits would double count a host
+            self.domain_policy.record(self.observations)
+
+    def updates(self) -> GraphState:
+        if self.ceiling_skipped:
+            self.warnings.append(
+                "Extraction Specialist: Spend ceiling reached; skipped "
+                f"{len(self.ceiling_skipped)} page(s)."
+            )
+        if not self.extracted:
+            self.warnings.append("Extraction Specialist: No programs extracted.")
+
+        updates: GraphState = {"extracted_programs": self.extracted}
+        if self.warnings:
+            updates["warnings"] = self.warnings
+        metrics: dict[str, Any] = {"usage": {"extract": self.meter.to_dict()}}
+        if self.llm_cache is not None:
+            metrics["llm_cache"] = {
+                "hits": len(self.cached),
+                "misses": len(self.misses),
+            }
+        if self.page_cache is not None:
+            metrics["page_cache"] = {
+                "hits": len(self.cached_texts),
+                "negative_hits": len(self.cached_failures),
+                "misses": len(self.to_fetch),
+            }
+        if self.domain_policy is not None:
+            metrics["domains"] = self.domain_counts
+        updates["metrics"] = metrics
+        return updates
+
+
+def _select_urls(
+    state: GraphState, domain_policy: DomainPolicy | None
+) -> tuple[list[str], dict[str, int], GraphState | None]:
+    # returns (selected_urls, domain filter counts, early_exit_updates)
     leads = state.get("raw_leads") or []
     if not leads:
-        return {"warnings": ["Extraction Specialist: raw_leads is empty (unexpected)."]}
+        return (
+            [],
+            {},
+            {"warnings": ["Extraction Specialist: raw_leads is empty (unexpected)."]},
+        )
 
-    # 1) select top N leads
-    selected_urls = _dedupe_and_select_urls(leads, MAX_URLS_TO_EXTRACT)
+    selected_urls, domain_counts = _dedupe_and_select_urls(
+        leads, MAX_URLS_TO_EXTRACT, domain_policy
+    )
     if not selected_urls:
-        return {
-            "warnings": ["Extraction Specialist: No valid URLs found in raw_leads."]
-        }
+        warning = "Extraction Specialist: No valid URLs found in raw_leads."
+        if domain_counts.get("denied") or domain_counts.get("skipped"):
+            warning = (
+                "Extraction Specialist: All leads were filtered by the domain "
+                f"policy (denied={domain_counts['denied']}, "
+                f"skipped={domain_counts['skipped']})."
+            )
+        early_exit: GraphState = {"warnings": [warning]}
+        if domain_policy is not None:
+            early_exit["metrics"] = {"domains": domain_counts}
+        return [], domain_counts, early_exit
+    return selected_urls, domain_counts, None
 
-    # 2) Tavily extract -> OpenAI structured output
-    extracted: list[ProgramRecordGraph] = []
-    warnings: list[str] = []
-    # 2) Tavily batch extract
+
+def extraction_specialist(
+    state: GraphState,
+    tavily_client: TavilyClientProtocol,
+    openai_client: OpenAIClientProtocol,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    llm_timeout: float = LLM_TIMEOUT_SECONDS,
+    llm_cache: TieredCache | None = None,
+    page_cache: TieredCache | None = None,
+    page_failure_ttl: float = PAGE_FAILURE_TTL_SECONDS,
+    page_token_budget: int = LLM_TOKEN_LIMIT_PER_PAGE,
+    domain_policy: DomainPolicy | None = None,
+    llm_batch_size: int = LLM_BATCH_SIZE,
+    spend_ceiling_usd: float = REQUEST_SPEND_CEILING_USD,
+) -> GraphState:
+    # 1) select top N leads (domain allow / deny list + historical yield)
+    selected_urls, domain_counts, early_exit = _select_urls(state, domain_policy)
+    if early_exit is not None:
+        return early_exit
+
+    # every Tavily / OpenAI call below is metered against the request's ceiling
+    meter = UsageMeter(spent_usd(state.get("metrics")), spend_ceiling_usd)
+    tavily_client = meter.wrap_tavily(tavily_client)
+    openai_client = meter.wrap_openai(openai_client)
+
+    run = _ExtractionRun(
+        selected_urls,
+        llm_cache,
+        page_cache,
+        page_failure_ttl,
+        page_token_budget,
+        query=(state.get("input") or {}).get("query"),
+        meter=meter,
+        domain_policy=domain_policy,
+        domain_counts=domain_counts,
+    )
+
+    # 2) Tavily batch extract (only pages missing from the page cache)
+    to_fetch = run.lookup_pages()
     try:
-        url_to_text, extract_warnings = _extract_pages(tavily_client, selected_urls)
-        warnings.extend(extract_warnings)
+        run.add_fetched(_extract_pages(tavily_client, to_fetch))
     except Exception as e:
-        warnings.append(
-            f"Extraction Specialist: Tavily batch extract failed ({str(e)})"
+        run.fetch_failed(e)
+
+    # 3) OpenAI per URL (pooled) -> structured output -> validate ProgramRecordGraph
+    emit = program_emitter()
+    misses = run.lookup_programs()
+    for program in run.cached.values():
+        emit(program)
+    run.add_outcomes(
+        _extract_programs(
+            openai_client, misses, max_concurrency, llm_timeout, llm_batch_size, emit
         )
-        url_to_text = {}
+    )
 
-    # 3) OpenAI per URL -> structured output -> validate ProgramRecordGraph
-    for url in selected_urls:
-        page_text = (url_to_text.get(url) or "").strip()
-        if not page_text:
-            continue
+    return run.updates()
 
-        try:
-            # fit content into token budget
-            page_text = _truncate_for_llm(page_text, MAX_CHARS_PER_PAGE)
-            # mapping text → structured ProgramRecord + Enforce no-guessing
-            rec_dict = _llm_program_record(openai_client, url, page_text)
-            #  normalize + set source_link/citation
-            rec_dict = _enforce_invariants(rec_dict, url)
-            program = ProgramRecordGraph.model_validate(rec_dict)
-            extracted.append(program)
-        except Exception as e:
-            warnings.append(f"Extraction Specialist: Failed for {url} ({str(e)})")
-            continue
 
-    if not extracted:
-        warnings.append("Extraction Specialist: No programs extracted.")
+async def extraction_specialist_async(
+    state: GraphState,
+    tavily_client: AsyncTavilyClientProtocol,
+    openai_client: AsyncOpenAIClientProtocol,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    llm_timeout: float = LLM_TIMEOUT_SECONDS,
+    llm_cache: TieredCache | None = None,
+    page_cache: TieredCache | None = None,
+    page_failure_ttl: float = PAGE_FAILURE_TTL_SECONDS,
+    page_token_budget: int = LLM_TOKEN_LIMIT_PER_PAGE,
+    domain_policy: DomainPolicy | None = None,
+    llm_batch_size: int = LLM_BATCH_SIZE,
+    spend_ceiling_usd: float = REQUEST_SPEND_CEILING_USD,
+) -> GraphState:
+    # domain stats may be read from Mongo, keep that off the loop too
+    selected_urls, domain_counts, early_exit = await asyncio.to_thread(
+        _select_urls, state, domain_policy
+    )
+    if early_exit is not None:
+        return early_exit
+
+    # every Tavily / OpenAI call below is metered against the request's ceiling
+    meter = UsageMeter(spent_usd(state.get("metrics")), spend_ceiling_usd)
+    tavily_client = meter.wrap_tavily(tavily_client)
+    openai_client = meter.wrap_openai(openai_client)
+
+    run = _ExtractionRun(
+        selected_urls,
+        llm_cache,
+        page_cache,
+        page_failure_ttl,
+        page_token_budget,
+        query=(state.get("input") or {}).get("query"),
+        meter=meter,
+        domain_policy=domain_policy,
+        domain_counts=domain_counts,
+    )
+
+    # cache tiers are synchronous (Mongo tier included), keep them off the loop
+    to_fetch = await asyncio.to_thread(run.lookup_pages)
+    try:
+        fetched: tuple[dict[str, str], list[str], dict[str, str]] = ({}, [], {})
+        if to_fetch:
+            res = await tavily_client.extract(urls=to_fetch, extract_depth="basic")
+            fetched = _parse_extract_response(res)
+        await asyncio.to_thread(run.add_fetched, fetched)
+    except Exception as e:
+        run.fetch_failed(e)
+
+    emit = program_emitter()
+    misses = await asyncio.to_thread(run.lookup_programs)
+    for program in run.cached.values():
+        emit(program)
+    outcomes = await _extract_programs_async(
+        openai_client, misses, max_concurrency, llm_timeout, llm_batch_size, emit
+    )
+    await asyncio.to_thread(run.add_outcomes, outcomes)
 
-    updates: GraphState = {"extracted_programs": extracted}
-    if warnings:
-        updates["warnings"] = warnings
-    return updates
+    return run.updates()
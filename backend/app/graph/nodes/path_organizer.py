@@ -1,4 +1,6 @@
 import re
+from typing import Any, Callable
+
 from app.graph.state import GraphState, ResultsPayload, ProgramRecordGraph
 
 MAX_PER_BUCKET = 5
@@ -103,81 +105,113 @@ def _all_buckets_full(results: ResultsPayload) -> bool:
     return all(len(results[b]) >= MAX_PER_BUCKET for b in results)
 
 
-def path_organizer(state: GraphState) -> GraphState:
-    programs: list[ProgramRecordGraph] = state.get("extracted_programs") or []
-
-    empty_results: ResultsPayload = _init_empty_results()
-
-    if not programs:
-        return {
-            "results": empty_results,
-            "warnings": ["Path Organizer: No programs were available to categorize."],
-        }
+def _classify(p: ProgramRecordGraph) -> tuple[str, bool]:
+    # (bucket, used_fallback)
+    # - Prefer duration when clearly specified
+    # - Otherwise, use provider/title keyword heuristics (and warn)
+    weeks = _parse_duration_weeks(p.duration)
+    if weeks is not None:
+        return _bucket_from_duration_weeks(weeks), False
+    return _bucket_from_keywords(p), True
+
+
+class PathOrganizer:
+    # Classifies programs as they arrive; finish() assembles the final buckets.
+    # Streaming callers may add programs out of order and pass a sort key.
+
+    def __init__(self) -> None:
+        self._entries: list[tuple[ProgramRecordGraph, str, bool]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, program: ProgramRecordGraph) -> str:
+        bucket, used_fallback = _classify(program)
+        self._entries.append((program, bucket, used_fallback))
+        return bucket
+
+    def finish(
+        self, sort_key: Callable[[ProgramRecordGraph], Any] | None = None
+    ) -> tuple[ResultsPayload, list[str]]:
+        entries = self._entries
+        if sort_key is not None:
+            entries = sorted(entries, key=lambda e: sort_key(e[0]))
+
+        results: ResultsPayload = _init_empty_results()
+        warnings: list[str] = []
+
+        if not entries:
+            return results, [
+                "Path Organizer: No programs were available to categorize."
+            ]
+
+        # 1) bucket into short_term / medium_term / long_term (done in add())
+        # 2) enforce no duplicates across buckets
+        #    - Global dedupe (by URL, else provider+title) before inserting
+        # 3) apply max per bucket
+        #    - Drop overflow items per bucket and warn
+
+        seen_keys: set[str] = set()
+        dup_count = 0
+        used_fallback = 0
+        dropped_due_to_limits = 0
+
+        for p, bucket, fallback in entries:
+            # (2) Deduplicate
+            key = _program_key(p)
+            if key in seen_keys:
+                dup_count += 1
+                continue
+            seen_keys.add(key)
+
+            # (1) Chosen bucket
+            if fallback:
+                used_fallback += 1
+
+            # (3) Add with per-bucket limit
+            if not _add_to_bucket(results, bucket, p):
+                dropped_due_to_limits += 1
+
+            # Stop early if all buckets are full
+            if _all_buckets_full(results):
+                break
+
+        if dup_count:
+            warnings.append(
+                f"Path Organizer: Removed {dup_count} duplicate program(s) before bucketing."
+            )
+        if used_fallback:
+            warnings.append(
+                f"Path Organizer: Bucketing used fallback heuristics for {used_fallback} program(s) due to missing duration."
+            )
+        if dropped_due_to_limits:
+            warnings.append(
+                f"Path Organizer: Dropped {dropped_due_to_limits} program(s) due to per-bucket limit ({MAX_PER_BUCKET})."
+            )
+
+        empties = [b for b, items in results.items() if not items]
+        if empties:
+            warnings.append(
+                f"Path Organizer: One or more buckets are empty: {', '.join(empties)}."
+            )
+
+        total = sum(len(v) for v in results.values())
+        if total < MIN_TOTAL_PROGRAMS_WARNING:
+            warnings.append(
+                f"Path Organizer: Low number of programs after categorization (total={total})."
+            )
+
+        return results, warnings
 
-    results: ResultsPayload = _init_empty_results()
-    warnings: list[str] = []
 
-    # 1) bucket into short_term / medium_term / long_term
-    #    - Prefer duration when clearly specified
-    #    - Otherwise, use provider/title keyword heuristics (and warn)
-    # 2) enforce no duplicates across buckets
-    #    - Global dedupe (by URL, else provider+title) before inserting
-    # 3) apply max per bucket
-    #    - Drop overflow items per bucket and warn
-
-    seen_keys: set[str] = set()
-    dup_count = 0
-    used_fallback = 0
-    dropped_due_to_limits = 0
+def path_organizer(state: GraphState) -> GraphState:
+    programs: list[ProgramRecordGraph] = state.get("extracted_programs") or []
 
+    organizer = PathOrganizer()
     for p in programs:
-        # (2) Deduplicate
-        key = _program_key(p)
-        if key in seen_keys:
-            dup_count += 1
-            continue
-        seen_keys.add(key)
-
-        # (1) Choose bucket
-        weeks = _parse_duration_weeks(p.duration)
-        if weeks is not None:
-            bucket = _bucket_from_duration_weeks(weeks)
-        else:
-            bucket = _bucket_from_keywords(p)
-            used_fallback += 1
-
-        # (3) Add with per-bucket limit
-        if not _add_to_bucket(results, bucket, p):
-            dropped_due_to_limits += 1
-
-        # Stop early if all buckets are full
-        if _all_buckets_full(results):
-            break
-
-    if dup_count:
-        warnings.append(
-            f"Path Organizer: Removed {dup_count} duplicate program(s) before bucketing."
-        )
-    if used_fallback:
-        warnings.append(
-            f"Path Organizer: Bucketing used fallback heuristics for {used_fallback} program(s) due to missing duration."
-        )
-    if dropped_due_to_limits:
-        warnings.append(
-            f"Path Organizer: Dropped {dropped_due_to_limits} program(s) due to per-bucket limit ({MAX_PER_BUCKET})."
-        )
-
-    empties = [b for b, items in results.items() if not items]
-    if empties:
-        warnings.append(
-            f"Path Organizer: One or more buckets are empty: {', '.join(empties)}."
-        )
-
-    total = sum(len(v) for v in results.values())
-    if total < MIN_TOTAL_PROGRAMS_WARNING:
-        warnings.append(
-            f"Path Organizer: Low number of programs after categorization (total={total})."
-        )
+        organizer.add(p)
+
+    results, warnings = organizer.finish()
 
     updates: GraphState = {"results": results}
     if warnings:
@@ -0,0 +1,336 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from app.cache.tiered import TieredCache
+from app.graph.condense import condense_page
+from app.graph.domains import (
+    DROP_VERDICTS,
+    VERDICT_COUNTERS,
+    DomainObservations,
+    DomainPolicy,
+)
+from app.external.protocols import OpenAIClientProtocol, TavilyClientProtocol
+from app.graph.nodes.adaptive_scout import (
+    MAX_LEADS_TOTAL,
+    _build_queries,
+    _search,
+    _search_cache_key,
+    _to_lead,
+)
+from app.graph.nodes.extraction_specialist import (
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_TOKEN_LIMIT_PER_PAGE,
+    MAX_URLS_TO_EXTRACT,
+    PAGE_FAILURE_TTL_SECONDS,
+    _cached_pages,
+    _cached_programs,
+    _extract_pages,
+    _extract_program,
+    _llm_cache_key,
+    _store_pages,
+)
+from app.graph.nodes.path_organizer import PathOrganizer
+from app.graph.progress import program_emitter
+from app.graph.state import GraphState, ProgramRecordGraph, RawLead
+from app.graph.usage import (
+    REQUEST_SPEND_CEILING_USD,
+    SpendCeilingExceeded,
+    UsageMeter,
+    spent_usd,
+)
+
+# Streaming mode runs scout → extract → organize as one node: every search result
+# batch is extracted as soon as it arrives, every page goes to the LLM as soon as
+# its text is available, and the organizer classifies programs as they complete.
+
+
+def _search_task(
+    tavily_client: TavilyClientProtocol, search_cache: TieredCache | None, q: str
+) -> tuple[list[dict[str, Any]], bool]:
+    # returns (results, cache_hit)
+    if search_cache is not None:
+        key = _search_cache_key(q)
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached, True
+    results = _search(tavily_client, q)
+    if search_cache is not None:
+        search_cache.set(key, results)
+    return results, False
+
+
+def _extract_task(
+    tavily_client: TavilyClientProtocol,
+    page_cache: TieredCache | None,
+    page_failure_ttl: float,
+    urls: list[str],
+) -> tuple[dict[str, str], list[str], dict[str, int], list[str]]:
+    # returns (url -> text, warnings, page cache stats, urls sent to Tavily)
+    warnings: list[str] = []
+    cached_texts: dict[str, str] = {}
+    cached_failures: dict[str, str] = {}
+    if page_cache is not None:
+        cached_texts, cached_failures = _cached_pages(page_cache, urls)
+        for u, err in cached_failures.items():
+            warnings.append(
+                f"Extraction Specialist: Tavily extract failed for {u} ({err}, cached)"
+            )
+
+    to_fetch = [u for u in urls if u not in cached_texts and u not in cached_failures]
+    try:
+        url_to_text, extract_warnings, failed = _extract_pages(tavily_client, to_fetch)
+        warnings.extend(extract_warnings)
+        if page_cache is not None:
+            _store_pages(page_cache, url_to_text, failed, page_failure_ttl)
+        fetched = to_fetch
+    except Exception as e:
+        warnings.append(
+            f"Extraction Specialist: Tavily batch extract failed ({str(e)})"
+        )
+        url_to_text = {}
+        fetched = []
+
+    stats = {
+        "hits": len(cached_texts),
+        "negative_hits": len(cached_failures),
+        "misses": len(to_fetch),
+    }
+    return {**cached_texts, **url_to_text}, warnings, stats, fetched
+
+
+def _llm_task(
+    openai_client: OpenAIClientProtocol,
+    llm_cache: TieredCache | None,
+    timeout: float,
+    token_budget: int,
+    query: str,
+    url: str,
+    page_text: str,
+) -> tuple[ProgramRecordGraph, bool]:
+    # returns (program, cache_hit); raises on LLM / validation failure
+    llm_text = condense_page(page_text, token_budget, query)
+    key = None
+    if llm_cache is not None:
+        key = _llm_cache_key(url, llm_text)
+        cached = _cached_programs(llm_cache, {url: key})
+        if url in cached:
+            return cached[url], True
+    program = _extract_program(openai_client, url, llm_text, timeout)
+    if llm_cache is not None:
+        llm_cache.set(key, program.model_dump())
+    return program, False
+
+
+def _add_counts(total: dict[str, int], delta: dict[str, int]) -> None:
+    for k, v in delta.items():
+        total[k] = total.get(k, 0) + v
+
+
+def streaming_pipeline(
+    state: GraphState,
+    tavily_client: TavilyClientProtocol,
+    openai_client: OpenAIClientProtocol,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    llm_timeout: float = LLM_TIMEOUT_SECONDS,
+    search_cache: TieredCache | None = None,
+    llm_cache: TieredCache | None = None,
+    page_cache: TieredCache | None = None,
+    page_failure_ttl: float = PAGE_FAILURE_TTL_SECONDS,
+    page_token_budget: int = LLM_TOKEN_LIMIT_PER_PAGE,
+    domain_policy: DomainPolicy | None = None,
+    spend_ceiling_usd: float = REQUEST_SPEND_CEILING_USD,
+) -> GraphState:
+    inp = state.get("input") or {}
+    query = inp.get("query")
+    prefs = inp.get("prefs")
+
+    if not query:
+        return {"warnings": ["Adaptive Scout: Missing input.query."]}
+
+    search_queries = _build_queries(query, prefs)
+    meter = UsageMeter(spent_usd(state.get("metrics")), spend_ceiling_usd)
+    tavily_client = meter.wrap_tavily(tavily_client)
+    openai_client = meter.wrap_openai(openai_client)
+
+    warnings: list[str] = []
+    leads: dict[str, RawLead] = {}
+    # (query index, result index): same ordering the batch scout would produce
+    lead_rank: dict[str, tuple[int, int]] = {}
+    # search results by query index, held until the earlier queries are in
+    arrived: dict[int, list[dict[str, Any]]] = {}
+    next_qi = 0
+    selected_count = 0
+    organizer = PathOrganizer()
+    emit = program_emitter()
+    extracted: list[ProgramRecordGraph] = []
+    llm_failures: dict[str, str] = {}
+    ceiling_skipped = 0
+    search_stats: dict[str, int] = {}
+    page_stats: dict[str, int] = {}
+    llm_stats: dict[str, int] = {}
+    domain_counts = {name: 0 for name in VERDICT_COUNTERS.values()}
+    observations = DomainObservations()
+
+    io_pool = ThreadPoolExecutor(
+        max_workers=max(len(search_queries), 1) * 2, thread_name_prefix="stream-io"
+    )
+    llm_pool = ThreadPoolExecutor(
+        max_workers=max(max_concurrency, 1), thread_name_prefix="stream-llm"
+    )
+    pending: dict[Future, tuple[str, Any]] = {}
+
+    try:
+        for qi, q in enumerate(search_queries):
+            fut = io_pool.submit(_search_task, tavily_client, search_cache, q)
+            pending[fut] = ("search", (qi, q))
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, ctx = pending.pop(fut)
+
+                if kind == "search":
+                    qi, q = ctx
+                    try:
+                        results, hit = fut.result()
+                    except Exception as e:
+                        warnings.append(
+                            f"Adaptive Scout: Search failed for query '{q}' ({str(e)})"
+                        )
+                        _add_counts(search_stats, {"misses": 1})
+                        results = []
+                    else:
+                        _add_counts(
+                            search_stats, {"hits": int(hit), "misses": int(not hit)}
+                        )
+                    arrived[qi] = results
+
+                    # leads are taken in query order, as in batch mode: a query's
+                    # results wait until every earlier query has answered
+                    new_urls: list[str] = []
+                    while next_qi in arrived:
+                        for ri, res in enumerate(arrived.pop(next_qi)):
+                            lead = _to_lead(res)
+                            if not lead or lead["url"] in leads:
+                                continue
+                            if len(leads) >= MAX_LEADS_TOTAL:
+                                break
+                            url = lead["url"]
+                            leads[url] = lead
+                            lead_rank[url] = (next_qi, ri)
+                            if selected_count >= MAX_URLS_TO_EXTRACT:
+                                continue
+                            # no reordering here: poor hosts are only skipped / counted
+                            verdict = (
+                                domain_policy.verdict(url) if domain_policy else "ok"
+                            )
+                            if verdict in VERDICT_COUNTERS:
+                                domain_counts[VERDICT_COUNTERS[verdict]] += 1
+                            if verdict in DROP_VERDICTS:
+                                continue
+                            selected_count += 1
+                            new_urls.append(url)
+                        next_qi += 1
+
+                    if new_urls:
+                        fut = io_pool.submit(
+                            _extract_task,
+                            tavily_client,
+                            page_cache,
+                            page_failure_ttl,
+                            new_urls,
+                        )
+                        pending[fut] = ("extract", new_urls)
+
+                elif kind == "extract":
+                    url_to_text, extract_warnings, stats, fetched = fut.result()
+                    warnings.extend(extract_warnings)
+                    _add_counts(page_stats, stats)
+                    for url in fetched:
+                        observations.extract(
+                            url, ok=bool((url_to_text.get(url) or "").strip())
+                        )
+                    for url in ctx:
+                        page_text = (url_to_text.get(url) or "").strip()
+                        if not page_text:
+                            continue
+                        fut = llm_pool.submit(
+                            _llm_task,
+                            openai_client,
+                            llm_cache,
+                            llm_timeout,
+                            page_token_budget,
+                            query,
+                            url,
+                            page_text,
+                        )
+                        pending[fut] = ("llm", url)
+
+                else:  # "llm"
+                    url = ctx
+                    try:
+                        program, hit = fut.result()
+                    except SpendCeilingExceeded:
+                        ceiling_skipped += 1
+                        continue
+                    except Exception as e:
+                        llm_failures[url] = str(e)
+                        _add_counts(llm_stats, {"misses": 1})
+                        observations.llm(url, None)
+                        continue
+                    _add_counts(llm_stats, {"hits": int(hit), "misses": int(not hit)})
+                    if not hit:
+                        observations.llm(url, program)
+                    extracted.append(program)
+                    organizer.add(program)
+                    emit(program)
+    finally:
+        io_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+
+    # Final ordering mirrors batch mode: leads by (query, result) rank
+    def rank_of(p: ProgramRecordGraph) -> tuple[int, int]:
+        return lead_rank.get(p.source_link, (len(search_queries), 0))
+
+    raw_leads = sorted(leads.values(), key=lambda lead: lead_rank[lead["url"]])
+    extracted.sort(key=rank_of)
+    updates: GraphState = {"raw_leads": raw_leads, "extracted_programs": extracted}
+
+    if not raw_leads:
+        # same early exit as batch mode: nothing to extract or organize
+        warnings.append("Adaptive Scout: No relevant learning leads found.")
+    else:
+        for url in sorted(llm_failures, key=lambda u: lead_rank[u]):
+            warnings.append(
+                f"Extraction Specialist: Failed for {url} ({llm_failures[url]})"
+            )
+        if ceiling_skipped:
+            warnings.append(
+                "Extraction Specialist: Spend ceiling reached; skipped "
+                f"{ceiling_skipped} page(s)."
+            )
+        if not extracted:
+            warnings.append("Extraction Specialist: No programs extracted.")
+        results, organize_warnings = organizer.finish(sort_key=rank_of)
+        updates["results"] = results
+        warnings.extend(organize_warnings)
+
+    metrics: dict[str, Any] = {
+        "pipeline_mode": "streaming",
+        "usage": {"pipeline": meter.to_dict()},
+    }
+    if search_cache is not None:
+        metrics["search_cache"] = search_stats
+    if page_cache is not None:
+        metrics["page_cache"] = page_stats
+    if llm_cache is not None:
+        metrics["llm_cache"] = llm_stats
+    if domain_policy is not None:
+        domain_policy.record(observations)
+        metrics["domains"] = domain_counts
+
+    updates["metrics"] = metrics
+    if warnings:
+        updates["warnings"] = warnings
+    return updates
@@ -0,0 +1,26 @@
+import contextvars
+from typing import Callable
+
+from langgraph.config import get_stream_writer
+
+from app.graph.state import ProgramRecordGraph
+
+ProgramCallback = Callable[[ProgramRecordGraph], None]
+
+
+def program_emitter() -> ProgramCallback:
+    # Pushes each program as a stream_mode="custom" event as soon as it is
+    # extracted, so streaming clients see it before the node finishes. No-op when
+    # the node runs outside a graph (unit tests) or custom events aren't streamed.
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return lambda program: None
+    # the writer reads the run config from context vars, which worker threads
+    # (extraction pools) don't inherit
+    ctx = contextvars.copy_context()
+
+    def emit(program: ProgramRecordGraph) -> None:
+        ctx.copy().run(writer, {"program": program})
+
+    return emit
@@ -1,7 +1,19 @@
-from typing import Protocol
+from typing import Any, AsyncIterator, Iterator, Protocol, Tuple
 
 from app.graph.state import InputPayload, GraphState
 
+# stream() events: ("node", {...}) after each node, ("program", ProgramRecordGraph)
+# as soon as a program is extracted, then ("final", final state)
+RunEvent = Tuple[str, Any]
+
 
 class GraphRunnerProtocol(Protocol):
     def run(self, request_id: str, payload: InputPayload) -> GraphState: ...
+    def stream(self, request_id: str, payload: InputPayload) -> Iterator[RunEvent]: ...
+
+
+class AsyncGraphRunnerProtocol(Protocol):
+    async def run(self, request_id: str, payload: InputPayload) -> GraphState: ...
+    def stream(
+        self, request_id: str, payload: InputPayload
+    ) -> AsyncIterator[RunEvent]: ...
@@ -0,0 +1,273 @@
+import asyncio
+import inspect
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from openai import APIConnectionError, APITimeoutError
+from tavily.errors import TimeoutError as TavilyTimeoutError
+from tavily.errors import UsageLimitExceededError
+
+from app.core.env import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+# One RateLimiter per process, shared by every request through GraphDeps: calls
+# take from token buckets sized to the account quotas (OpenAI requests and
+# tokens per minute, Tavily requests per minute) before they are sent, and
+# 429 / 5xx / timeouts are retried with jittered exponential backoff. LLM calls
+# reserve their estimated tokens up front and settle with the reported usage.
+
+OPENAI_RPM = 500
+OPENAI_TPM = 200_000
+TAVILY_RPM = 100
+RATE_LIMIT_MAX_RETRIES = 3
+RATE_LIMIT_BACKOFF_SECONDS = 0.5
+RATE_LIMIT_BACKOFF_MAX_SECONDS = 8.0
+
+_CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    # rate_per_min tokens per minute, bursts up to one minute's worth; take()
+    # reserves right away (the balance may go negative) and returns how long the
+    # caller must wait, so waiters are served in arrival order
+
+    def __init__(
+        self, rate_per_min: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate_per_s = rate_per_min / 60.0
+        self.capacity = float(rate_per_min)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self, n: float) -> float:
+        n = min(n, self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate_per_s
+            )
+            self._updated = now
+            self._tokens -= n
+            return max(0.0, -self._tokens / self.rate_per_s)
+
+    def give_back(self, n: float) -> None:
+        # settle an over-estimate (n > 0) or charge an under-estimate (n < 0)
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + n)
+
+
+def _retry_delay(e: Exception) -> Optional[float]:
+    # None: not retryable; else the server's Retry-After hint (0 when absent)
+    if isinstance(e, (APITimeoutError, APIConnectionError, TavilyTimeoutError)):
+        return 0.0
+    response = getattr(e, "response", None)
+    status = getattr(e, "status_code", None) or getattr(response, "status_code", None)
+    if not isinstance(e, UsageLimitExceededError) and not (
+        status == 429 or (isinstance(status, int) and status >= 500)
+    ):
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _estimated_tokens(kwargs: dict[str, Any]) -> int:
+    messages = kwargs.get("input")
+    if isinstance(messages, list):
+        chars = sum(len(str(m.get("content") or "")) for m in messages)
+    else:
+        chars = len(str(messages or ""))
+    return chars // _CHARS_PER_TOKEN + int(kwargs.get("max_output_tokens") or 0)
+
+
+def _used_tokens(resp: Any) -> Optional[int]:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return None
+    return int(getattr(usage, "input_tokens", 0) or 0) + int(
+        getattr(usage, "output_tokens", 0) or 0
+    )
+
+
+@dataclass
+class RateLimiter:
+    # rpm / tpm of 0 turn that bucket off
+    openai_rpm: float = OPENAI_RPM
+    openai_tpm: float = OPENAI_TPM
+    tavily_rpm: float = TAVILY_RPM
+    max_retries: int = RATE_LIMIT_MAX_RETRIES
+    backoff_base_s: float = RATE_LIMIT_BACKOFF_SECONDS
+    backoff_max_s: float = RATE_LIMIT_BACKOFF_MAX_SECONDS
+    sleep: Callable[[float], None] = time.sleep
+    async_sleep: Callable[[float], Any] = asyncio.sleep
+    clock: Callable[[], float] = time.monotonic
+    stats: dict[str, int] = field(
+        default_factory=lambda: {"throttled": 0, "retries": 0, "gave_up": 0}
+    )
+
+    def __post_init__(self) -> None:
+        def bucket(rate: float) -> Optional[TokenBucket]:
+            return TokenBucket(rate, self.clock) if rate > 0 else None
+
+        self._openai_requests = bucket(self.openai_rpm)
+        self._openai_tokens = bucket(self.openai_tpm)
+        self._tavily_requests = bucket(self.tavily_rpm)
+        self._lock = threading.Lock()
+
+    def wrap_openai(self, client: Any) -> Any:
+        return _LimitedOpenAI(client, self)
+
+    def wrap_tavily(self, client: Any) -> Any:
+        return _LimitedTavily(client, self)
+
+    def _reserve(self, service: str, tokens: int = 0) -> float:
+        if service == "openai":
+            waits = [
+                b.take(n)
+                for b, n in ((self._openai_requests, 1), (self._openai_tokens, tokens))
+                if b is not None
+            ]
+        else:
+            b = self._tavily_requests
+            waits = [b.take(1)] if b is not None else []
+        wait = max(waits, default=0.0)
+        if wait > 0:
+            self._count("throttled")
+        return wait
+
+    def _settle(self, service: str, estimated: int, resp: Any = None) -> None:
+        # resp=None: the call failed and used no tokens
+        if service != "openai" or self._openai_tokens is None:
+            return
+        used = 0 if resp is None else _used_tokens(resp)
+        if used is not None:
+            self._openai_tokens.give_back(estimated - used)
+
+    def _backoff(self, e: Exception, attempt: int) -> Optional[float]:
+        # None: give up and raise; else seconds to wait before the next attempt
+        hint = _retry_delay(e)
+        if hint is None:
+            return None
+        if attempt >= self.max_retries:
+            self._count("gave_up")
+            return None
+        self._count("retries")
+        # full jitter, but never sooner than the server asked for
+        cap = min(self.backoff_max_s, self.backoff_base_s * 2**attempt)
+        delay = max(hint, random.uniform(0, cap))
+        logger.info(
+            "external_call_retry. attempt=%d delay=%.2f error=%s",
+            attempt + 1,
+            delay,
+            type(e).__name__,
+        )
+        return delay
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def call(self, service: str, fn: Callable[..., Any], kwargs: dict[str, Any]) -> Any:
+        tokens = _estimated_tokens(kwargs) if service == "openai" else 0
+        attempt = 0
+        while True:
+            wait = self._reserve(service, tokens)
+            if wait > 0:
+                self.sleep(wait)
+            try:
+                resp = fn(**kwargs)
+            except Exception as e:
+                self._settle(service, tokens)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                attempt += 1
+                continue
+            self._settle(service, tokens, resp)
+            return resp
+
+    async def call_async(
+        self, service: str, fn: Callable[..., Any], kwargs: dict[str, Any]
+    ) -> Any:
+        tokens = _estimated_tokens(kwargs) if service == "openai" else 0
+        attempt = 0
+        while True:
+            wait = self._reserve(service, tokens)
+            if wait > 0:
+                await self.async_sleep(wait)
+            try:
+                resp = await fn(**kwargs)
+            except Exception as e:
+                self._settle(service, tokens)
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                await self.async_sleep(delay)
+                attempt += 1
+                continue
+            self._settle(service, tokens, resp)
+            return resp
+
+
+class _LimitedResponses:
+    # wraps both client flavours; the async one returns a coroutine
+
+    def __init__(self, responses: Any, limiter: RateLimiter):
+        self._responses = responses
+        self._limiter = limiter
+
+    def parse(self, **kwargs: Any) -> Any:
+        fn = self._responses.parse
+        if inspect.iscoroutinefunction(fn):
+            return self._limiter.call_async("openai", fn, kwargs)
+        return self._limiter.call("openai", fn, kwargs)
+
+
+class _LimitedOpenAI:
+    def __init__(self, client: Any, limiter: RateLimiter):
+        self.responses = _LimitedResponses(client.responses, limiter)
+
+
+class _LimitedTavily:
+    def __init__(self, client: Any, limiter: RateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def _call(self, kind: str, kwargs: dict[str, Any]) -> Any:
+        fn = getattr(self._client, kind)
+        if inspect.iscoroutinefunction(fn):
+            return self._limiter.call_async("tavily", fn, kwargs)
+        return self._limiter.call("tavily", fn, kwargs)
+
+    def search(self, **kwargs: Any) -> Any:
+        return self._call("search", kwargs)
+
+    def extract(self, **kwargs: Any) -> Any:
+        return self._call("extract", kwargs)
+
+
+def make_rate_limiter() -> Optional[RateLimiter]:
+    if not env_bool("RATE_LIMIT", True):
+        return None
+    return RateLimiter(
+        openai_rpm=env_float("OPENAI_RPM", OPENAI_RPM),
+        openai_tpm=env_float("OPENAI_TPM", OPENAI_TPM),
+        tavily_rpm=env_float("TAVILY_RPM", TAVILY_RPM),
+        max_retries=env_int("RATE_LIMIT_MAX_RETRIES", RATE_LIMIT_MAX_RETRIES),
+        backoff_base_s=env_float(
+            "RATE_LIMIT_BACKOFF_SECONDS", RATE_LIMIT_BACKOFF_SECONDS
+        ),
+        backoff_max_s=env_float(
+            "RATE_LIMIT_BACKOFF_MAX_SECONDS", RATE_LIMIT_BACKOFF_MAX_SECONDS
+        ),
+    )
@@ -1,12 +1,18 @@
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict, Iterator
 from dataclasses import dataclass
 
 from app.db.models import AgentRunDoc
-from app.db.protocols import AgentRunsRepoProtocol
-from app.graph.build import build_graph
-from app.graph.deps import GraphDeps
-from app.graph.state import create_initial_state, InputPayload, GraphState
+from app.db.protocols import AgentRunsRepoProtocol, AsyncAgentRunsRepoProtocol
+from app.graph.build import build_async_graph, build_graph
+from app.graph.deps import AsyncGraphDeps, GraphDeps
+from app.graph.protocols import RunEvent
+from app.graph.state import (
+    create_initial_state,
+    merge_metrics,
+    InputPayload,
+    GraphState,
+)
 
 
 _LIST_ACCUM_KEYS = {"raw_leads", "extracted_programs", "warnings"}
@@ -19,6 +25,8 @@ def _merge_for_snapshot(
     for k, v in delta.items():
         if k in _LIST_ACCUM_KEYS:
             merged[k] = (merged.get(k, []) or []) + (v or [])
+        elif k == "metrics":
+            merged[k] = merge_metrics(merged.get(k) or {}, v or {})
         else:
             merged[k] = v
     return merged
@@ -28,6 +36,7 @@ def _output_summary(snapshot: Dict[str, Any]) -> dict:
     raw_leads = snapshot.get("raw_leads", []) or []
     extracted = snapshot.get("extracted_programs", []) or []
     results = snapshot.get("results") or {}
+    metrics = snapshot.get("metrics") or {}
 
     summary: dict = {
         "counts": {
@@ -46,9 +55,68 @@ def _output_summary(snapshot: Dict[str, Any]) -> dict:
             "long_term": len(results.get("long_term", []) or []),
         }
 
+    if metrics:
+        summary["metrics"] = metrics
+
     return summary
 
 
+def _step_doc(
+    request_id: str,
+    event: Dict[str, Any],
+    snapshot: Dict[str, Any],
+    started_at: datetime,
+    ended_at: datetime,
+) -> tuple[str, Dict[str, Any], AgentRunDoc]:
+    # returns (node_name, merged snapshot, agent run doc for this step)
+    node_name, delta = next(iter(event.items()))
+
+    # STEP-ONLY warnings: only what THIS node returned
+    step_warnings = delta.get("warnings") or []
+    if not isinstance(step_warnings, list):
+        step_warnings = [str(step_warnings)]
+
+    # Merge delta into snapshot so output_summary can reflect latest state
+    snapshot = _merge_for_snapshot(snapshot, delta)
+
+    doc = AgentRunDoc(
+        request_id=request_id,
+        agent_name=node_name,
+        started_at=started_at,
+        ended_at=ended_at,
+        output_summary=_output_summary(snapshot),
+        warnings=step_warnings,
+        error=None,
+    )
+    return node_name, snapshot, doc
+
+
+def _failure_doc(
+    request_id: str,
+    last_node_name: str | None,
+    snapshot: Dict[str, Any],
+    started_at: datetime,
+    e: Exception,
+) -> AgentRunDoc:
+    return AgentRunDoc(
+        request_id=request_id,
+        agent_name=last_node_name or "unknown",
+        started_at=started_at,
+        ended_at=datetime.now(timezone.utc),
+        output_summary=_output_summary(snapshot),
+        warnings=[],
+        error=str(e),
+    )
+
+
+def _node_event(node_name: str, doc: AgentRunDoc) -> Dict[str, Any]:
+    return {
+        "node": node_name,
+        "warnings": doc.warnings,
+        "counts": (doc.output_summary or {}).get("counts") or {},
+    }
+
+
 @dataclass
 class GraphRunner:
     agent_runs_repo: AgentRunsRepoProtocol
@@ -59,6 +127,18 @@ class GraphRunner:
         self.graph = self.graph or build_graph(self.deps)
 
     def run(self, request_id: str, payload: InputPayload) -> GraphState:
+        final_state: GraphState = {}
+        for kind, data in self._events(request_id, payload, with_programs=False):
+            if kind == "final":
+                final_state = data
+        return final_state
+
+    def stream(self, request_id: str, payload: InputPayload) -> Iterator[RunEvent]:
+        return self._events(request_id, payload, with_programs=True)
+
+    def _events(
+        self, request_id: str, payload: InputPayload, with_programs: bool
+    ) -> Iterator[RunEvent]:
         # Initialize State
         initial_state = create_initial_state(
             request_id=str(request_id), payload=payload
@@ -68,48 +148,93 @@ class GraphRunner:
         last_step_time = datetime.now(timezone.utc)
 
         last_node_name: str | None = None
+        # "custom" carries the programs nodes push while they are still running
+        stream_mode = ["updates", "custom"] if with_programs else "updates"
 
         # Stream the execution
         # event is a dict: { "node_name": { "delta_key": "delta_value" }
         try:
-            for event in self.graph.stream(initial_state, stream_mode="updates"):
+            for item in self.graph.stream(initial_state, stream_mode=stream_mode):
+                mode, event = item if with_programs else ("updates", item)
+                if mode == "custom":
+                    if "program" in event:
+                        yield "program", event["program"]
+                    continue
+
                 started_at = last_step_time
                 ended_at = datetime.now(timezone.utc)
                 last_step_time = ended_at
 
-                node_name, delta = next(iter(event.items()))
-                last_node_name = node_name
-
-                # STEP-ONLY warnings: only what THIS node returned
-                step_warnings = delta.get("warnings") or []
-                if not isinstance(step_warnings, list):
-                    step_warnings = [str(step_warnings)]
-
-                # Merge delta into snapshot so output_summary can reflect latest state
-                snapshot = _merge_for_snapshot(snapshot, delta)
-
-                doc = AgentRunDoc(
-                    request_id=request_id,
-                    agent_name=node_name,
-                    started_at=started_at,
-                    ended_at=ended_at,
-                    output_summary=_output_summary(snapshot),
-                    warnings=step_warnings,
-                    error=None,
+                last_node_name, snapshot, doc = _step_doc(
+                    request_id, event, snapshot, started_at, ended_at
                 )
                 self.agent_runs_repo.insert_run(doc)
+                yield "node", _node_event(last_node_name, doc)
+
+        except Exception as e:
+            self.agent_runs_repo.insert_run(
+                _failure_doc(request_id, last_node_name, snapshot, last_step_time, e)
+            )
+            raise
+
+        yield "final", snapshot  # final state
+
+
+@dataclass
+class AsyncGraphRunner:
+    agent_runs_repo: AsyncAgentRunsRepoProtocol
+    deps: AsyncGraphDeps
+    graph: Any = None
+
+    def __post_init__(self) -> None:
+        self.graph = self.graph or build_async_graph(self.deps)
+
+    async def run(self, request_id: str, payload: InputPayload) -> GraphState:
+        final_state: GraphState = {}
+        async for kind, data in self._events(request_id, payload, with_programs=False):
+            if kind == "final":
+                final_state = data
+        return final_state
+
+    def stream(self, request_id: str, payload: InputPayload) -> AsyncIterator[RunEvent]:
+        return self._events(request_id, payload, with_programs=True)
+
+    async def _events(
+        self, request_id: str, payload: InputPayload, with_programs: bool
+    ) -> AsyncIterator[RunEvent]:
+        initial_state = create_initial_state(
+            request_id=str(request_id), payload=payload
+        )
+        snapshot: Dict[str, Any] = dict(initial_state)
+        last_step_time = datetime.now(timezone.utc)
+
+        last_node_name: str | None = None
+        stream_mode = ["updates", "custom"] if with_programs else "updates"
+
+        try:
+            async for item in self.graph.astream(
+                initial_state, stream_mode=stream_mode
+            ):
+                mode, event = item if with_programs else ("updates", item)
+                if mode == "custom":
+                    if "program" in event:
+                        yield "program", event["program"]
+                    continue
+
+                started_at = last_step_time
+                ended_at = datetime.now(timezone.utc)
+                last_step_time = ended_at
+
+                last_node_name, snapshot, doc = _step_doc(
+                    request_id, event, snapshot, started_at, ended_at
+                )
+                await self.agent_runs_repo.insert_run(doc)
+                yield "node", _node_event(last_node_name, doc)
 
         except Exception as e:
-            doc = AgentRunDoc(
-                request_id=request_id,
-                agent_name=last_node_name or "unknown",
-                started_at=last_step_time,
-                ended_at=datetime.now(timezone.utc),
-                output_summary=_output_summary(snapshot),
-                warnings=[],
-                error=str(e),
+            await self.agent_runs_repo.insert_run(
+                _failure_doc(request_id, last_node_name, snapshot, last_step_time, e)
             )
-            self.agent_runs_repo.insert_run(doc)
             raise
 
-        return snapshot  # final state
+        yield "final", snapshot
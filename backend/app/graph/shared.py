@@ -0,0 +1,187 @@
+import copy
+import json
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable
+
+from app.cache.keys import canonical_url, make_key
+from app.graph.deps import GraphDeps
+from app.graph.usage import _tavily_credits
+
+# Clients shared by every item of one batch: identical Tavily searches, page
+# extracts (per URL) and OpenAI requests run once, concurrent duplicates wait for
+# the first caller. Callers after the first get the same result with usage
+# zeroed, so spend is metered on the item that paid for it.
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+
+class SharedCalls:
+    # like SingleFlight, but results are kept for the lifetime of the batch
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        # returns (result, shared)
+        with self._lock:
+            call = self._calls.get(key)
+            first = call is None
+            if first:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if first:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                call.done.set()
+            return call.result, False
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def claim(self, keys: list[str]) -> list[str]:
+        # keys this caller must produce with publish(); the rest are awaited
+        with self._lock:
+            owned = [k for k in keys if k not in self._calls]
+            for k in owned:
+                self._calls[k] = _Call()
+            self.calls += len(owned)
+            self.shared += len(keys) - len(owned)
+        return owned
+
+    def publish(self, key: str, result: Any) -> None:
+        call = self._calls[key]
+        call.result = result
+        call.done.set()
+
+    def wait(self, key: str) -> Any:
+        call = self._calls[key]
+        call.done.wait()
+        return call.result
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "shared": self.shared}
+
+
+def _without_usage(resp: Any) -> Any:
+    out = copy.copy(resp)
+    try:
+        out.usage = None
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return out
+
+
+class _SharedResponses:
+    def __init__(self, responses: Any, calls: SharedCalls):
+        self._responses = responses
+        self._calls = calls
+
+    def parse(self, **kwargs: Any) -> Any:
+        body = {k: v for k, v in kwargs.items() if k != "timeout"}
+        key = make_key(
+            "openai",
+            getattr(body.pop("text_format", None), "__name__", ""),
+            json.dumps(body, sort_keys=True, default=str),
+        )
+        resp, shared = self._calls.do(key, lambda: self._responses.parse(**kwargs))
+        return _without_usage(resp) if shared else resp
+
+
+class SharedOpenAI:
+    def __init__(self, client: Any):
+        self.calls = SharedCalls()
+        self.responses = _SharedResponses(client.responses, self.calls)
+
+
+class SharedTavily:
+    def __init__(self, client: Any):
+        self._client = client
+        self.searches = SharedCalls()
+        self.pages = SharedCalls()
+
+    def search(self, query: str, **kwargs: Any) -> Any:
+        normalized = " ".join(query.lower().split())
+        key = make_key("search", normalized, json.dumps(kwargs, sort_keys=True))
+        res, shared = self.searches.do(
+            key, lambda: self._client.search(query=query, **kwargs)
+        )
+        if shared and isinstance(res, dict):
+            return {**res, "usage": {"credits": 0}}
+        return res
+
+    def extract(self, urls: list[str], **kwargs: Any) -> dict[str, Any]:
+        # one call for the URLs nobody in the batch fetched yet, then wait for
+        # the others; the merged response keeps the caller's URL order
+        depth = kwargs.get("extract_depth")
+        keys = {u: make_key("page", canonical_url(u), depth) for u in urls}
+        owned_keys = set(self.pages.claim(list(dict.fromkeys(keys.values()))))
+        owned = [u for u in urls if keys[u] in owned_keys]
+
+        credits = 0.0
+        if owned:
+            try:
+                res = self._client.extract(urls=owned, **kwargs)
+            except Exception as e:
+                for u in owned:
+                    self.pages.publish(keys[u], {"url": u, "error": str(e)})
+                raise
+            credits = _tavily_credits("extract", depth, res)
+            by_url = _extract_items(res)
+            for u in owned:
+                item = by_url.get(u) or {"url": u, "error": "not returned"}
+                self.pages.publish(keys[u], item)
+
+        results: list[dict[str, Any]] = []
+        failed: list[dict[str, Any]] = []
+        for u in urls:
+            item = {**self.pages.wait(keys[u]), "url": u}
+            (failed if "error" in item else results).append(item)
+        return {
+            "results": results,
+            "failed_results": failed,
+            "usage": {"credits": credits},
+        }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {"search": self.searches.stats(), "extract": self.pages.stats()}
+
+
+def _extract_items(res: Any) -> dict[str, dict[str, Any]]:
+    by_url: dict[str, dict[str, Any]] = {}
+    if not isinstance(res, dict):
+        return by_url
+    for item in (res.get("results") or []) + (res.get("failed_results") or []):
+        if isinstance(item, dict) and item.get("url"):
+            by_url[item["url"]] = item
+    return by_url
+
+
+def shared_deps(deps: GraphDeps) -> GraphDeps:
+    # one page per LLM call, so the same page is the same request in every item;
+    # rate limiting stays below the sharing, so shared results take no quota
+    openai_client, tavily_client = deps.clients()
+    return replace(
+        deps,
+        tavily_client=SharedTavily(tavily_client),
+        openai_client=SharedOpenAI(openai_client),
+        llm_batch_size=1,
+        rate_limiter=None,
+    )
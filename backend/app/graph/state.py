@@ -1,5 +1,6 @@
 import operator
-from typing import TypedDict, Optional, List, Literal, Annotated
+from typing import TypedDict, Optional, List, Literal, Annotated, Dict, Any
+from pydantic import BaseModel
 from app.models.base import ProgramRecordBase
 
 PrefsFormat = Literal["online", "in-person", "hybrid"]
@@ -30,12 +31,28 @@ class ProgramRecordGraph(ProgramRecordBase):
     pass
 
 
+class ProgramRecordBatch(BaseModel):
+    # multi-page structured output: one record per page, matched by source_link
+    records: List[ProgramRecordGraph]
+
+
 class ResultsPayload(TypedDict):
     short_term: List[ProgramRecordGraph]
     medium_term: List[ProgramRecordGraph]
     long_term: List[ProgramRecordGraph]
 
 
+def merge_metrics(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    # Deep merge so nodes can each add their own sub-keys (e.g. per-node usage)
+    merged = dict(left or {})
+    for k, v in (right or {}).items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k] = merge_metrics(merged[k], v)
+        else:
+            merged[k] = v
+    return merged
+
+
 class GraphState(TypedDict, total=False):
     request_id: str
     input: InputPayload
@@ -45,6 +62,8 @@ class GraphState(TypedDict, total=False):
     warnings: Annotated[List[str], operator.add]
     # organizer overwrites this whole object
     results: ResultsPayload
+    # per-node counters (cache hits, usage, ...) surfaced in agent_runs.output_summary
+    metrics: Annotated[Dict[str, Any], merge_metrics]
 
 
 def create_initial_state(request_id: str, payload: InputPayload) -> GraphState:
@@ -55,4 +74,5 @@ def create_initial_state(request_id: str, payload: InputPayload) -> GraphState:
         "extracted_programs": [],
         "results": {"short_term": [], "medium_term": [], "long_term": []},
         "warnings": [],
+        "metrics": {},
     }
@@ -0,0 +1,205 @@
+import inspect
+import logging
+import math
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Every OpenAI / Tavily call a node makes goes through a UsageMeter wrapper:
+# tokens and credits are tallied per node run (metrics["usage"][node]) and the
+# per-request spend ceiling is checked before each call.
+
+# USD per 1M tokens: (input, cached input, output); matched by model prefix
+OPENAI_PRICES_PER_1M: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+TAVILY_USD_PER_CREDIT = 0.008
+# credits per search call, and per 5 successful extractions, by depth
+TAVILY_SEARCH_CREDITS = {"basic": 1, "advanced": 2}
+TAVILY_EXTRACT_CREDITS_PER_5 = {"basic": 1, "advanced": 2}
+REQUEST_SPEND_CEILING_USD = 0.0  # 0 = no ceiling
+
+
+class SpendCeilingExceeded(RuntimeError):
+    pass
+
+
+def _openai_prices(model: str | None) -> tuple[float, float, float]:
+    # responses report dated snapshots ("gpt-4o-mini-2024-07-18")
+    for name in sorted(OPENAI_PRICES_PER_1M, key=len, reverse=True):
+        if (model or "").startswith(name):
+            return OPENAI_PRICES_PER_1M[name]
+    logger.warning("openai_price_unknown. model=%s", model)
+    return 0.0, 0.0, 0.0
+
+
+def _tavily_credits(kind: str, depth: str | None, res: Any) -> float:
+    # prefer what Tavily reports (include_usage=True), else estimate from pricing
+    reported = (
+        (res.get("usage") or {}).get("credits") if isinstance(res, dict) else None
+    )
+    if isinstance(reported, (int, float)):
+        return float(reported)
+    depth = depth or "basic"
+    if kind == "search":
+        return float(TAVILY_SEARCH_CREDITS.get(depth, 1))
+    results = (res.get("results") or []) if isinstance(res, dict) else []
+    return float(
+        math.ceil(len(results) / 5) * TAVILY_EXTRACT_CREDITS_PER_5.get(depth, 1)
+    )
+
+
+class UsageMeter:
+    # Token / credit tally for one node run; pooled calls record concurrently.
+
+    def __init__(self, spent_before: float = 0.0, ceiling_usd: float = 0.0):
+        self.spent_before = spent_before
+        self.ceiling_usd = ceiling_usd
+        self.ceiling_hit = False
+        self._lock = threading.Lock()
+        self.openai = {
+            "calls": 0,
+            "input_tokens": 0,
+            "cached_tokens": 0,
+            "output_tokens": 0,
+        }
+        self.tavily = {"search_calls": 0, "extract_calls": 0, "credits": 0.0}
+        self.cost_usd = 0.0
+
+    def record_openai(self, resp: Any, model: str | None) -> None:
+        usage = getattr(resp, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        input_tokens = int(getattr(usage, "input_tokens", 0) or 0)
+        cached_tokens = int(getattr(details, "cached_tokens", 0) or 0)
+        output_tokens = int(getattr(usage, "output_tokens", 0) or 0)
+
+        price_in, price_cached, price_out = _openai_prices(
+            getattr(resp, "model", None) or model
+        )
+        cost = (
+            (input_tokens - cached_tokens) * price_in
+            + cached_tokens * price_cached
+            + output_tokens * price_out
+        ) / 1_000_000
+        with self._lock:
+            self.openai["calls"] += 1
+            self.openai["input_tokens"] += input_tokens
+            self.openai["cached_tokens"] += cached_tokens
+            self.openai["output_tokens"] += output_tokens
+            self.cost_usd += cost
+
+    def record_tavily(self, kind: str, depth: str | None, res: Any) -> None:
+        credits = _tavily_credits(kind, depth, res)
+        with self._lock:
+            self.tavily[f"{kind}_calls"] += 1
+            self.tavily["credits"] += credits
+            self.cost_usd += credits * TAVILY_USD_PER_CREDIT
+
+    def check(self) -> None:
+        if self.ceiling_usd <= 0:
+            return
+        with self._lock:
+            if self.spent_before + self.cost_usd < self.ceiling_usd:
+                return
+            self.ceiling_hit = True
+        raise SpendCeilingExceeded(
+            f"request spend ceiling of ${self.ceiling_usd:.4f} reached"
+        )
+
+    def wrap_openai(self, client: Any) -> Any:
+        return _MeteredOpenAI(client, self)
+
+    def wrap_tavily(self, client: Any) -> Any:
+        return _MeteredTavily(client, self)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "openai": dict(self.openai),
+                "tavily": {**self.tavily, "credits": round(self.tavily["credits"], 2)},
+                "cost_usd": round(self.cost_usd, 6),
+                "ceiling_hit": self.ceiling_hit,
+            }
+
+
+class _MeteredResponses:
+    # wraps both client flavours; the async one returns a coroutine
+
+    def __init__(self, responses: Any, meter: UsageMeter):
+        self._responses = responses
+        self._meter = meter
+
+    def parse(self, **kwargs: Any) -> Any:
+        if inspect.iscoroutinefunction(self._responses.parse):
+            return self._parse_async(**kwargs)
+        self._meter.check()
+        resp = self._responses.parse(**kwargs)
+        self._meter.record_openai(resp, kwargs.get("model"))
+        return resp
+
+    async def _parse_async(self, **kwargs: Any) -> Any:
+        self._meter.check()
+        resp = await self._responses.parse(**kwargs)
+        self._meter.record_openai(resp, kwargs.get("model"))
+        return resp
+
+
+class _MeteredOpenAI:
+    def __init__(self, client: Any, meter: UsageMeter):
+        self.responses = _MeteredResponses(client.responses, meter)
+
+
+class _MeteredTavily:
+    def __init__(self, client: Any, meter: UsageMeter):
+        self._client = client
+        self._meter = meter
+
+    def _call(self, kind: str, depth_arg: str, kwargs: dict[str, Any]) -> Any:
+        fn = getattr(self._client, kind)
+        if inspect.iscoroutinefunction(fn):
+            return self._call_async(kind, fn, kwargs.get(depth_arg), kwargs)
+        self._meter.check()
+        res = fn(**kwargs)
+        self._meter.record_tavily(kind, kwargs.get(depth_arg), res)
+        return res
+
+    async def _call_async(
+        self, kind: str, fn: Any, depth: str | None, kwargs: dict[str, Any]
+    ) -> Any:
+        self._meter.check()
+        res = await fn(**kwargs)
+        self._meter.record_tavily(kind, depth, res)
+        return res
+
+    def search(self, **kwargs: Any) -> Any:
+        return self._call("search", "search_depth", kwargs)
+
+    def extract(self, **kwargs: Any) -> Any:
+        return self._call("extract", "extract_depth", kwargs)
+
+
+def spent_usd(metrics: dict[str, Any] | None) -> float:
+    # cost of the node runs already merged into the request's metrics
+    usage = (metrics or {}).get("usage") or {}
+    return sum(float(u.get("cost_usd") or 0) for u in usage.values())
+
+
+def request_usage(metrics: dict[str, Any] | None) -> dict[str, Any]:
+    # per-request totals plus the per-node breakdown, stored on the requests doc
+    by_node = (metrics or {}).get("usage") or {}
+    openai: dict[str, int] = {}
+    tavily: dict[str, float] = {}
+    for node_usage in by_node.values():
+        for k, v in (node_usage.get("openai") or {}).items():
+            openai[k] = openai.get(k, 0) + v
+        for k, v in (node_usage.get("tavily") or {}).items():
+            tavily[k] = tavily.get(k, 0) + v
+    return {
+        "openai": openai,
+        "tavily": tavily,
+        "cost_usd": round(spent_usd(metrics), 6),
+        "ceiling_hit": any(u.get("ceiling_hit") for u in by_node.values()),
+        "by_node": by_node,
+    }
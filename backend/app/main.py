@@ -6,6 +6,8 @@ from pathlib import Path
 from app.api.routes import router
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.lifespan import lifespan
+from app.api.compression import COMPRESSION_MIN_BYTES, CompressionMiddleware
+from app.core.env import env_int
 
 # --- Load env first ---
 env_path = Path(__file__).resolve().parent.parent / ".env"
@@ -31,4 +33,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / brotli for large result sets; SSE streams are left alone
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=env_int("COMPRESSION_MIN_BYTES", COMPRESSION_MIN_BYTES),
+)
+
 app.include_router(router)
@@ -1,4 +1,5 @@
-from typing import List, Optional, Literal
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Literal
 from uuid import UUID
 from pydantic import BaseModel, HttpUrl, Field, field_validator
 
@@ -59,3 +60,74 @@ class LearningPathsResponse(BaseModel):
     request_id: UUID
     results: LearningPathsResults
     warnings: List[str] = Field(default_factory=list)
+    # served from a recent completed request with the same fingerprint
+    cached: bool = False
+
+
+JobStatus = Literal["running", "completed", "failed"]
+
+
+class LearningPathsJobResponse(BaseModel):
+    # job mode: returned by the 202 submit and by GET /learning-paths/{request_id}
+    request_id: UUID
+    status: JobStatus
+    results: Optional[LearningPathsResults] = None
+    warnings: List[str] = Field(default_factory=list)
+    error: Optional[str] = None
+
+
+BATCH_MAX_ITEMS = 50
+
+
+class LearningPathsBatchRequest(BaseModel):
+    items: List[LearningPathsRequest] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class LearningPathsBatchResponse(BaseModel):
+    # one entry per item, in request order; failed items carry error
+    items: List[LearningPathsJobResponse]
+
+
+ExportFormat = Literal["csv", "json", "ndjson"]
+ExportHorizon = Literal["short_term", "medium_term", "long_term", "all"]
+
+
+class ExportRequest(BaseModel):
+    # bulk export; GET /exports takes the same fields as query params
+    request_ids: List[UUID] = Field(min_length=1, max_length=10000)
+    horizon: ExportHorizon = "all"
+    format: ExportFormat = "csv"
+
+
+class RequestSummary(BaseModel):
+    # list view of a requests doc; results and the usage breakdown are left out
+    request_id: UUID
+    created_at: datetime
+    status: JobStatus
+    query: str
+    prefs: Optional[LearningPrefs] = None
+    fingerprint: Optional[str] = None
+    error: Optional[str] = None
+    reused_from: Optional[UUID] = None
+    cost_usd: Optional[float] = None
+
+
+class RequestHistoryPage(BaseModel):
+    # newest first; pass next_cursor back as ?cursor= for the next page
+    items: List[RequestSummary]
+    next_cursor: Optional[str] = None
+
+
+class AgentRun(BaseModel):
+    agent_name: str
+    started_at: datetime
+    ended_at: Optional[datetime] = None
+    output_summary: Optional[Dict[str, Any]] = None
+    warnings: List[str] = Field(default_factory=list)
+    error: Optional[str] = None
+
+
+class AgentRunsResponse(BaseModel):
+    # agent_runs of one request in execution order
+    request_id: UUID
+    runs: List[AgentRun]
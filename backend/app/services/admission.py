@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional
+
+# Graph runs on this instance go through one AdmissionController: at most
+# max_running at a time, the rest wait in a bounded queue for up to max_wait_s.
+# Waiting runs are released by weighted fair queuing on the client key: each
+# ticket gets a virtual finish time (cost / client weight after the client's
+# previous one), and the smallest finish time runs next, so a client flooding
+# the queue only delays its own requests. A ticket can hold several running
+# slots (a batch running items in parallel); it waits at the head of the queue
+# until that many are free.
+
+ADMISSION_MAX_RUNNING = 8
+ADMISSION_MAX_QUEUE = 32
+ADMISSION_CLIENT_QUEUE = 8
+ADMISSION_MAX_WAIT_SECONDS = 30.0
+ADMISSION_DEFAULT_RUN_SECONDS = 30.0  # Retry-After estimate until runs complete
+
+_RECENT_WAITS = 256
+
+
+class Overloaded(Exception):
+    # 429: this client already has its share queued; 503: the instance is full
+    def __init__(self, status_code: int, retry_after_s: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+        self.reason = reason
+
+
+@dataclass(eq=False)
+class Ticket:
+    client: str
+    cost: float
+    start: float  # virtual start / finish times
+    finish: float
+    enqueued_at: float
+    admitted: asyncio.Future
+    slots: int = 1  # running slots held while admitted
+    started_at: Optional[float] = None
+    done: bool = False
+
+
+@dataclass
+class _Client:
+    weight: float = 1.0
+    last_finish: float = 0.0
+    queued: int = 0
+    running: int = 0
+
+
+@dataclass
+class AdmissionController:
+    max_running: int = ADMISSION_MAX_RUNNING
+    max_queue: int = ADMISSION_MAX_QUEUE
+    max_queued_per_client: int = ADMISSION_CLIENT_QUEUE
+    max_wait_s: float = ADMISSION_MAX_WAIT_SECONDS
+    weights: dict[str, float] = field(default_factory=dict)
+    clock: Callable[[], float] = time.monotonic
+
+    def __post_init__(self) -> None:
+        self.max_running = max(self.max_running, 1)
+        self._clients: dict[str, _Client] = {}
+        self._heap: list[tuple[float, int, Ticket]] = []
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._running = 0
+        self._queued = 0
+        self._run_s = ADMISSION_DEFAULT_RUN_SECONDS
+        self._waits: deque[float] = deque(maxlen=_RECENT_WAITS)
+        self._counts = {"admitted": 0, "rejected_429": 0, "rejected_503": 0}
+
+    def ticket(self, client: str, cost: float = 1.0, slots: int = 1) -> Ticket:
+        # reserves a place (running or queued) or raises Overloaded right away
+        slots = min(max(slots, 1), self.max_running)
+        state = self._clients.get(client)
+        if state is None:
+            state = self._clients[client] = _Client(
+                weight=max(self.weights.get(client, 1.0), 0.01)
+            )
+        while self._heap and self._heap[0][2].done:
+            heapq.heappop(self._heap)
+        if self._running + slots <= self.max_running and not self._heap:
+            ticket = self._new_ticket(client, cost, state, slots)
+            self._start(ticket)
+            return ticket
+        if state.queued >= self.max_queued_per_client:
+            self._reject(client, 429)
+            raise Overloaded(429, self.retry_after_s(), "too many queued requests")
+        if self._queued >= self.max_queue:
+            self._reject(client, 503)
+            raise Overloaded(503, self.retry_after_s(), "queue full")
+
+        ticket = self._new_ticket(client, cost, state, slots)
+        heapq.heappush(self._heap, (ticket.finish, next(self._seq), ticket))
+        state.queued += 1
+        self._queued += 1
+        return ticket
+
+    async def wait(self, ticket: Ticket, timeout: Optional[float] = -1) -> None:
+        # timeout=-1: max_wait_s; None: wait as long as it takes (job mode)
+        timeout = self.max_wait_s if timeout == -1 else timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.admitted), timeout)
+        except asyncio.TimeoutError:
+            if not ticket.admitted.done():
+                self.cancel(ticket)
+                self._counts["rejected_503"] += 1
+                raise Overloaded(503, self.retry_after_s(), "queue wait timeout")
+        except asyncio.CancelledError:
+            self.release(ticket)
+            raise
+
+    def release(self, ticket: Ticket) -> None:
+        # ends a running ticket or drops a queued one; safe to call twice
+        if ticket.done:
+            return
+        if ticket.started_at is None:
+            self.cancel(ticket)
+            return
+        ticket.done = True
+        self._running -= ticket.slots
+        self._clients[ticket.client].running -= ticket.slots
+        # smoothed run time, for Retry-After
+        self._run_s = 0.8 * self._run_s + 0.2 * (self.clock() - ticket.started_at)
+        self._forget_if_idle(ticket.client)
+        self._dispatch()
+
+    def cancel(self, ticket: Ticket) -> None:
+        if ticket.done or ticket.started_at is not None:
+            return
+        ticket.done = True
+        # left in the heap and skipped when popped
+        self._clients[ticket.client].queued -= 1
+        self._queued -= 1
+        self._forget_if_idle(ticket.client)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self, client: str, cost: float = 1.0, slots: int = 1
+    ) -> AsyncIterator[Ticket]:
+        ticket = self.ticket(client, cost, slots)
+        async with self.admitted(ticket):
+            yield ticket
+
+    @asynccontextmanager
+    async def admitted(
+        self, ticket: Ticket, timeout: Optional[float] = -1
+    ) -> AsyncIterator[Ticket]:
+        await self.wait(ticket, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def retry_after_s(self) -> int:
+        # time for the queue ahead to drain at the current run rate
+        ahead = self._queued + 1
+        return max(1, math.ceil(self._run_s * ahead / self.max_running))
+
+    def snapshot(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        oldest = min(
+            (t.enqueued_at for _, _, t in self._heap if not t.done), default=None
+        )
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "max_running": self.max_running,
+            "max_queue": self.max_queue,
+            "oldest_wait_s": (
+                round(self.clock() - oldest, 3) if oldest is not None else 0.0
+            ),
+            "wait_s": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+            "avg_run_s": round(self._run_s, 3),
+            "retry_after_s": self.retry_after_s(),
+            **self._counts,
+            "clients": {
+                key: {"queued": c.queued, "running": c.running, "weight": c.weight}
+                for key, c in self._clients.items()
+            },
+        }
+
+    def _new_ticket(
+        self, client: str, cost: float, state: _Client, slots: int
+    ) -> Ticket:
+        start = max(self._vtime, state.last_finish)
+        state.last_finish = start + cost / state.weight
+        return Ticket(
+            client=client,
+            cost=cost,
+            start=start,
+            finish=state.last_finish,
+            enqueued_at=self.clock(),
+            admitted=asyncio.get_running_loop().create_future(),
+            slots=slots,
+        )
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.started_at = self.clock()
+        self._waits.append(ticket.started_at - ticket.enqueued_at)
+        self._running += ticket.slots
+        self._clients[ticket.client].running += ticket.slots
+        self._counts["admitted"] += 1
+        self._vtime = max(self._vtime, ticket.start)
+        ticket.admitted.set_result(None)
+
+    def _reject(self, client: str, status_code: int) -> None:
+        self._counts[f"rejected_{status_code}"] += 1
+        self._forget_if_idle(client)
+
+    def _forget_if_idle(self, client: str) -> None:
+        # an idle client starts over at the current virtual time anyway
+        state = self._clients[client]
+        if not state.queued and not state.running:
+            del self._clients[client]
+
+    def _dispatch(self) -> None:
+        while self._heap:
+            ticket = self._heap[0][2]
+            if ticket.done:
+                heapq.heappop(self._heap)
+                continue
+            # no overtaking: a multi-slot ticket at the head is not starved
+            if self._running + ticket.slots > self.max_running:
+                return
+            heapq.heappop(self._heap)
+            self._clients[ticket.client].queued -= 1
+            self._queued -= 1
+            self._start(ticket)
+
+
+def parse_weights(raw: str | None) -> dict[str, float]:
+    # "partner=4,internal=2" -> {"partner": 4.0, "internal": 2.0}
+    weights: dict[str, float] = {}
+    for part in (raw or "").split(","):
+        key, sep, value = part.partition("=")
+        if not sep or not key.strip():
+            continue
+        try:
+            weights[key.strip()] = float(value)
+        except ValueError as e:
+            raise RuntimeError(
+                f"ADMISSION_CLIENT_WEIGHTS entry '{part}' must be key=number"
+            ) from e
+    return weights
@@ -0,0 +1,72 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+from app.graph.deps import GraphDeps
+from app.graph.runner import GraphRunner
+from app.graph.shared import shared_deps
+from app.models.schemas import (
+    LearningPathsBatchRequest,
+    LearningPathsBatchResponse,
+    LearningPathsJobResponse,
+)
+from app.services.learning_paths import JOB_FAILED_ERROR, LearningPathsService
+
+logger = logging.getLogger(__name__)
+
+# A batch runs its items through one graph built on batch-scoped clients
+# (app.graph.shared), so a search, page extract or LLM request that several items
+# need is made once. Each item is still a normal request (own request_id,
+# requests / results docs, result reuse and coalescing).
+
+BATCH_MAX_CONCURRENCY = 4
+
+
+@dataclass
+class LearningPathsBatchService:
+    service: LearningPathsService
+    deps: GraphDeps
+    max_concurrency: int = BATCH_MAX_CONCURRENCY
+
+    def generate(
+        self, payload: LearningPathsBatchRequest
+    ) -> LearningPathsBatchResponse:
+        deps = shared_deps(self.deps)
+        service = replace(
+            self.service,
+            runner=GraphRunner(agent_runs_repo=self.service.agent_runs_repo, deps=deps),
+        )
+        # request ids first: every item has one even if its run fails (the docs
+        # are written only when each item ends in consolidated mode)
+        submitted = [service.begin(item) for item in payload.items]
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as pool:
+            futures = [pool.submit(service.run, *args) for args in submitted]
+
+        items: list[LearningPathsJobResponse] = []
+        for (request_id, *_), fut in zip(submitted, futures):
+            try:
+                response = fut.result()
+            except Exception:
+                items.append(
+                    LearningPathsJobResponse(
+                        request_id=request_id, status="failed", error=JOB_FAILED_ERROR
+                    )
+                )
+                continue
+            items.append(
+                LearningPathsJobResponse(
+                    request_id=request_id,
+                    status="completed",
+                    results=response.results,
+                    warnings=response.warnings,
+                )
+            )
+
+        logger.info(
+            "learning_paths_batch_done. items=%d failed=%d tavily=%s openai=%s",
+            len(items),
+            sum(1 for i in items if i.status == "failed"),
+            deps.tavily_client.stats(),
+            deps.openai_client.calls.stats(),
+        )
+        return LearningPathsBatchResponse(items=items)
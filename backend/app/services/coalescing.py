@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+from app.core.env import env_bool, env_float
+from app.db.async_repos import AsyncLeaseRepo, AsyncRequestsRepo, AsyncResultsRepo
+from app.db.mongo import LEASES_COLLECTION, REQUESTS_COLLECTION, RESULTS_COLLECTION
+from app.db.protocols import (
+    AsyncLeaseRepoProtocol,
+    AsyncRequestsRepoProtocol,
+    AsyncResultsRepoProtocol,
+    LeaseRepoProtocol,
+    RequestsRepoProtocol,
+    ResultsRepoProtocol,
+)
+from app.db.repos import LeaseRepo, RequestsRepo, ResultsRepo
+from app.graph.state import GraphState, ProgramRecordGraph, ResultsPayload
+
+logger = logging.getLogger(__name__)
+
+# Identical requests (same fingerprint) arriving while one is already running
+# attach to that graph run instead of starting their own. In-process callers
+# wait on the leader's call; with a lease repo, instances also coordinate through
+# a Mongo lease (_id = fingerprint) and followers poll the holder's request doc.
+# Every caller keeps its own request_id / requests doc; the leader's request_id
+# comes back in final_state["request_id"].
+
+SINGLEFLIGHT_LEASE_TTL_SECONDS = 180.0
+SINGLEFLIGHT_POLL_SECONDS = 1.0
+
+BUCKETS = ("short_term", "medium_term", "long_term")
+
+_STORE_DOWN = object()
+
+
+def paths_to_results_payload(paths: dict[str, Any]) -> ResultsPayload:
+    return {
+        bucket: [ProgramRecordGraph.model_validate(p) for p in paths.get(bucket) or []]
+        for bucket in BUCKETS
+    }
+
+
+def state_from_result(request_id: str, result_doc: dict[str, Any]) -> GraphState:
+    return {
+        "request_id": request_id,
+        "results": paths_to_results_payload(result_doc.get("paths") or {}),
+        "warnings": result_doc.get("warnings") or [],
+    }
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._calls.get(key)
+        if fut is not None:
+            # a cancelled follower must not cancel the leader's run
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        try:
+            result = await fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            # nobody may be waiting; don't log "exception was never retrieved"
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+@dataclass
+class RequestCoalescer:
+    # lease_repo / requests_repo / results_repo: cross-instance mode (all or none)
+    lease_repo: Optional[LeaseRepoProtocol] = None
+    requests_repo: Optional[RequestsRepoProtocol] = None
+    results_repo: Optional[ResultsRepoProtocol] = None
+    lease_ttl_s: float = SINGLEFLIGHT_LEASE_TTL_SECONDS
+    poll_s: float = SINGLEFLIGHT_POLL_SECONDS
+    flight: SingleFlight = field(default_factory=SingleFlight)
+    sleep: Callable[[float], None] = time.sleep
+    clock: Callable[[], float] = time.monotonic
+
+    def run(
+        self, key: str, request_id: str, fn: Callable[[], GraphState]
+    ) -> GraphState:
+        return self.flight.do(key, lambda: self._run_leased(key, request_id, fn))
+
+    def _run_leased(
+        self, key: str, request_id: str, fn: Callable[[], GraphState]
+    ) -> GraphState:
+        if self.lease_repo is None:
+            return fn()
+
+        holder = self._acquire(key, request_id)
+        if holder is _STORE_DOWN or holder is None:
+            # store down, or the lease kept changing hands: run uncoalesced
+            return fn()
+        if holder == request_id:
+            try:
+                return fn()
+            finally:
+                self._call_store("release", self.lease_repo.release, key, request_id)
+
+        state = self._wait_for(holder)
+        if state is not None:
+            logger.info(
+                "request_coalesced. request_id=%s leader=%s", request_id, holder
+            )
+            return state
+        # holder failed, vanished or is too slow: run it ourselves
+        return fn()
+
+    def _acquire(self, key: str, request_id: str) -> Any:
+        # the holder, None if it could not be read within a lease TTL, or
+        # _STORE_DOWN; only request_id itself means the lease is ours
+        deadline = self.clock() + self.lease_ttl_s
+        while True:
+            holder = self._call_store(
+                "acquire",
+                self.lease_repo.acquire,
+                key,
+                request_id,
+                self.lease_ttl_s,
+                default=_STORE_DOWN,
+            )
+            if holder is not None or self.clock() >= deadline:
+                return holder
+            self.sleep(self.poll_s)
+
+    def _wait_for(self, holder: str) -> Optional[GraphState]:
+        deadline = self.clock() + self.lease_ttl_s
+        while self.clock() < deadline:
+            doc = self._call_store(
+                "poll", self.requests_repo.get, holder, default=_STORE_DOWN
+            )
+            if doc is _STORE_DOWN:
+                return None
+            # no doc yet: the holder writes it when it ends (consolidated writes)
+            status = doc.get("status") if doc else "running"
+            if status == "completed":
+                result = self._call_store("poll", self.results_repo.get, holder)
+                return state_from_result(holder, result) if result else None
+            if status != "running":
+                return None
+            self.sleep(self.poll_s)
+        return None
+
+    def _call_store(
+        self, op: str, fn: Callable[..., Any], *args: Any, default: Any = None
+    ) -> Any:
+        # a store outage degrades to "no coalescing", never to a failed request
+        try:
+            return fn(*args)
+        except Exception:
+            logger.warning("request_lease_%s_failed.", op, exc_info=True)
+            return default
+
+
+@dataclass
+class AsyncRequestCoalescer:
+    lease_repo: Optional[AsyncLeaseRepoProtocol] = None
+    requests_repo: Optional[AsyncRequestsRepoProtocol] = None
+    results_repo: Optional[AsyncResultsRepoProtocol] = None
+    lease_ttl_s: float = SINGLEFLIGHT_LEASE_TTL_SECONDS
+    poll_s: float = SINGLEFLIGHT_POLL_SECONDS
+    flight: AsyncSingleFlight = field(default_factory=AsyncSingleFlight)
+    clock: Callable[[], float] = time.monotonic
+
+    async def run(
+        self, key: str, request_id: str, fn: Callable[[], Awaitable[GraphState]]
+    ) -> GraphState:
+        return await self.flight.do(key, lambda: self._run_leased(key, request_id, fn))
+
+    async def _run_leased(
+        self, key: str, request_id: str, fn: Callable[[], Awaitable[GraphState]]
+    ) -> GraphState:
+        if self.lease_repo is None:
+            return await fn()
+
+        holder = await self._acquire(key, request_id)
+        if holder is _STORE_DOWN or holder is None:
+            return await fn()
+        if holder == request_id:
+            try:
+                return await fn()
+            finally:
+                await self._call_store(
+                    "release", self.lease_repo.release, key, request_id
+                )
+
+        state = await self._wait_for(holder)
+        if state is not None:
+            logger.info(
+                "request_coalesced. request_id=%s leader=%s", request_id, holder
+            )
+            return state
+        return await fn()
+
+    async def _acquire(self, key: str, request_id: str) -> Any:
+        deadline = self.clock() + self.lease_ttl_s
+        while True:
+            holder = await self._call_store(
+                "acquire",
+                self.lease_repo.acquire,
+                key,
+                request_id,
+                self.lease_ttl_s,
+                default=_STORE_DOWN,
+            )
+            if holder is not None or self.clock() >= deadline:
+                return holder
+            await asyncio.sleep(self.poll_s)
+
+    async def _wait_for(self, holder: str) -> Optional[GraphState]:
+        deadline = self.clock() + self.lease_ttl_s
+        while self.clock() < deadline:
+            doc = await self._call_store(
+                "poll", self.requests_repo.get, holder, default=_STORE_DOWN
+            )
+            if doc is _STORE_DOWN:
+                return None
+            status = doc.get("status") if doc else "running"
+            if status == "completed":
+                result = await self._call_store("poll", self.results_repo.get, holder)
+                return state_from_result(holder, result) if result else None
+            if status != "running":
+                return None
+            await asyncio.sleep(self.poll_s)
+        return None
+
+    async def _call_store(
+        self,
+        op: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        default: Any = None,
+    ) -> Any:
+        try:
+            return await fn(*args)
+        except Exception:
+            logger.warning("request_lease_%s_failed.", op, exc_info=True)
+            return default
+
+
+def _coalescer_settings() -> dict[str, float]:
+    return {
+        "lease_ttl_s": env_float(
+            "SINGLEFLIGHT_LEASE_TTL_SECONDS", SINGLEFLIGHT_LEASE_TTL_SECONDS
+        ),
+        "poll_s": env_float("SINGLEFLIGHT_POLL_SECONDS", SINGLEFLIGHT_POLL_SECONDS),
+    }
+
+
+def make_coalescer(db: Database) -> Optional[RequestCoalescer]:
+    # SINGLEFLIGHT=0 disables coalescing; SINGLEFLIGHT_SHARED=1 adds the Mongo lease
+    if not env_bool("SINGLEFLIGHT", True):
+        return None
+    if not env_bool("SINGLEFLIGHT_SHARED", False):
+        return RequestCoalescer()
+    return RequestCoalescer(
+        lease_repo=LeaseRepo(db[LEASES_COLLECTION]),
+        requests_repo=RequestsRepo(db[REQUESTS_COLLECTION]),
+        results_repo=ResultsRepo(db[RESULTS_COLLECTION]),
+        **_coalescer_settings(),
+    )
+
+
+def make_async_coalescer(db: AsyncDatabase) -> Optional[AsyncRequestCoalescer]:
+    if not env_bool("SINGLEFLIGHT", True):
+        return None
+    if not env_bool("SINGLEFLIGHT_SHARED", False):
+        return AsyncRequestCoalescer()
+    return AsyncRequestCoalescer(
+        lease_repo=AsyncLeaseRepo(db[LEASES_COLLECTION]),
+        requests_repo=AsyncRequestsRepo(db[REQUESTS_COLLECTION]),
+        results_repo=AsyncResultsRepo(db[RESULTS_COLLECTION]),
+        **_coalescer_settings(),
+    )
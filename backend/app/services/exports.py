@@ -0,0 +1,138 @@
+import csv
+import io
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+import orjson
+
+from app.db.protocols import AsyncResultsRepoProtocol, ResultsRepoProtocol
+from app.services.learning_paths import stored_program_to_api
+
+# Exports stream from a results cursor: one row per program, tagged with its
+# request_id and horizon, written out in ~64 KB chunks. Memory stays flat no
+# matter how many request_ids are exported.
+
+HORIZONS = ["short_term", "medium_term", "long_term"]
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CSV_COLUMNS = [
+    "request_id",
+    "horizon",
+    "program_name",
+    "provider",
+    "topics_covered",
+    "format",
+    "duration",
+    "cost",
+    "prerequisites",
+    "location",
+    "who_this_is_for",
+    "source_link",
+    "citation",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _rows(doc: dict[str, Any], horizons: list[str]) -> Iterator[dict[str, Any]]:
+    paths = doc.get("paths") or {}
+    for horizon in horizons:
+        for p in paths.get(horizon) or []:
+            yield {
+                "request_id": doc["request_id"],
+                "horizon": horizon,
+                **stored_program_to_api(p),
+            }
+
+
+class _Encoder:
+    # header / row / footer pieces of one export format
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.count = 0
+
+    def header(self) -> str:
+        if self.fmt == "csv":
+            return self._csv_line(CSV_COLUMNS)
+        return "[" if self.fmt == "json" else ""
+
+    def row(self, row: dict[str, Any]) -> str:
+        self.count += 1
+        if self.fmt == "csv":
+            # same layout as the frontend's CSV export
+            topics = "; ".join(row.get("topics_covered") or [])
+            return self._csv_line(
+                [topics if c == "topics_covered" else row.get(c) for c in CSV_COLUMNS]
+            )
+        line = orjson.dumps(row).decode()
+        if self.fmt == "ndjson":
+            return line + "\n"
+        return line if self.count == 1 else "," + line
+
+    def footer(self) -> str:
+        return "]" if self.fmt == "json" else ""
+
+    @staticmethod
+    def _csv_line(values: list[Any]) -> str:
+        buf = io.StringIO()
+        csv.writer(buf).writerow(["" if v is None else v for v in values])
+        return buf.getvalue()
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[str]:
+    buf: list[str] = []
+    size = 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+@dataclass
+class ExportService:
+    results_repo: ResultsRepoProtocol
+
+    def export(
+        self, request_ids: list[str], horizons: list[str], fmt: str
+    ) -> Iterator[str]:
+        return _chunked(self._pieces(request_ids, horizons, _Encoder(fmt)))
+
+    def _pieces(
+        self, request_ids: list[str], horizons: list[str], encoder: _Encoder
+    ) -> Iterator[str]:
+        yield encoder.header()
+        for doc in self.results_repo.iter_paths(request_ids, horizons):
+            for row in _rows(doc, horizons):
+                yield encoder.row(row)
+        yield encoder.footer()
+
+
+@dataclass
+class AsyncExportService:
+    results_repo: AsyncResultsRepoProtocol
+
+    async def export(
+        self, request_ids: list[str], horizons: list[str], fmt: str
+    ) -> AsyncIterator[str]:
+        encoder = _Encoder(fmt)
+        buf: list[str] = [encoder.header()]
+        size = 0
+        async for doc in self.results_repo.iter_paths(request_ids, horizons):
+            for row in _rows(doc, horizons):
+                piece = encoder.row(row)
+                buf.append(piece)
+                size += len(piece)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield "".join(buf)
+                buf, size = [], 0
+        buf.append(encoder.footer())
+        yield "".join(buf)
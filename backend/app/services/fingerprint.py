@@ -0,0 +1,32 @@
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any
+
+# Requests that differ only in case, spacing, punctuation or pref ordering share
+# a fingerprint: "UX design, online!" == "ux  design online".
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def request_fingerprint(query: str, prefs: dict[str, Any] | None) -> str:
+    # unset prefs and missing prefs are the same request
+    norm_prefs = {
+        k: normalize_text(v) if isinstance(v, str) else v
+        for k, v in (prefs or {}).items()
+        if v not in (None, "")
+    }
+    key = json.dumps(
+        {"query": normalize_text(query), "prefs": norm_prefs},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
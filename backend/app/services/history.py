@@ -0,0 +1,130 @@
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+import orjson
+
+from app.db.protocols import (
+    AgentRunsReaderProtocol,
+    AsyncAgentRunsReaderProtocol,
+    AsyncRequestHistoryRepoProtocol,
+    RequestHistoryRepoProtocol,
+)
+from app.models.schemas import (
+    AgentRun,
+    AgentRunsResponse,
+    RequestHistoryPage,
+    RequestSummary,
+)
+
+# Request history pages by keyset, not skip: the cursor is the (created_at,
+# request_id) of the last item returned, so page N costs the same as page 1 and
+# requests created meanwhile neither shift nor repeat items.
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, request_id: str) -> str:
+    raw = orjson.dumps([created_at.isoformat(), request_id])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, request_id = orjson.loads(raw)
+        return datetime.fromisoformat(created_at), str(request_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor("invalid cursor") from e
+
+
+def _summary(doc: dict[str, Any]) -> RequestSummary:
+    request_input = doc.get("input") or {}
+    return RequestSummary(
+        request_id=doc["request_id"],
+        created_at=doc["created_at"],
+        status=doc["status"],
+        query=request_input.get("query", ""),
+        prefs=request_input.get("prefs"),
+        fingerprint=doc.get("fingerprint"),
+        error=doc.get("error"),
+        reused_from=doc.get("reused_from"),
+        cost_usd=(doc.get("usage") or {}).get("cost_usd"),
+    )
+
+
+def _page(docs: list[dict[str, Any]], limit: int) -> RequestHistoryPage:
+    # docs holds up to limit + 1: the extra one only says another page exists
+    items = docs[:limit]
+    next_cursor = None
+    if len(docs) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["request_id"])
+    return RequestHistoryPage(
+        items=[_summary(d) for d in items], next_cursor=next_cursor
+    )
+
+
+def _after(cursor: Optional[str]) -> Optional[tuple[datetime, str]]:
+    return decode_cursor(cursor) if cursor else None
+
+
+@dataclass
+class RequestHistoryService:
+    requests_repo: RequestHistoryRepoProtocol
+    agent_runs_repo: AgentRunsReaderProtocol
+
+    def page(
+        self,
+        status: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = HISTORY_PAGE_SIZE,
+    ) -> RequestHistoryPage:
+        docs = self.requests_repo.list_page(
+            status, fingerprint, _after(cursor), limit + 1
+        )
+        return _page(docs, limit)
+
+    def runs(self, request_id: str) -> Optional[AgentRunsResponse]:
+        # None: unknown request. A running one may lag its last node by the
+        # agent_runs flush interval.
+        docs = self.agent_runs_repo.list_for_request(request_id)
+        if not docs and self.requests_repo.get(request_id) is None:
+            return None
+        return AgentRunsResponse(
+            request_id=request_id, runs=[AgentRun(**d) for d in docs]
+        )
+
+
+@dataclass
+class AsyncRequestHistoryService:
+    requests_repo: AsyncRequestHistoryRepoProtocol
+    agent_runs_repo: AsyncAgentRunsReaderProtocol
+
+    async def page(
+        self,
+        status: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = HISTORY_PAGE_SIZE,
+    ) -> RequestHistoryPage:
+        docs = await self.requests_repo.list_page(
+            status, fingerprint, _after(cursor), limit + 1
+        )
+        return _page(docs, limit)
+
+    async def runs(self, request_id: str) -> Optional[AgentRunsResponse]:
+        docs = await self.agent_runs_repo.list_for_request(request_id)
+        if not docs and await self.requests_repo.get(request_id) is None:
+            return None
+        return AgentRunsResponse(
+            request_id=request_id, runs=[AgentRun(**d) for d in docs]
+        )
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = 4
+JOB_SHUTDOWN_GRACE_SECONDS = 30.0
+
+
+class BackgroundJobs:
+    # Runs job-mode requests after the 202 has been sent: blocking services on a
+    # bounded thread pool, async services as tasks limited by a semaphore.
+    # Job failures are already persisted (requests.status="failed") by the
+    # service, so they are only logged here.
+
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max(max_workers, 1)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="job"
+        )
+        self._sem = asyncio.Semaphore(self.max_workers)
+        self._futures: set[Future] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> None:
+        fut = self._pool.submit(fn, *args)
+        self._futures.add(fut)
+        fut.add_done_callback(self._on_done)
+
+    async def run_in_pool(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # a blocking call on the job pool, awaited from a spawned job
+        return await asyncio.wrap_future(self._pool.submit(fn, *args))
+
+    def spawn(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        gate: Optional[AsyncContextManager[Any]] = None,
+    ) -> None:
+        task = asyncio.create_task(self._run_async(fn, args, gate))
+        # keep a reference, the loop only holds weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    async def _run_async(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        args: tuple[Any, ...],
+        gate: Optional[AsyncContextManager[Any]],
+    ) -> None:
+        # gate (an admission slot) is entered before the semaphore: a task that
+        # holds a worker is already admitted, so it never waits on a queued one
+        async with gate or nullcontext(), self._sem:
+            await fn(*args)
+
+    def _on_done(self, fut: Future | asyncio.Task) -> None:
+        self._futures.discard(fut)
+        self._tasks.discard(fut)
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            logger.info("background_job_failed. error=%s", fut.exception())
+
+    async def shutdown(self, grace_seconds: float = JOB_SHUTDOWN_GRACE_SECONDS) -> None:
+        # give in-flight jobs a chance to finish and persist their status
+        pending = [asyncio.wrap_future(f) for f in list(self._futures)]
+        pending.extend(self._tasks)
+        if pending:
+            logger.info("background_jobs_draining. jobs=%d", len(pending))
+            _, not_done = await asyncio.wait(pending, timeout=grace_seconds)
+            for t in not_done:
+                t.cancel()
+            if not_done:
+                logger.warning("background_jobs_abandoned. jobs=%d", len(not_done))
+        self._pool.shutdown(wait=False, cancel_futures=True)
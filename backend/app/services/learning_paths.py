@@ -1,19 +1,37 @@
 import logging
 
 logger = logging.getLogger(__name__)
+import asyncio
 import uuid
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterator, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.db.models import RequestDoc, RequestInput, Paths, ProgramRecordDB
 from app.db.protocols import (
     RequestsRepoProtocol,
     ResultsRepoProtocol,
     AgentRunsRepoProtocol,
+    AsyncRequestsRepoProtocol,
+    AsyncResultsRepoProtocol,
+    AsyncAgentRunsRepoProtocol,
 )
-from app.graph.protocols import GraphRunnerProtocol
-from app.graph.state import ProgramRecordGraph, ResultsPayload, GraphState
+from app.graph.protocols import AsyncGraphRunnerProtocol, GraphRunnerProtocol
+from app.graph.state import (
+    ProgramRecordGraph,
+    ResultsPayload,
+    GraphState,
+    InputPayload,
+)
+from app.graph.usage import request_usage
+from app.services.coalescing import (
+    AsyncRequestCoalescer,
+    RequestCoalescer,
+    state_from_result,
+)
+from app.services.fingerprint import request_fingerprint
 from app.models.schemas import (
+    LearningPathsJobResponse,
     LearningPathsRequest,
     LearningPathsResponse,
     LearningPathsResults,
@@ -35,31 +53,183 @@ def results_payload_to_paths(results: ResultsPayload) -> Paths:
     )
 
 
+def program_to_api(p: ProgramRecordGraph) -> Program:
+    return Program.model_validate(
+        {
+            "program_name": p.program_name,
+            "provider": p.provider,
+            "topics_covered": p.topics_covered,
+            "format": p.format,
+            "duration": p.duration,
+            "cost": p.cost_text,
+            "prerequisites": p.prerequisites,
+            "location": p.location,
+            "who_this_is_for": p.who_this_is_for,
+            "source_link": p.source_link,  # str -> HttpUrl
+            "citation": p.citation,
+        }
+    )
+
+
 def results_payload_to_learning_paths_results(
     results: ResultsPayload,
 ) -> LearningPathsResults:
+    return LearningPathsResults(
+        short_term=[program_to_api(p) for p in results.get("short_term", [])],
+        medium_term=[program_to_api(p) for p in results.get("medium_term", [])],
+        long_term=[program_to_api(p) for p in results.get("long_term", [])],
+    )
 
-    def to_program(p: ProgramRecordGraph) -> Program:
-        return Program.model_validate(
-            {
-                "program_name": p.program_name,
-                "provider": p.provider,
-                "topics_covered": p.topics_covered,
-                "format": p.format,
-                "duration": p.duration,
-                "cost": p.cost_text,
-                "prerequisites": p.prerequisites,
-                "location": p.location,
-                "who_this_is_for": p.who_this_is_for,
-                "source_link": p.source_link,  # str -> HttpUrl
-                "citation": p.citation,
-            }
-        )
 
-    return LearningPathsResults(
-        short_term=[to_program(p) for p in results.get("short_term", [])],
-        medium_term=[to_program(p) for p in results.get("medium_term", [])],
-        long_term=[to_program(p) for p in results.get("long_term", [])],
+FAILED_RESULT_ERROR = "Generation failed. see requests.error for details."
+JOB_FAILED_ERROR = "Processing failed"
+RESULT_REUSE_MAX_AGE_SECONDS = 3600.0
+STREAM_CLOSED_ERROR = "Stream closed by client"
+
+# (event name, JSON-ready data) pairs, sent to streaming clients as SSE
+StreamEvent = tuple[str, dict[str, Any]]
+
+
+def _new_request(
+    payload: LearningPathsRequest,
+) -> tuple[uuid.UUID, RequestDoc, InputPayload]:
+    # returns (request_id, running request doc, graph input payload)
+    request_id = uuid.uuid4()
+    request_id_str = str(request_id)
+
+    logger.info(
+        "learning_paths_start. request_id=%s query_len=%s",
+        request_id_str,
+        len(payload.query),
+    )
+
+    prefs = payload.prefs.model_dump() if payload.prefs else None
+    doc = RequestDoc(
+        request_id=request_id_str,
+        created_at=datetime.now(timezone.utc),
+        status="running",
+        input=RequestInput(query=payload.query, prefs=prefs),
+        fingerprint=request_fingerprint(payload.query, prefs),
+        error=None,
+    )
+    return request_id, doc, {"query": payload.query, "prefs": prefs}
+
+
+def _final_results(
+    request_id: uuid.UUID, final_state: GraphState
+) -> tuple[ResultsPayload, LearningPathsResponse]:
+    final_state_results: ResultsPayload = final_state.get("results") or EMPTY_PATHS
+    results: LearningPathsResults = results_payload_to_learning_paths_results(
+        final_state_results
+    )
+
+    warnings: list[str] = final_state.get("warnings", [])
+
+    return final_state_results, LearningPathsResponse(
+        request_id=request_id, results=results, warnings=warnings
+    )
+
+
+def stored_program_to_api(p: dict[str, Any]) -> dict[str, Any]:
+    # stored records were validated on write; map fields without re-parsing
+    return {
+        "program_name": p.get("program_name"),
+        "provider": p.get("provider"),
+        "topics_covered": p.get("topics_covered") or [],
+        "format": p.get("format"),
+        "duration": p.get("duration"),
+        "cost": p.get("cost_text"),
+        "prerequisites": p.get("prerequisites"),
+        "location": p.get("location"),
+        "who_this_is_for": p.get("who_this_is_for"),
+        "source_link": p.get("source_link"),
+        "citation": p.get("citation"),
+    }
+
+
+def job_etag(request_doc: dict[str, Any]) -> str:
+    # results are written once, before the request is marked completed, so id +
+    # status identify the job response body
+    status = request_doc.get("status") or "running"
+    return f'W/"{request_doc["request_id"]}-{status}"'
+
+
+def _job_payload(
+    request_doc: dict[str, Any], result_doc: dict[str, Any] | None
+) -> dict[str, Any]:
+    # JSON-ready LearningPathsJobResponse
+    status = request_doc.get("status") or "running"
+    payload: dict[str, Any] = {
+        "request_id": request_doc["request_id"],
+        "status": status,
+        "results": None,
+        "warnings": [],
+        "error": None,
+    }
+    if status == "failed":
+        # requests.error holds the raw exception, keep it internal
+        payload["error"] = JOB_FAILED_ERROR
+    elif status == "completed" and result_doc is not None:
+        paths = result_doc.get("paths") or {}
+        payload["results"] = {
+            bucket: [stored_program_to_api(p) for p in paths.get(bucket) or []]
+            for bucket in EMPTY_PATHS
+        }
+        payload["warnings"] = result_doc.get("warnings") or []
+    return payload
+
+
+def _stream_event(kind: str, data: Any) -> StreamEvent:
+    if kind == "program":
+        return "program", program_to_api(data).model_dump(mode="json")
+    return kind, data
+
+
+def _fingerprint(graph_payload: InputPayload) -> str:
+    return request_fingerprint(graph_payload.get("query"), graph_payload.get("prefs"))
+
+
+def _reused_from(request_id: uuid.UUID, final_state: GraphState) -> str | None:
+    # set when the graph run belonged to another (coalesced) request
+    source = final_state.get("request_id")
+    return source if source and source != str(request_id) else None
+
+
+def _reuse_since(max_age_s: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=max_age_s)
+
+
+def _reusable_state(
+    source: dict[str, Any] | None, result_doc: dict[str, Any] | None
+) -> GraphState | None:
+    # only clean results are served again; failed runs store an error
+    if not source or not result_doc or result_doc.get("error"):
+        return None
+    return state_from_result(source["request_id"], result_doc)
+
+
+def _completed(
+    pending: RequestDoc, usage: dict[str, Any] | None, reused_from: str | None
+) -> RequestDoc:
+    return pending.model_copy(
+        update={"status": "completed", "usage": usage, "reused_from": reused_from}
+    )
+
+
+def _failed(pending: RequestDoc, e: Exception) -> RequestDoc:
+    return pending.model_copy(update={"status": "failed", "error": str(e)})
+
+
+def _log_done(response: LearningPathsResponse) -> None:
+    logger.info(
+        "learning_paths_done. request_id=%s short=%d medium=%d long=%d warnings=%d "
+        "cached=%s",
+        str(response.request_id),
+        len(response.results.short_term),
+        len(response.results.medium_term),
+        len(response.results.long_term),
+        len(response.warnings),
+        response.cached,
     )
 
 
@@ -69,76 +239,321 @@ class LearningPathsService:
     agent_runs_repo: AgentRunsRepoProtocol
     results_repo: ResultsRepoProtocol
     runner: GraphRunnerProtocol
+    coalescer: Optional[RequestCoalescer] = None
+    # serve a completed result with the same fingerprint up to this old (0 = off)
+    result_max_age_s: float = 0.0
+    # blocking / streamed requests write their requests doc once, when they end
+    consolidated_writes: bool = False
+
+    def submit(self, payload: LearningPathsRequest) -> tuple[uuid.UUID, InputPayload]:
+        request_id, doc, graph_payload = _new_request(payload)
+        self.requests_repo.create_running(doc)
+        return request_id, graph_payload
+
+    def begin(
+        self, payload: LearningPathsRequest
+    ) -> tuple[uuid.UUID, InputPayload, RequestDoc | None]:
+        # returns the unwritten running doc in consolidated mode
+        if not self.consolidated_writes:
+            return *self.submit(payload), None
+        request_id, doc, graph_payload = _new_request(payload)
+        return request_id, graph_payload, doc
 
     def generate(self, payload: LearningPathsRequest) -> LearningPathsResponse:
-        request_id = uuid.uuid4()
+        request_id, graph_payload, pending = self.begin(payload)
+        return self.run(request_id, graph_payload, pending)
+
+    def job_status(self, request_id: str) -> LearningPathsJobResponse | None:
+        request_doc = self.get_request(request_id)
+        if request_doc is None:
+            return None
+        return LearningPathsJobResponse.model_validate(self.job_payload(request_doc))
+
+    def get_request(self, request_id: str) -> dict[str, Any] | None:
+        return self.requests_repo.get(request_id)
+
+    def job_payload(self, request_doc: dict[str, Any]) -> dict[str, Any]:
+        result_doc = None
+        if request_doc.get("status") == "completed":
+            result_doc = self.results_repo.get(request_doc["request_id"])
+        return _job_payload(request_doc, result_doc)
+
+    def run(
+        self,
+        request_id: uuid.UUID,
+        graph_payload: InputPayload,
+        pending: RequestDoc | None = None,
+    ) -> LearningPathsResponse:
+        # pending: running doc not written yet (consolidated mode)
         request_id_str = str(request_id)
+        try:
+            reused_state = self._reusable_state(graph_payload)
+            if reused_state is not None:
+                return self._complete(request_id, reused_state, True, pending)
+            final_state = self._run_graph(request_id_str, graph_payload)
+            return self._complete(request_id, final_state, pending=pending)
+        except Exception as e:
+            self._fail(request_id_str, e, pending)
+            raise
 
-        logger.info(
-            "learning_paths_start. request_id=%s query_len=%s",
-            request_id_str,
-            len(payload.query),
-        )
+    def _reusable_state(self, graph_payload: InputPayload) -> GraphState | None:
+        if self.result_max_age_s <= 0:
+            return None
+        try:
+            source = self.requests_repo.find_completed(
+                _fingerprint(graph_payload), _reuse_since(self.result_max_age_s)
+            )
+            result_doc = self.results_repo.get(source["request_id"]) if source else None
+        except Exception:
+            logger.warning("result_reuse_lookup_failed.", exc_info=True)
+            return None
+        return _reusable_state(source, result_doc)
+
+    def _run_graph(
+        self, request_id_str: str, graph_payload: InputPayload
+    ) -> GraphState:
+        def run() -> GraphState:
+            return self.runner.run(request_id=request_id_str, payload=graph_payload)
+
+        if self.coalescer is None:
+            return run()
+        return self.coalescer.run(_fingerprint(graph_payload), request_id_str, run)
+
+    def stream(self, payload: LearningPathsRequest) -> Iterator[StreamEvent]:
+        # same lifecycle as generate(), with progress events along the way
+        request_id, graph_payload, pending = self.begin(payload)
+        request_id_str = str(request_id)
+        yield "started", {"request_id": request_id_str}
+        try:
+            final_state = self._reusable_state(graph_payload)
+            cached = final_state is not None
+            if not cached:
+                for kind, data in self.runner.stream(request_id_str, graph_payload):
+                    if kind == "final":
+                        final_state = data
+                    else:
+                        yield _stream_event(kind, data)
+            response = self._complete(request_id, final_state or {}, cached, pending)
+        except GeneratorExit:
+            # client went away: the graph run is abandoned with the stream
+            self._fail(request_id_str, RuntimeError(STREAM_CLOSED_ERROR), pending)
+            raise
+        except Exception as e:
+            self._fail(request_id_str, e, pending)
+            yield "error", {"request_id": request_id_str, "detail": JOB_FAILED_ERROR}
+            return
+        yield "results", response.model_dump(mode="json")
 
-        doc = RequestDoc(
+    def _complete(
+        self,
+        request_id: uuid.UUID,
+        final_state: GraphState,
+        cached: bool = False,
+        pending: RequestDoc | None = None,
+    ) -> LearningPathsResponse:
+        request_id_str = str(request_id)
+        final_state_results, response = _final_results(request_id, final_state)
+        response.cached = cached
+
+        self.results_repo.upsert_result(
             request_id=request_id_str,
-            created_at=datetime.now(timezone.utc),
-            status="running",
-            input=RequestInput(
-                query=payload.query,
-                prefs=(payload.prefs.model_dump() if payload.prefs else None),
-            ),
+            paths=results_payload_to_paths(final_state_results),
+            warnings=response.warnings,
             error=None,
         )
-        self.requests_repo.create_running(doc)
+        # results first: the requests doc's status is what readers go by
+        reused_from = _reused_from(request_id, final_state)
+        # the leader's request carries the spend
+        usage = None if reused_from else request_usage(final_state.get("metrics"))
+        if pending is not None:
+            self.requests_repo.finish(_completed(pending, usage, reused_from))
+        else:
+            self.requests_repo.mark_completed(
+                request_id=request_id_str, usage=usage, reused_from=reused_from
+            )
+
+        _log_done(response)
+        return response
+
+    def _fail(
+        self, request_id_str: str, e: Exception, pending: RequestDoc | None = None
+    ) -> None:
+        logger.exception("learning_paths_failed. request_id=%s", request_id_str)
+
+        self.results_repo.upsert_result(
+            request_id=request_id_str,
+            paths=results_payload_to_paths(EMPTY_PATHS),
+            warnings=[],
+            error=FAILED_RESULT_ERROR,
+        )
+        if pending is not None:
+            self.requests_repo.finish(_failed(pending, e))
+        else:
+            self.requests_repo.mark_failed(request_id=request_id_str, error=str(e))
+
+
+@dataclass
+class AsyncLearningPathsService:
+    requests_repo: AsyncRequestsRepoProtocol
+    agent_runs_repo: AsyncAgentRunsRepoProtocol
+    results_repo: AsyncResultsRepoProtocol
+    runner: AsyncGraphRunnerProtocol
+    coalescer: Optional[AsyncRequestCoalescer] = None
+    result_max_age_s: float = 0.0
+    consolidated_writes: bool = False
+
+    async def submit(
+        self, payload: LearningPathsRequest
+    ) -> tuple[uuid.UUID, InputPayload]:
+        request_id, doc, graph_payload = _new_request(payload)
+        await self.requests_repo.create_running(doc)
+        return request_id, graph_payload
+
+    async def begin(
+        self, payload: LearningPathsRequest
+    ) -> tuple[uuid.UUID, InputPayload, RequestDoc | None]:
+        if not self.consolidated_writes:
+            return *(await self.submit(payload)), None
+        request_id, doc, graph_payload = _new_request(payload)
+        return request_id, graph_payload, doc
+
+    async def generate(self, payload: LearningPathsRequest) -> LearningPathsResponse:
+        request_id, graph_payload, pending = await self.begin(payload)
+        return await self.run(request_id, graph_payload, pending)
+
+    async def job_status(self, request_id: str) -> LearningPathsJobResponse | None:
+        request_doc = await self.get_request(request_id)
+        if request_doc is None:
+            return None
+        return LearningPathsJobResponse.model_validate(
+            await self.job_payload(request_doc)
+        )
+
+    async def get_request(self, request_id: str) -> dict[str, Any] | None:
+        return await self.requests_repo.get(request_id)
 
+    async def job_payload(self, request_doc: dict[str, Any]) -> dict[str, Any]:
+        result_doc = None
+        if request_doc.get("status") == "completed":
+            result_doc = await self.results_repo.get(request_doc["request_id"])
+        return _job_payload(request_doc, result_doc)
+
+    async def run(
+        self,
+        request_id: uuid.UUID,
+        graph_payload: InputPayload,
+        pending: RequestDoc | None = None,
+    ) -> LearningPathsResponse:
+        request_id_str = str(request_id)
         try:
-            final_state: GraphState = self.runner.run(
-                request_id=request_id_str,
-                payload={
-                    "query": payload.query,
-                    "prefs": payload.prefs.model_dump() if payload.prefs else None,
-                },
-            )
+            reused_state = await self._reusable_state(graph_payload)
+            if reused_state is not None:
+                return await self._complete(request_id, reused_state, True, pending)
+            final_state = await self._run_graph(request_id_str, graph_payload)
+            return await self._complete(request_id, final_state, pending=pending)
+        except Exception as e:
+            await self._fail(request_id_str, e, pending)
+            raise
 
-            final_state_results: ResultsPayload = (
-                final_state.get("results") or EMPTY_PATHS
+    async def _reusable_state(self, graph_payload: InputPayload) -> GraphState | None:
+        if self.result_max_age_s <= 0:
+            return None
+        try:
+            source = await self.requests_repo.find_completed(
+                _fingerprint(graph_payload), _reuse_since(self.result_max_age_s)
             )
-            results: LearningPathsResults = results_payload_to_learning_paths_results(
-                final_state_results
+            result_doc = (
+                await self.results_repo.get(source["request_id"]) if source else None
             )
+        except Exception:
+            logger.warning("result_reuse_lookup_failed.", exc_info=True)
+            return None
+        return _reusable_state(source, result_doc)
 
-            warnings: list[str] = final_state.get("warnings", [])
-
-            self.results_repo.upsert_result(
-                request_id=request_id_str,
-                paths=results_payload_to_paths(final_state_results),
-                warnings=warnings,
-                error=None,
+    async def _run_graph(
+        self, request_id_str: str, graph_payload: InputPayload
+    ) -> GraphState:
+        async def run() -> GraphState:
+            return await self.runner.run(
+                request_id=request_id_str, payload=graph_payload
             )
-            self.requests_repo.mark_completed(request_id=request_id_str)
-
-            logger.info(
-                "learning_paths_done. request_id=%s short=%d medium=%d long=%d warnings=%d",
-                request_id_str,
-                len(results.short_term),
-                len(results.medium_term),
-                len(results.long_term),
-                len(warnings),
+
+        if self.coalescer is None:
+            return await run()
+        return await self.coalescer.run(
+            _fingerprint(graph_payload), request_id_str, run
+        )
+
+    async def stream(self, payload: LearningPathsRequest) -> AsyncIterator[StreamEvent]:
+        request_id, graph_payload, pending = await self.begin(payload)
+        request_id_str = str(request_id)
+        yield "started", {"request_id": request_id_str}
+        try:
+            final_state = await self._reusable_state(graph_payload)
+            cached = final_state is not None
+            if not cached:
+                async for kind, data in self.runner.stream(
+                    request_id_str, graph_payload
+                ):
+                    if kind == "final":
+                        final_state = data
+                    else:
+                        yield _stream_event(kind, data)
+            response = await self._complete(
+                request_id, final_state or {}, cached, pending
             )
+        except (GeneratorExit, asyncio.CancelledError):
+            await self._fail(request_id_str, RuntimeError(STREAM_CLOSED_ERROR), pending)
+            raise
+        except Exception as e:
+            await self._fail(request_id_str, e, pending)
+            yield "error", {"request_id": request_id_str, "detail": JOB_FAILED_ERROR}
+            return
+        yield "results", response.model_dump(mode="json")
+
+    async def _complete(
+        self,
+        request_id: uuid.UUID,
+        final_state: GraphState,
+        cached: bool = False,
+        pending: RequestDoc | None = None,
+    ) -> LearningPathsResponse:
+        request_id_str = str(request_id)
+        final_state_results, response = _final_results(request_id, final_state)
+        response.cached = cached
 
-            return LearningPathsResponse(
-                request_id=request_id, results=results, warnings=warnings
+        await self.results_repo.upsert_result(
+            request_id=request_id_str,
+            paths=results_payload_to_paths(final_state_results),
+            warnings=response.warnings,
+            error=None,
+        )
+        reused_from = _reused_from(request_id, final_state)
+        usage = None if reused_from else request_usage(final_state.get("metrics"))
+        if pending is not None:
+            await self.requests_repo.finish(_completed(pending, usage, reused_from))
+        else:
+            await self.requests_repo.mark_completed(
+                request_id=request_id_str, usage=usage, reused_from=reused_from
             )
 
-        except Exception as e:
-            logger.exception("learning_paths_failed. request_id=%s", request_id_str)
+        _log_done(response)
+        return response
+
+    async def _fail(
+        self, request_id_str: str, e: Exception, pending: RequestDoc | None = None
+    ) -> None:
+        logger.exception("learning_paths_failed. request_id=%s", request_id_str)
 
-            self.results_repo.upsert_result(
-                request_id=request_id_str,
-                paths=results_payload_to_paths(EMPTY_PATHS),
-                warnings=[],
-                error="Generation failed. see requests.error for details.",
+        await self.results_repo.upsert_result(
+            request_id=request_id_str,
+            paths=results_payload_to_paths(EMPTY_PATHS),
+            warnings=[],
+            error=FAILED_RESULT_ERROR,
+        )
+        if pending is not None:
+            await self.requests_repo.finish(_failed(pending, e))
+        else:
+            await self.requests_repo.mark_failed(
+                request_id=request_id_str, error=str(e)
             )
-            self.requests_repo.mark_failed(request_id=request_id_str, error=str(e))
-            raise
@@ -0,0 +1,120 @@
+"""Mongo writes per request: count and latency of the write commands a (mocked)
+blocking request sends, for each persistence mode.
+
+    cd backend && python -m benchmarks.request_writes [requests]
+
+Needs a local mongod (MONGODB_URI, default mongodb://localhost:27017); writes go
+to a throwaway `bench_request_writes` database that is dropped afterwards. The
+graph run uses the MOCK_EXTERNAL clients, so only persistence differs.
+"""
+
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+from pymongo import MongoClient, monitoring
+
+from app.core.runtime import build_learning_paths_service
+from app.db.mongo import AGENT_RUNS_COLLECTION, init_db
+from app.db.repos import AgentRunsRepo
+from app.db.writers import AgentRunsWriter
+from app.external.mocks import make_mock_openai_client, make_mock_tavily_client
+from app.graph.deps import GraphDeps
+from app.models.schemas import LearningPathsRequest
+
+DB_NAME = "bench_request_writes"
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+PAYLOAD = LearningPathsRequest(query="photography", prefs={"format": "online"})
+
+
+class WriteCounter(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self.by_collection: Counter[str] = Counter()
+        self.durations_ms: list[float] = []
+        self._pending: dict[int, str] = {}
+
+    def reset(self) -> None:
+        self.by_collection.clear()
+        self.durations_ms.clear()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in WRITE_COMMANDS and event.database_name == DB_NAME:
+            self._pending[event.request_id] = event.command[event.command_name]
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._pending.pop(event.request_id, None)
+        if collection is not None:
+            self.by_collection[collection] += 1
+            self.durations_ms.append(event.duration_micros / 1000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._pending.pop(event.request_id, None)
+
+
+def _run_mode(
+    label: str,
+    db,
+    counter: WriteCounter,
+    requests: int,
+    buffered: bool,
+    consolidated: bool,
+) -> None:
+    deps = GraphDeps(
+        openai_client=make_mock_openai_client(),
+        tavily_client=make_mock_tavily_client(),
+    )
+    writer: Optional[AgentRunsWriter] = None
+    if buffered:
+        writer = AgentRunsWriter(AgentRunsRepo(db[AGENT_RUNS_COLLECTION]))
+    service = build_learning_paths_service(
+        db, deps, agent_runs_writer=writer, consolidated_writes=consolidated
+    )
+    service.generate(PAYLOAD)  # warm-up: connections, compiled graph
+
+    counter.reset()
+    latencies = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        service.generate(PAYLOAD)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    if writer is not None:
+        writer.close()  # count the buffered agent_runs too
+
+    per_request = {
+        col: n / requests for col, n in sorted(counter.by_collection.items())
+    }
+    writes = sum(counter.by_collection.values()) / requests
+    latencies.sort()
+    print(
+        f"{label:<26} writes/request={writes:5.2f} "
+        f"write_ms(mean)={statistics.mean(counter.durations_ms or [0]):6.2f} "
+        f"request_ms(p50)={statistics.median(latencies):7.2f} "
+        f"request_ms(p95)={latencies[int(len(latencies) * 0.95) - 1]:7.2f}"
+    )
+    print(f"{'':<26} {per_request}")
+
+
+def main(requests: int = 50) -> None:
+    counter = WriteCounter()
+    client = MongoClient(
+        os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+        event_listeners=[counter],
+        serverSelectionTimeoutMS=2000,
+    )
+    client.drop_database(DB_NAME)
+    db = client[DB_NAME]
+    init_db(db)
+    try:
+        _run_mode("inline (before)", db, counter, requests, False, False)
+        _run_mode("buffered agent_runs", db, counter, requests, True, False)
+        _run_mode("buffered + consolidated", db, counter, requests, True, True)
+    finally:
+        client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,97 @@
+"""Per-request cost of building repos, GraphDeps and a compiled graph on every
+POST (the old route) vs. resolving the Runtime built once in lifespan.
+
+    cd backend && python -m benchmarks.runtime_overhead [iterations]
+
+Both cases time the whole per-request path: get the service (built, or looked
+up through the request like the routes do) and call generate() with the
+MOCK_EXTERNAL clients. No Mongo or API keys needed: writes go to a null
+database that discards them.
+"""
+
+import statistics
+import sys
+import time
+from typing import Callable
+
+from fastapi import FastAPI, Request
+
+from app.api.routes import _learning_paths_service
+from app.core.runtime import Runtime, build_learning_paths_service
+from app.external.mocks import make_mock_openai_client, make_mock_tavily_client
+from app.graph.deps import GraphDeps
+from app.models.schemas import LearningPathsRequest
+
+PAYLOAD = LearningPathsRequest.model_validate(
+    {"query": "photography", "prefs": {"format": "online", "city": "NYC"}}
+)
+
+
+class _NullCollection:
+    # the writes generate() issues; reads never happen with reuse off
+    def insert_one(self, doc) -> None:
+        pass
+
+    def insert_many(self, docs, ordered: bool = True) -> None:
+        pass
+
+    def update_one(self, filter, update, upsert: bool = False) -> None:
+        pass
+
+
+class _NullDatabase:
+    def __getitem__(self, name: str) -> _NullCollection:
+        return _NullCollection()
+
+
+def _request(api: FastAPI) -> Request:
+    return Request({"type": "http", "app": api, "headers": []})
+
+
+def _timed(fn: Callable[[], object], iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<28} mean={statistics.mean(samples):8.3f}ms "
+        f"p50={statistics.median(samples):8.3f}ms p95={p95:8.3f}ms"
+    )
+
+
+def main(iterations: int = 200) -> None:
+    db = _NullDatabase()
+    openai_client = make_mock_openai_client()
+    tavily_client = make_mock_tavily_client()
+
+    def make_deps() -> GraphDeps:
+        return GraphDeps(openai_client=openai_client, tavily_client=tavily_client)
+
+    api = FastAPI()
+    api.state.runtime = Runtime(service=build_learning_paths_service(db, make_deps()))
+
+    per_request = _timed(
+        lambda: build_learning_paths_service(db, make_deps()).generate(PAYLOAD),
+        iterations,
+    )
+    shared = _timed(
+        lambda: _learning_paths_service(_request(api)).generate(PAYLOAD), iterations
+    )
+    _report("request, per-request build", per_request)
+    _report("request, shared runtime", shared)
+    saved = statistics.mean(per_request) - statistics.mean(shared)
+    print(
+        f"saved per request: {saved:.3f}ms "
+        f"({saved / statistics.mean(per_request):.0%} of a mocked request)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,165 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from app.api.routes import generate_learning_paths
+from app.core.runtime import Runtime
+from app.models.schemas import LearningPathsRequest
+from app.services.admission import AdmissionController, Overloaded
+from app.services.jobs import JOB_WORKERS, BackgroundJobs
+
+
+class FakeAsyncService:
+    def __init__(self):
+        self.ran: list[uuid.UUID] = []
+
+    async def submit(self, payload):
+        return uuid.uuid4(), payload.model_dump()
+
+    async def run(self, request_id, graph_payload):
+        await asyncio.sleep(0)
+        self.ran.append(request_id)
+
+
+def make_job_request(api: FastAPI, client: str) -> Request:
+    headers = [(b"x-client-key", client.encode()), (b"prefer", b"respond-async")]
+    return Request({"type": "http", "app": api, "headers": headers})
+
+
+# ---------- Tests ----------
+
+
+# Verifies that queued runs are released by weighted fair queuing: a client with many queued runs cannot starve a later, lighter client.
+def test_fair_queuing_interleaves_clients():
+    async def scenario() -> list[str]:
+        admission = AdmissionController(max_running=1, max_queued_per_client=10)
+        first = admission.ticket("heavy")  # runs right away
+        heavy = [admission.ticket("heavy") for _ in range(4)]
+        light = [admission.ticket("light") for _ in range(2)]
+        owner = {id(t): t.client for t in heavy + light}
+
+        order: list[str] = []
+        running = first
+        for _ in range(len(heavy) + len(light)):
+            admission.release(running)
+            running = next(t for t in heavy + light if t.admitted.done() and not t.done)
+            order.append(owner[id(running)])
+        admission.release(running)
+        return order
+
+    order = asyncio.run(scenario())
+
+    # "heavy" already holds the running slot, so "light" goes first
+    assert order == ["light", "heavy", "light", "heavy", "heavy", "heavy"]
+
+
+# Verifies that a client over its queued share gets 429, a full queue 503, and both carry a Retry-After estimate.
+def test_overload_rejects_with_429_or_503():
+    async def scenario() -> tuple[Overloaded, Overloaded, dict]:
+        admission = AdmissionController(
+            max_running=1, max_queue=3, max_queued_per_client=2
+        )
+        admission.ticket("a")
+        admission.ticket("a")
+        admission.ticket("a")
+        with pytest.raises(Overloaded) as per_client:
+            admission.ticket("a")
+        admission.ticket("b")
+        with pytest.raises(Overloaded) as queue_full:
+            admission.ticket("c")
+        return per_client.value, queue_full.value, admission.snapshot()
+
+    per_client, queue_full, snapshot = asyncio.run(scenario())
+
+    assert per_client.status_code == 429
+    assert queue_full.status_code == 503
+    assert queue_full.retry_after_s >= 1
+    assert snapshot["running"] == 1
+    assert snapshot["queued"] == 3
+    assert snapshot["rejected_429"] == 1
+    assert snapshot["rejected_503"] == 1
+
+
+# Verifies that a run not admitted within max_wait_s fails with 503 and gives up its queue place.
+def test_queue_wait_timeout_frees_the_place():
+    async def scenario() -> tuple[int, dict, bool]:
+        admission = AdmissionController(max_running=1, max_wait_s=0.01)
+        running = admission.ticket("a")
+        waiting = admission.ticket("b")
+        with pytest.raises(Overloaded) as timed_out:
+            await admission.wait(waiting)
+        after_timeout = admission.snapshot()
+
+        admission.release(running)
+        async with admission.slot("c"):
+            admitted = True
+        return timed_out.value.status_code, after_timeout, admitted
+
+    status_code, snapshot, admitted = asyncio.run(scenario())
+
+    assert status_code == 503
+    assert snapshot["queued"] == 0
+    assert admitted
+
+
+# Verifies that a multi-slot ticket (a batch) counts as that many running runs, and waits at the head of the queue until enough slots are free.
+def test_batch_ticket_holds_several_running_slots():
+    async def scenario() -> list[tuple[int, bool]]:
+        admission = AdmissionController(max_running=4, max_queued_per_client=10)
+        batch = admission.ticket("a", cost=3, slots=3)
+        single = admission.ticket("b")
+        second_batch = admission.ticket("c", cost=3, slots=3)  # needs 3, 0 free
+        late = admission.ticket("c")  # queued behind it, may not overtake
+
+        states = [(admission.snapshot()["running"], second_batch.admitted.done())]
+        admission.release(single)  # 1 free: still not enough
+        states.append((admission.snapshot()["running"], late.admitted.done()))
+        admission.release(batch)  # 4 free: the batch, then the single
+        states.append((admission.snapshot()["running"], late.admitted.done()))
+        return states
+
+    states = asyncio.run(scenario())
+
+    assert states == [(4, False), (3, False), (4, True)]
+
+
+# Verifies that job mode never deadlocks when more jobs than JOB_WORKERS from several clients wait for admission: every job runs and all slots are given back. (service mocked)
+def test_jobs_beyond_job_workers_all_complete():
+    async def scenario() -> tuple[int, dict]:
+        service = FakeAsyncService()
+        admission = AdmissionController()
+        api = FastAPI()
+        api.state.job_mode = False
+        api.state.async_pipeline = True
+        api.state.admission = admission
+        api.state.jobs = BackgroundJobs()
+        api.state.runtime = Runtime(service=None, async_service=service)
+        payload = LearningPathsRequest(query="photography")
+
+        # client "a" fills every running slot, then queues JOB_WORKERS jobs
+        # ahead of one job each from eight other clients
+        busy = [admission.ticket("a") for _ in range(admission.max_running)]
+        clients = ["a"] * JOB_WORKERS + [f"client-{i}" for i in range(8)]
+        for client in clients:
+            response = Response()
+            await generate_learning_paths(
+                make_job_request(api, client), payload, response
+            )
+            assert response.status_code == 202
+        for ticket in busy:
+            admission.release(ticket)
+
+        async def drained() -> None:
+            while len(service.ran) < len(clients):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(drained(), timeout=2)
+        await api.state.jobs.shutdown()
+        return len(service.ran), admission.snapshot()
+
+    ran, snapshot = asyncio.run(scenario())
+
+    assert ran == JOB_WORKERS + 8
+    assert snapshot["running"] == 0 and snapshot["queued"] == 0
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.db.models import AgentRunDoc
+from app.db.writers import AgentRunsWriter, AgentRunWriteError, AsyncAgentRunsWriter
+
+
+def make_doc(agent_name: str, error: str | None = None) -> AgentRunDoc:
+    return AgentRunDoc(
+        request_id="req_1",
+        agent_name=agent_name,
+        started_at=datetime.now(timezone.utc),
+        error=error,
+    )
+
+
+class SlowAgentRunsRepo:
+    # insert_runs blocks until `release` is set, like a slow Mongo round trip
+    def __init__(self):
+        self.batches: list[list[str]] = []
+        self.release = threading.Event()
+
+    def insert_runs(self, docs: list[AgentRunDoc]) -> None:
+        self.release.wait(timeout=5)
+        self.batches.append([d.agent_name for d in docs])
+
+
+class DownAgentRunsRepo:
+    # insert_runs fails `batch_failures` times; insert_run fails if single_down
+    def __init__(self, batch_failures: int, single_down: bool = False):
+        self.batch_failures = batch_failures
+        self.single_down = single_down
+        self.batch_calls = 0
+        self.stored: list[str] = []
+
+    def insert_runs(self, docs: list[AgentRunDoc]) -> None:
+        self.batch_calls += 1
+        if self.batch_calls <= self.batch_failures:
+            raise AutoReconnect("primary stepped down")
+        self.stored.extend(d.agent_name for d in docs)
+
+    def insert_run(self, doc: AgentRunDoc) -> None:
+        if self.single_down:
+            raise AutoReconnect("no primary")
+        self.stored.append(doc.agent_name)
+
+
+class AsyncAgentRunsRepo:
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    async def insert_runs(self, docs: list[AgentRunDoc]) -> None:
+        self.batches.append([d.agent_name for d in docs])
+
+
+# ---------- Tests ----------
+
+
+# Verifies that node docs are buffered without waiting on Mongo and written with one insert_many per batch, and that close() drains the buffer. (DB mocked)
+def test_writer_buffers_runs_and_drains_on_close():
+    # --- Arrange ---
+    repo = SlowAgentRunsRepo()
+    writer = AgentRunsWriter(repo, flush_size=10, flush_interval_s=60)
+
+    # --- Act ---
+    for name in ["scout", "extract", "organize"]:
+        writer.insert_run(make_doc(name))  # returns while the write is blocked
+    buffered = list(repo.batches)
+    repo.release.set()
+    writer.close(timeout=5)
+
+    # --- Assert ---
+    assert buffered == []
+    assert repo.batches == [["scout", "extract", "organize"]]
+    assert writer.stats == {"written": 3, "dropped": 0, "flushes": 1}
+
+
+# Verifies that a failure doc is written (with everything buffered before it) before insert_run returns. (DB mocked)
+def test_writer_writes_failure_doc_before_returning():
+    # --- Arrange ---
+    repo = SlowAgentRunsRepo()
+    repo.release.set()
+    writer = AgentRunsWriter(repo, flush_size=10, flush_interval_s=60)
+
+    # --- Act ---
+    writer.insert_run(make_doc("scout"))
+    writer.insert_run(make_doc("extract", error="boom"))
+    written = [name for batch in repo.batches for name in batch]
+    writer.close(timeout=5)
+
+    # --- Assert ---
+    assert written == ["scout", "extract"]
+
+
+# Verifies that a failed insert_many is retried, and that after the last attempt the failure doc falls back to insert_one, or raises in its insert_run if that fails too. (DB mocked)
+def test_writer_retries_batches_and_surfaces_a_lost_failure_doc():
+    # --- Arrange ---
+    flaky = DownAgentRunsRepo(batch_failures=1)
+    broken = DownAgentRunsRepo(batch_failures=10)
+    down = DownAgentRunsRepo(batch_failures=10, single_down=True)
+    writers = [
+        AgentRunsWriter(repo, flush_size=10, flush_interval_s=60, retry_s=0)
+        for repo in (flaky, broken, down)
+    ]
+
+    # --- Act ---
+    for writer in writers[:2]:
+        writer.insert_run(make_doc("scout"))
+        writer.insert_run(make_doc("extract", error="boom"))
+    writers[2].insert_run(make_doc("scout"))
+    with pytest.raises(AgentRunWriteError):
+        writers[2].insert_run(make_doc("extract", error="boom"))
+    for writer in writers:
+        writer.close(timeout=5)
+
+    # --- Assert ---
+    assert flaky.stored == ["scout", "extract"] and flaky.batch_calls == 2
+    assert broken.stored == ["extract"]  # scout dropped, failure doc kept
+    assert writers[1].stats == {"written": 1, "dropped": 1, "flushes": 1}
+    assert down.stored == []
+
+
+# Verifies that the async writer flushes on size, on failure docs and on aclose(). (DB mocked)
+def test_async_writer_flushes_on_size_failure_and_close():
+    # --- Arrange ---
+    repo = AsyncAgentRunsRepo()
+
+    async def scenario() -> tuple[list, list]:
+        writer = AsyncAgentRunsWriter(repo, flush_size=2, flush_interval_s=60)
+        await writer.insert_run(make_doc("scout"))
+        await writer.insert_run(make_doc("extract"))  # full batch
+        await writer.insert_run(make_doc("organize", error="boom"))  # waits
+        after_failure = list(repo.batches)
+        await writer.insert_run(make_doc("scout"))
+        await writer.aclose()
+        return after_failure, repo.batches
+
+    # --- Act ---
+    after_failure, batches = asyncio.run(scenario())
+
+    # --- Assert ---
+    assert [n for b in after_failure for n in b] == ["scout", "extract", "organize"]
+    assert [n for b in batches for n in b][-1] == "scout"
+    assert sum(len(b) for b in batches) == 4
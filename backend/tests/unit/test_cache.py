@@ -0,0 +1,84 @@
+from typing import Any
+
+from app.cache.memory import MemoryCache
+from app.cache.tiered import TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DummyCacheRepo:
+    def __init__(self):
+        self.docs: dict[str, tuple[Any, float]] = {}
+        self.get_calls: list[list[str]] = []
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        self.get_calls.append(list(keys))
+        return {k: self.docs[k] for k in keys if k in self.docs}
+
+    def set_many(self, items: dict[str, Any], ttl_seconds: float) -> None:
+        for k, v in items.items():
+            self.docs[k] = (v, ttl_seconds)
+
+
+class FailingCacheRepo:
+    def get_many(self, keys: list[str]):
+        raise ConnectionError("mongo down")
+
+    def set_many(self, items: dict[str, Any], ttl_seconds: float):
+        raise ConnectionError("mongo down")
+
+
+# ---------- Tests ----------
+
+
+# Verifies LRU eviction order and per-entry expiry of the in-process tier.
+def test_memory_cache_evicts_lru_and_expires():
+    clock = FakeClock()
+    cache = MemoryCache(max_entries=2, ttl_seconds=10, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    cache.set("short", 4, ttl_seconds=1)
+    clock.now = 5
+    assert cache.get("short") is None
+    assert cache.get("c") == 3
+    clock.now = 11
+    assert cache.get("c") is None
+
+
+# Verifies that store hits are promoted into memory and writes go to both tiers.
+def test_tiered_cache_promotes_store_hits():
+    store = DummyCacheRepo()
+    store.docs["k1"] = ({"v": 1}, 30.0)
+    cache = TieredCache(memory=MemoryCache(max_entries=10, ttl_seconds=60), store=store)
+
+    assert cache.get_many(["k1", "k2"]) == {"k1": {"v": 1}}
+    assert cache.get("k1") == {"v": 1}
+    assert store.get_calls == [["k1", "k2"]]  # second lookup served from memory
+
+    cache.set("k2", {"v": 2})
+    assert store.docs["k2"] == ({"v": 2}, 60)
+
+
+# Verifies that a failing shared tier degrades to memory-only instead of raising.
+def test_tiered_cache_tolerates_store_failures():
+    cache = TieredCache(
+        memory=MemoryCache(max_entries=10, ttl_seconds=60), store=FailingCacheRepo()
+    )
+
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    assert cache.get_many(["missing"]) == {}
@@ -0,0 +1,99 @@
+from app.graph.condense import clean_page, condense_page, count_tokens
+
+NAV = "\n".join(
+    f"* [Menu item {i}](https://example.com/nav/{i}) [Sub item {i}](/nav/{i}/sub)"
+    for i in range(60)
+)
+BOILERPLATE = """
+![logo](https://example.com/logo.png)
+![](data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7)
+We use cookies to improve your experience. Accept all
+[Sign in](https://example.com/login)
+"""
+FILLER = "\n\n".join(
+    f"## Story {i}\n\nOur alumni share photos of their city walks and favourite "
+    "cameras in this community gallery, updated every season with new pictures."
+    for i in range(40)
+)
+DETAILS = """
+## Tuition and schedule
+
+Tuition is $1,250 for the full program. The course runs 8 weeks, online, with live
+sessions twice a week. No prior experience required; beginners welcome.
+
+## Curriculum
+
+Modules cover exposure, composition, lighting and a final portfolio project.
+"""
+
+
+# ---------- Tests ----------
+
+
+# Verifies that images, base64 assets, link targets and cookie/login boilerplate are stripped while link text is kept.
+def test_clean_page_strips_markdown_noise_and_boilerplate():
+    # --- Arrange ---
+    text = BOILERPLATE + "\nSee the [course catalog](https://example.com/catalog)."
+
+    # --- Act ---
+    cleaned = clean_page(text)
+
+    # --- Assert ---
+    assert cleaned == "See the course catalog."
+
+
+# Verifies that syllabus lines mentioning JavaScript, login or subscriptions are kept while bare nav / consent labels go.
+def test_clean_page_keeps_syllabus_lines_that_mention_boilerplate_words():
+    # --- Arrange ---
+    text = (
+        "# Full-Stack Web Bootcamp\n\nWhat you cover:\n- JavaScript and the DOM\n"
+        "- React with TypeScript\n- Node.js and Express\n- Login flows with OAuth\n"
+        "- Subscribe / publish messaging with Redis\n\nLog in\nSubscribe\n"
+        "Accept all cookies\n"
+    )
+
+    # --- Act ---
+    cleaned = clean_page(text)
+
+    # --- Assert ---
+    assert cleaned.splitlines() == [
+        "# Full-Stack Web Bootcamp",
+        "",
+        "What you cover:",
+        "JavaScript and the DOM",
+        "React with TypeScript",
+        "Node.js and Express",
+        "Login flows with OAuth",
+        "Subscribe / publish messaging with Redis",
+    ]
+
+
+# Verifies that a long page keeps its title and the price / duration / syllabus sections within the token budget.
+def test_condense_page_keeps_field_sections_within_budget():
+    # --- Arrange ---
+    page = "# Photo School\n\n" + NAV + BOILERPLATE + FILLER + DETAILS + FILLER
+
+    # --- Act ---
+    condensed = condense_page(page, token_budget=300, query="photography")
+
+    # --- Assert ---
+    assert count_tokens(condensed) <= 300
+    assert condensed.startswith("# Photo School")
+    assert "Tuition is $1,250 for the full program." in condensed
+    assert "runs 8 weeks, online" in condensed
+    assert "Modules cover exposure" in condensed
+    assert "https://" not in condensed
+    assert "base64" not in condensed
+
+
+# Verifies that a page that already fits the budget is only cleaned, not cut.
+def test_condense_page_returns_short_pages_whole():
+    # --- Arrange ---
+    page = "# Photo School" + DETAILS
+
+    # --- Act ---
+    condensed = condense_page(page, token_budget=1800)
+
+    # --- Assert ---
+    assert condensed == clean_page(page)
+    assert condense_page("", token_budget=1800) == ""
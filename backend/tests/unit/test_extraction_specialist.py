@@ -0,0 +1,428 @@
+import importlib
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from app.cache.memory import MemoryCache
+from app.cache.tiered import TieredCache
+from app.graph.domains import DomainCounts, DomainPolicy, DomainStats
+from app.graph.nodes.extraction_specialist import extraction_specialist
+from app.graph.state import ProgramRecordGraph
+
+# app.graph.nodes re-exports the node function under the same name as the module
+es = importlib.import_module("app.graph.nodes.extraction_specialist")
+
+URLS = [
+    "https://example.com/slow",
+    "https://example.com/broken",
+    "https://example.com/fast",
+]
+
+
+def make_record(url: str) -> ProgramRecordGraph:
+    return ProgramRecordGraph(
+        program_name=f"Program for {url}",
+        provider="Example",
+        duration="3 weeks",
+        cost_text="$100",
+        source_link=url,
+        citation=url,
+    )
+
+
+class FakeTavilyClient:
+    def __init__(
+        self, url_to_text: dict[str, str], failing: dict[str, str] | None = None
+    ):
+        self.url_to_text = url_to_text
+        self.failing = failing or {}
+        self.extract_calls: list[list[str]] = []
+
+    def search(self, query: str, max_results: int | None = None, **kwargs: Any):
+        return {"results": []}
+
+    def extract(self, urls, extract_depth=None, **kwargs: Any):
+        self.extract_calls.append(list(urls))
+        return {
+            "results": [
+                {"url": u, "raw_content": self.url_to_text[u]}
+                for u in urls
+                if u in self.url_to_text
+            ],
+            "failed_results": [
+                {"url": u, "error": self.failing[u]} for u in urls if u in self.failing
+            ],
+        }
+
+
+class SlowFakeResponses:
+    # Per-URL latency + failures; tracks peak number of concurrent calls
+    def __init__(self, delays: dict[str, float], failing: set[str]):
+        self.delays = delays
+        self.failing = failing
+        self.calls: list[dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def parse(self, *, input, **kwargs: Any):
+        url = input[1]["content"].split("\n")[0].removeprefix("URL: ")
+        with self._lock:
+            self.calls.append({"url": url, **kwargs})
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(url, 0))
+            if url in self.failing:
+                raise RuntimeError("LLM unavailable")
+            return SimpleNamespace(output_parsed=make_record(url))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_state(urls: list[str]) -> dict:
+    return {"raw_leads": [{"url": u} for u in urls]}
+
+
+# ---------- Tests ----------
+
+
+# Verifies that parallel LLM extraction keeps URL order, keeps per-URL warnings and passes the per-call timeout.
+def test_parallel_extraction_preserves_order_and_warnings():
+    # --- Arrange ---
+    tavily_client = FakeTavilyClient({u: f"text for {u}" for u in URLS})
+    responses = SlowFakeResponses(
+        delays={URLS[0]: 0.2, URLS[1]: 0.05, URLS[2]: 0.0},
+        failing={URLS[1]},
+    )
+    openai_client = SimpleNamespace(responses=responses)
+
+    # --- Act ---
+    updates = extraction_specialist(
+        make_state(URLS),
+        tavily_client=tavily_client,
+        openai_client=openai_client,
+        max_concurrency=3,
+        llm_timeout=12.5,
+    )
+
+    # --- Assert ---
+    programs = updates["extracted_programs"]
+    assert [p.source_link for p in programs] == [URLS[0], URLS[2]]
+    assert updates["warnings"] == [
+        f"Extraction Specialist: Failed for {URLS[1]} (LLM unavailable)"
+    ]
+
+    assert responses.max_in_flight > 1
+    assert all(c["timeout"] == 12.5 for c in responses.calls)
+    assert len(tavily_client.extract_calls) == 1
+
+
+# Verifies that the concurrency limit is respected.
+def test_parallel_extraction_respects_concurrency_limit():
+    # --- Arrange ---
+    urls = [f"https://example.com/p{i}" for i in range(6)]
+    tavily_client = FakeTavilyClient({u: "text" for u in urls})
+    responses = SlowFakeResponses(delays={u: 0.05 for u in urls}, failing=set())
+    openai_client = SimpleNamespace(responses=responses)
+
+    # --- Act ---
+    updates = extraction_specialist(
+        make_state(urls),
+        tavily_client=tavily_client,
+        openai_client=openai_client,
+        max_concurrency=2,
+    )
+
+    # --- Assert ---
+    assert [p.source_link for p in updates["extracted_programs"]] == urls
+    assert responses.max_in_flight <= 2
+
+
+# Verifies that repeated pages are served from the LLM cache and that hit/miss counts are reported.
+def test_llm_cache_hits_skip_openai_and_report_counts(monkeypatch):
+    # --- Arrange ---
+    urls = URLS[::2]
+    tavily_client = FakeTavilyClient({u: f"text for {u}" for u in urls})
+    responses = SlowFakeResponses(delays={}, failing=set())
+    openai_client = SimpleNamespace(responses=responses)
+    llm_cache = TieredCache(memory=MemoryCache(max_entries=10, ttl_seconds=60))
+
+    def run():
+        return extraction_specialist(
+            make_state(urls),
+            tavily_client=tavily_client,
+            openai_client=openai_client,
+            llm_cache=llm_cache,
+        )
+
+    # --- Act ---
+    first = run()
+    second = run()
+
+    # --- Assert ---
+    assert first["metrics"]["llm_cache"] == {"hits": 0, "misses": 2}
+    assert second["metrics"]["llm_cache"] == {"hits": 2, "misses": 0}
+    assert len(responses.calls) == 2
+    assert second["extracted_programs"] == first["extracted_programs"]
+
+    # a new prompt version invalidates every cached entry
+    monkeypatch.setattr(es, "_SYSTEM_PROMPT_VERSION", "changed")
+    third = run()
+    assert third["metrics"]["llm_cache"] == {"hits": 0, "misses": 2}
+    assert len(responses.calls) == 4
+
+
+# Verifies that cached pages and cached extract failures are not sent to Tavily again.
+def test_page_cache_skips_fetched_and_failed_urls():
+    # --- Arrange ---
+    ok_url, dead_url = URLS[0], URLS[1]
+    tavily_client = FakeTavilyClient(
+        {ok_url: "page text"}, failing={dead_url: "Failed to fetch url"}
+    )
+    responses = SlowFakeResponses(delays={}, failing=set())
+    openai_client = SimpleNamespace(responses=responses)
+    page_cache = TieredCache(memory=MemoryCache(max_entries=10, ttl_seconds=60))
+
+    def run(urls: list[str]):
+        return extraction_specialist(
+            make_state(urls),
+            tavily_client=tavily_client,
+            openai_client=openai_client,
+            page_cache=page_cache,
+        )
+
+    # --- Act ---
+    first = run([ok_url, dead_url])
+    # tracking params / trailing slash resolve to the same canonical URL
+    second = run([ok_url + "/?utm_source=newsletter", dead_url])
+
+    # --- Assert ---
+    assert tavily_client.extract_calls == [[ok_url, dead_url]]
+    assert first["metrics"]["page_cache"] == {
+        "hits": 0,
+        "negative_hits": 0,
+        "misses": 2,
+    }
+    assert second["metrics"]["page_cache"] == {
+        "hits": 1,
+        "negative_hits": 1,
+        "misses": 0,
+    }
+    assert len(second["extracted_programs"]) == 1
+    assert second["warnings"] == [
+        f"Extraction Specialist: Tavily extract failed for {dead_url} "
+        "(Failed to fetch url, cached)"
+    ]
+
+
+# Verifies that denied and low-yield hosts are skipped, poor hosts are down-ranked, and fresh outcomes update the per-host stats.
+def test_domain_policy_filters_and_ranks_leads_before_extraction():
+    # --- Arrange ---
+    urls = [
+        "https://www.reddit.com/r/learnpython/comments/1",
+        "https://salaries.example.org/python-developer",
+        "https://weak.example.net/course",
+        "https://school.example.com/python",
+        "https://weak-but-trusted.example.io/course",
+    ]
+    stats = DomainStats(clock=lambda: 1_000_000.0)  # no decay between calls
+    stats.record(
+        {
+            # every extract failed -> yield 0.0, below the skip threshold
+            "salaries.example.org": DomainCounts(
+                extract_attempts=5, extract_failures=5
+            ),
+            # 1 in 5 LLM failures, half the fields "Not specified" -> yield 0.4
+            "weak.example.net": DomainCounts(
+                extract_attempts=5,
+                llm_attempts=5,
+                llm_failures=1,
+                fields_total=30,
+                fields_not_specified=15,
+            ),
+            "weak-but-trusted.example.io": DomainCounts(
+                extract_attempts=5, extract_failures=5
+            ),
+        }
+    )
+    policy = DomainPolicy(
+        allowlist=["example.io"],
+        denylist=["reddit.com"],
+        stats=stats,
+        skip_below=0.15,
+        downrank_below=0.5,
+        probe_rate=0.0,
+    )
+    tavily_client = FakeTavilyClient({u: f"text for {u}" for u in urls})
+    responses = SlowFakeResponses(delays={}, failing=set())
+    openai_client = SimpleNamespace(responses=responses)
+
+    # --- Act ---
+    updates = extraction_specialist(
+        make_state(urls),
+        tavily_client=tavily_client,
+        openai_client=openai_client,
+        domain_policy=policy,
+    )
+
+    # --- Assert ---
+    assert tavily_client.extract_calls == [[urls[3], urls[4], urls[2]]]
+    assert [p.source_link for p in updates["extracted_programs"]] == [
+        urls[3],
+        urls[4],
+        urls[2],
+    ]
+    assert updates["metrics"]["domains"] == {
+        "denied": 1,
+        "skipped": 1,
+        "downranked": 1,
+        "probed": 0,
+    }
+
+    # make_record fills every field except format / prerequisites / location / who_this_is_for
+    school = stats.get_many(["school.example.com"])["school.example.com"]
+    assert school == DomainCounts(
+        extract_attempts=1,
+        extract_failures=0,
+        llm_attempts=1,
+        llm_failures=0,
+        fields_total=6,
+        fields_not_specified=4,
+    )
+
+
+# Verifies that a host skipped after an outage is probed now and then, and that its counters decay below the sample threshold so it is no longer skipped. (Mongo mocked)
+def test_skipped_host_recovers_through_probes_and_decay():
+    # --- Arrange ---
+    now = [0.0]
+    day = 24 * 3600.0
+    stats = DomainStats(half_life_seconds=day, clock=lambda: now[0])
+    # an outage: 20 failed extracts in a row
+    stats.record(
+        {"flaky.example.com": DomainCounts(extract_attempts=20, extract_failures=20)}
+    )
+    url = "https://flaky.example.com/course"
+    skipping = DomainPolicy(stats=stats, probe_rate=0.1, rng=lambda: 0.5)
+    probing = DomainPolicy(stats=stats, probe_rate=0.1, rng=lambda: 0.05)
+
+    # --- Act ---
+    verdicts = [skipping.verdict(url), probing.verdict(url)]
+    probed, counts = probing.rank(["https://ok.example.com/a", url])
+    now[0] = 3 * day  # 20 attempts decay to 2.5 < min_samples
+    verdicts.append(skipping.verdict(url))
+    decayed = stats.get_many(["flaky.example.com"])["flaky.example.com"]
+
+    # --- Assert ---
+    assert verdicts == ["skip", "probe", "ok"]
+    assert probed == ["https://ok.example.com/a", url]  # probes go last
+    assert counts["probed"] == 1
+    assert decayed.extract_attempts == 2.5
+
+
+class BatchFakeResponses:
+    # Batch calls answer for every page except `dropped`; single-page calls always succeed
+    def __init__(self, dropped: set[str]):
+        self.dropped = dropped
+        self.batch_calls: list[list[str]] = []
+        self.single_calls: list[str] = []
+        self._lock = threading.Lock()
+
+    def parse(self, *, input, text_format, **kwargs: Any):
+        content = input[1]["content"]
+        if text_format is es.ProgramRecordBatch:
+            urls = re.findall(r"^URL: (\S+)$", content, re.M)
+            with self._lock:
+                self.batch_calls.append(urls)
+            records = [make_record(u) for u in urls if u not in self.dropped]
+            return SimpleNamespace(output_parsed=es.ProgramRecordBatch(records=records))
+        url = content.split("\n")[0].removeprefix("URL: ")
+        with self._lock:
+            self.single_calls.append(url)
+        return SimpleNamespace(output_parsed=make_record(url))
+
+
+# Verifies that batched mode packs pages into shared calls and falls back to per-page calls for pages missing from a batch.
+def test_batched_extraction_falls_back_per_page():
+    # --- Arrange ---
+    urls = [f"https://example.com/p{i}" for i in range(5)]
+    tavily_client = FakeTavilyClient({u: f"text for {u}" for u in urls})
+    responses = BatchFakeResponses(dropped={urls[3]})
+    openai_client = SimpleNamespace(responses=responses)
+
+    # --- Act ---
+    updates = extraction_specialist(
+        make_state(urls),
+        tavily_client=tavily_client,
+        openai_client=openai_client,
+        llm_batch_size=2,
+    )
+
+    # --- Assert ---
+    assert sorted(responses.batch_calls) == [urls[0:2], urls[2:4], urls[4:5]]
+    assert responses.single_calls == [urls[3]]
+    assert [p.source_link for p in updates["extracted_programs"]] == urls
+    assert "warnings" not in updates
+
+
+class MeteredFakeResponses:
+    # every call reports 100k input tokens (10k cached) and 1k output tokens
+    def __init__(self):
+        self.urls: list[str] = []
+
+    def parse(self, *, input, **kwargs: Any):
+        url = input[1]["content"].split("\n")[0].removeprefix("URL: ")
+        self.urls.append(url)
+        usage = SimpleNamespace(
+            input_tokens=100_000,
+            input_tokens_details=SimpleNamespace(cached_tokens=10_000),
+            output_tokens=1_000,
+        )
+        return SimpleNamespace(
+            output_parsed=make_record(url), usage=usage, model="gpt-4o-mini-2024-07-18"
+        )
+
+
+# Verifies that token / credit usage is reported per node and that extraction stops once the request's spend ceiling is reached.
+def test_usage_is_metered_and_spend_ceiling_stops_extraction():
+    # --- Arrange ---
+    urls = [f"https://example.com/p{i}" for i in range(4)]
+    tavily_client = FakeTavilyClient({u: f"text for {u}" for u in urls})
+    responses = MeteredFakeResponses()
+    openai_client = SimpleNamespace(responses=responses)
+    state = {
+        **make_state(urls),
+        # the scout already spent 3 search credits
+        "metrics": {"usage": {"scout": {"cost_usd": 0.024}}},
+    }
+
+    # --- Act ---
+    updates = extraction_specialist(
+        state,
+        tavily_client=tavily_client,
+        openai_client=openai_client,
+        max_concurrency=1,
+        spend_ceiling_usd=0.05,
+    )
+
+    # --- Assert ---
+    # 0.024 scout + 0.008 extract credit + 0.01485 per LLM call: the third call is over
+    assert responses.urls == urls[:2]
+    assert [p.source_link for p in updates["extracted_programs"]] == urls[:2]
+    assert updates["metrics"]["usage"]["extract"] == {
+        "openai": {
+            "calls": 2,
+            "input_tokens": 200_000,
+            "cached_tokens": 20_000,
+            "output_tokens": 2_000,
+        },
+        "tavily": {"search_calls": 0, "extract_calls": 1, "credits": 1.0},
+        "cost_usd": 0.0377,
+        "ceiling_hit": True,
+    }
+    assert updates["warnings"] == [
+        "Extraction Specialist: Spend ceiling reached; skipped 2 page(s)."
+    ]
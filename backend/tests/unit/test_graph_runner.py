@@ -1,4 +1,7 @@
+import asyncio
+import time
 import pytest
+from types import SimpleNamespace
 from openai.types.responses import (
     ParsedResponse,
     ParsedResponseOutputMessage,
@@ -6,14 +9,16 @@ from openai.types.responses import (
 )
 from typing import Any, Type
 from datetime import datetime
+from app.cache.memory import MemoryCache
+from app.cache.tiered import TieredCache
 from app.db.models import RequestDoc
 from app.external.protocols import (
     OpenAIResponsesProtocol,
     OpenAIClientProtocol,
     TavilyClientProtocol,
 )
-from app.graph.deps import GraphDeps
-from app.graph.runner import GraphRunner
+from app.graph.deps import AsyncGraphDeps, GraphDeps
+from app.graph.runner import AsyncGraphRunner, GraphRunner
 from app.graph.state import ProgramRecordGraph
 
 SEARCH_RESPONSE_PHOTOGRAPHY = {
@@ -241,6 +246,30 @@ class FakeTavilyClient(TavilyClientProtocol):
         return self.extract_response
 
 
+class DummyAsyncAgentRunsRepo(DummyAgentRunsRepo):
+    async def insert_run(self, doc: RequestDoc):
+        self.runs.append(doc)
+
+
+def make_async_clients(
+    openai_client: FakeOpenAIClient, tavily_client: FakeTavilyClient
+) -> tuple[Any, Any]:
+    # coroutine facades over the sync fakes (same canned responses, same call logs)
+    async def parse(**kwargs: Any):
+        return openai_client.responses.parse(**kwargs)
+
+    async def search(query: str, max_results: int | None = None, **kwargs: Any):
+        return tavily_client.search(query, max_results=max_results, **kwargs)
+
+    async def extract(urls, extract_depth: str | None = None, **kwargs: Any):
+        return tavily_client.extract(urls, extract_depth=extract_depth, **kwargs)
+
+    return (
+        SimpleNamespace(responses=SimpleNamespace(parse=parse)),
+        SimpleNamespace(search=search, extract=extract),
+    )
+
+
 # ---------- Tests ----------
 
 
@@ -465,3 +494,359 @@ def test_graph_runner_orchestration_hard_failure(monkeypatch):
         assert tavily_client.search_calls == []
         assert tavily_client.extract_calls == []
         assert openai_client.responses.calls == []
+
+
+# Verifies that repeated identical searches are served from the search cache and reported in output_summary. (OpenAI / Tavily / DB mocked)
+def test_graph_runner_search_cache_reuses_tavily_results():
+    # --- Arrange ---
+    agent_runs_repo = DummyAgentRunsRepo()
+    tavily_client = FakeTavilyClient(
+        search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+        extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+    )
+    openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+    search_cache = TieredCache(memory=MemoryCache(max_entries=10, ttl_seconds=60))
+
+    deps = GraphDeps(
+        openai_client=openai_client,
+        tavily_client=tavily_client,
+        search_cache=search_cache,
+    )
+    runner = GraphRunner(agent_runs_repo=agent_runs_repo, deps=deps)
+    payload = {
+        "query": "photography",
+        "prefs": {"format": "online", "budget": "free", "city": "NYC"},
+    }
+
+    # --- Act ---
+    first = runner.run(request_id="req_1", payload=payload)
+    # same query with different casing/spacing normalizes to the same cache keys
+    second = runner.run(
+        request_id="req_2", payload={**payload, "query": "  Photography "}
+    )
+
+    # --- Assert ---
+    assert len(tavily_client.search_calls) == 3  # only the first run searched
+    assert [lead["url"] for lead in second["raw_leads"]] == [
+        lead["url"] for lead in first["raw_leads"]
+    ]
+
+    scout_runs = [r for r in agent_runs_repo.runs if r.agent_name == "scout"]
+    assert scout_runs[0].output_summary["metrics"]["search_cache"] == {
+        "hits": 0,
+        "misses": 3,
+    }
+    assert scout_runs[1].output_summary["metrics"]["search_cache"] == {
+        "hits": 3,
+        "misses": 0,
+    }
+
+
+# Verifies that streaming mode produces the same final results and warnings as batch mode. (OpenAI / Tavily / DB mocked)
+def test_graph_runner_streaming_mode_matches_batch_results():
+    # --- Arrange ---
+    payload = {
+        "query": "photography",
+        "prefs": {"format": "online", "budget": "free", "city": "NYC"},
+    }
+
+    def run(mode: str):
+        agent_runs_repo = DummyAgentRunsRepo()
+        tavily_client = FakeTavilyClient(
+            search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+            extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+        )
+        openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+        deps = GraphDeps(
+            openai_client=openai_client,
+            tavily_client=tavily_client,
+            pipeline_mode=mode,
+        )
+        runner = GraphRunner(agent_runs_repo=agent_runs_repo, deps=deps)
+        state = runner.run(request_id=f"req_{mode}", payload=payload)
+        return state, agent_runs_repo, openai_client
+
+    # --- Act ---
+    batch_state, _, _ = run("batch")
+    stream_state, stream_runs, stream_openai = run("streaming")
+
+    # --- Assert ---
+    assert stream_state["results"] == batch_state["results"]
+    assert stream_state["warnings"] == batch_state["warnings"]
+    assert [lead["url"] for lead in stream_state["raw_leads"]] == [
+        lead["url"] for lead in batch_state["raw_leads"]
+    ]
+
+    assert [r.agent_name for r in stream_runs.runs] == ["pipeline"]
+    summary = stream_runs.runs[0].output_summary
+    assert summary["metrics"]["pipeline_mode"] == "streaming"
+    assert summary["bucket_counts"]["short_term"] == 5
+    assert len(stream_openai.responses.calls) == 5
+
+
+# Verifies that streaming mode extracts the same URLs as batch mode when there are more leads than the URL budget and the first search answers last. (OpenAI / Tavily / DB mocked)
+def test_graph_runner_streaming_mode_keeps_batch_url_budget_order():
+    # --- Arrange ---
+    # 3 queries x 5 distinct results: past MAX_LEADS_TOTAL and MAX_URLS_TO_EXTRACT
+    payload = {"query": "photography", "prefs": {"format": "online", "city": "NYC"}}
+
+    class PerQueryTavilyClient(FakeTavilyClient):
+        def search(self, query: str, max_results: int | None = None, **kwargs: Any):
+            super().search(query, max_results=max_results, **kwargs)
+            if query == "photography online NYC":
+                time.sleep(0.1)
+            slug = query.replace(" ", "-")
+            return {
+                "results": [
+                    {"url": f"https://{slug}.example.com/{i}", "title": f"{slug} {i}"}
+                    for i in range(5)
+                ]
+            }
+
+    def run(mode: str):
+        tavily_client = PerQueryTavilyClient()
+        deps = GraphDeps(
+            openai_client=FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY),
+            tavily_client=tavily_client,
+            pipeline_mode=mode,
+        )
+        runner = GraphRunner(agent_runs_repo=DummyAgentRunsRepo(), deps=deps)
+        state = runner.run(request_id=f"req_{mode}", payload=payload)
+        urls = [u for call in tavily_client.extract_calls for u in call["urls"]]
+        return state, urls
+
+    # --- Act ---
+    batch_state, batch_urls = run("batch")
+    stream_state, stream_urls = run("streaming")
+
+    # --- Assert ---
+    assert len(batch_state["raw_leads"]) == 12 and len(batch_urls) == 10
+    assert stream_state["raw_leads"] == batch_state["raw_leads"]
+    # the slow first query's results still come first
+    assert stream_urls == batch_urls
+    assert stream_urls[0] == "https://photography-online-NYC.example.com/0"
+
+
+# Verifies that the async runner (graph.astream + async clients/repo) produces the same state and agent runs as the sync runner. (OpenAI / Tavily / DB mocked)
+def test_async_graph_runner_matches_sync_runner():
+    # --- Arrange ---
+    payload = {
+        "query": "photography",
+        "prefs": {"format": "online", "budget": "free", "city": "NYC"},
+    }
+
+    def make_fakes():
+        tavily_client = FakeTavilyClient(
+            search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+            extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+        )
+        openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+        return openai_client, tavily_client
+
+    sync_openai, sync_tavily = make_fakes()
+    sync_runs = DummyAgentRunsRepo()
+    sync_runner = GraphRunner(
+        agent_runs_repo=sync_runs,
+        deps=GraphDeps(openai_client=sync_openai, tavily_client=sync_tavily),
+    )
+
+    async_openai, async_tavily = make_fakes()
+    async_runs = DummyAsyncAgentRunsRepo()
+    openai_facade, tavily_facade = make_async_clients(async_openai, async_tavily)
+    async_runner = AsyncGraphRunner(
+        agent_runs_repo=async_runs,
+        deps=AsyncGraphDeps(openai_client=openai_facade, tavily_client=tavily_facade),
+    )
+
+    # --- Act ---
+    sync_state = sync_runner.run(request_id="req_sync", payload=payload)
+    async_state = asyncio.run(async_runner.run(request_id="req_async", payload=payload))
+
+    # --- Assert ---
+    assert async_state["results"] == sync_state["results"]
+    assert async_state["warnings"] == sync_state["warnings"]
+    assert async_state["raw_leads"] == sync_state["raw_leads"]
+
+    assert [r.agent_name for r in async_runs.runs] == ["scout", "extract", "organize"]
+    assert [r.output_summary for r in async_runs.runs] == [
+        r.output_summary for r in sync_runs.runs
+    ]
+    assert len(async_tavily.search_calls) == 3
+    assert len(async_tavily.extract_calls) == 1
+    assert len(async_openai.responses.calls) == 5
+
+
+# Verifies that GraphRunner.stream() reports each extracted program before the extract node finishes, then node progress, then the final state. (OpenAI / Tavily / DB mocked)
+def test_graph_runner_stream_emits_programs_before_final_state():
+    # --- Arrange ---
+    tavily_client = FakeTavilyClient(
+        search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+        extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+    )
+    openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+    runner = GraphRunner(
+        agent_runs_repo=DummyAgentRunsRepo(),
+        deps=GraphDeps(openai_client=openai_client, tavily_client=tavily_client),
+    )
+
+    # --- Act ---
+    events = list(
+        runner.stream(
+            "req_stream",
+            {
+                "query": "photography",
+                "prefs": {"format": "online", "budget": "free", "city": "NYC"},
+            },
+        )
+    )
+
+    # --- Assert ---
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["node"] + ["program"] * 5 + ["node", "node", "final"]
+    assert [data["node"] for kind, data in events if kind == "node"] == [
+        "scout",
+        "extract",
+        "organize",
+    ]
+    assert all(isinstance(data, ProgramRecordGraph) for kind, data in events[1:6])
+
+    final_state = events[-1][1]
+    assert len(final_state["results"]["short_term"]) == 5
+
+
+# Verifies that one GraphRunner (one compiled graph) serves concurrent requests without mixing their state. (OpenAI / Tavily / DB mocked)
+def test_graph_runner_is_shared_across_concurrent_requests():
+    # --- Arrange ---
+    from concurrent.futures import ThreadPoolExecutor
+
+    agent_runs_repo = DummyAgentRunsRepo()
+    tavily_client = FakeTavilyClient(
+        search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+        extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+    )
+    openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+    runner = GraphRunner(
+        agent_runs_repo=agent_runs_repo,
+        deps=GraphDeps(openai_client=openai_client, tavily_client=tavily_client),
+    )
+    graph = runner.graph
+
+    def run(i: int):
+        return runner.run(
+            request_id=f"req_{i}",
+            payload={
+                "query": "photography",
+                "prefs": {"format": "online", "budget": "free", "city": "NYC"},
+            },
+        )
+
+    # --- Act ---
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        states = list(pool.map(run, range(8)))
+
+    # --- Assert ---
+    assert runner.graph is graph
+    for i, state in enumerate(states):
+        assert state["request_id"] == f"req_{i}"
+        assert state["results"] == states[0]["results"]
+        assert len(state["extracted_programs"]) == 5
+    for i in range(8):
+        runs = [r for r in agent_runs_repo.runs if r.request_id == f"req_{i}"]
+        assert [r.agent_name for r in runs] == ["scout", "extract", "organize"]
+    assert len(openai_client.responses.calls) == 8 * 5
+
+
+# Verifies that runs sharing batch-scoped clients fetch and LLM-parse each page once, and search each distinct query once. (OpenAI / Tavily / DB mocked)
+def test_shared_deps_fetch_and_parse_each_page_once_across_runs():
+    # --- Arrange ---
+    from concurrent.futures import ThreadPoolExecutor
+    from app.graph.shared import shared_deps
+
+    tavily_client = FakeTavilyClient(
+        search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+        extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+    )
+    openai_client = FakeOpenAIClient(parsed_response=PARSED_RESPONSE_PHOTOGRAPHY)
+    deps = shared_deps(
+        GraphDeps(openai_client=openai_client, tavily_client=tavily_client)
+    )
+    runner = GraphRunner(agent_runs_repo=DummyAgentRunsRepo(), deps=deps)
+    payloads = [
+        {"query": "photography", "prefs": {"format": "online", "city": "NYC"}},
+        {"query": "photography", "prefs": {"format": "online", "city": "NYC"}},
+        {"query": "photography", "prefs": {"format": "hybrid", "city": "NYC"}},
+    ]
+
+    # --- Act ---
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        states = list(pool.map(lambda i: runner.run(f"req_{i}", payloads[i]), range(3)))
+
+    # --- Assert ---
+    for state in states:
+        assert len(state["extracted_programs"]) == 5
+
+    fetched = [u for call in tavily_client.extract_calls for u in call["urls"]]
+    assert len(fetched) == len(set(fetched)) == 5
+    assert len(openai_client.responses.calls) == 5
+
+    queries = [call["query"] for call in tavily_client.search_calls]
+    assert len(queries) == len(set(queries))
+    assert deps.tavily_client.stats()["search"]["shared"] >= 3
+    assert deps.openai_client.calls.stats() == {"calls": 5, "shared": 10}
+
+
+# Verifies that rate-limited calls (Tavily 429, OpenAI 429 with Retry-After) are retried after a backoff and the run completes with full results. (OpenAI / Tavily / DB mocked)
+def test_rate_limiter_retries_throttled_calls():
+    # --- Arrange ---
+    import httpx
+    from openai import RateLimitError
+    from tavily.errors import UsageLimitExceededError
+    from app.graph.ratelimit import RateLimiter
+
+    class FlakyTavilyClient(FakeTavilyClient):
+        def search(self, query: str, max_results: int | None = None, **kwargs: Any):
+            if not self.search_calls:
+                self.search_calls.append({"query": query, "error": "429"})
+                raise UsageLimitExceededError("rate limited")
+            return super().search(query, max_results=max_results, **kwargs)
+
+    class FlakyOpenAIResponses(FakeOpenAIResponses):
+        def parse(self, **kwargs: Any):
+            if not self.calls:
+                self.calls.append({"error": "429"})
+                response = httpx.Response(
+                    429,
+                    headers={"retry-after": "2"},
+                    request=httpx.Request("POST", "https://api.openai.com/v1"),
+                )
+                raise RateLimitError("rate limited", response=response, body=None)
+            return super().parse(**kwargs)
+
+    tavily_client = FlakyTavilyClient(
+        search_response=SEARCH_RESPONSE_PHOTOGRAPHY,
+        extract_response=EXTRACT_RESPONSE_PHOTOGRAPHY,
+    )
+    openai_client = FakeOpenAIClient()
+    openai_client.responses = FlakyOpenAIResponses(
+        parsed_response=PARSED_RESPONSE_PHOTOGRAPHY
+    )
+    sleeps: list[float] = []
+    limiter = RateLimiter(sleep=sleeps.append)
+    deps = GraphDeps(
+        openai_client=openai_client, tavily_client=tavily_client, rate_limiter=limiter
+    )
+    runner = GraphRunner(agent_runs_repo=DummyAgentRunsRepo(), deps=deps)
+
+    # --- Act ---
+    state = runner.run(
+        request_id="req_rate_limited",
+        payload={"query": "photography", "prefs": {"format": "online"}},
+    )
+
+    # --- Assert ---
+    assert len(state["results"]["short_term"]) == 5
+    assert len(tavily_client.search_calls) == 4  # 3 queries + 1 retry
+    assert len(openai_client.responses.calls) == 6  # 5 pages + 1 retry
+    assert limiter.stats["retries"] == 2
+    assert limiter.stats["gave_up"] == 0
+    assert max(sleeps) >= 2  # honours Retry-After
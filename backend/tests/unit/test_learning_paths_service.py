@@ -1,26 +1,70 @@
+import csv
+import io
+import json
 import pytest
 import uuid
 from app.db.models import RequestDoc, Paths
 from app.graph.state import ProgramRecordGraph, GraphState, InputPayload
 from app.models.schemas import Program, LearningPathsRequest, LearningPrefs
-from app.services.learning_paths import LearningPathsService
+from app.services.coalescing import RequestCoalescer
+from app.services.fingerprint import request_fingerprint
+from app.models.schemas import LearningPathsJobResponse
+from app.services.exports import ExportService
+from app.services.learning_paths import LearningPathsService, job_etag
 
 
 class DummyRequestsRepo:
     def __init__(self):
         self.created = []
         self.completed = []
+        self.usage = []
+        self.reused_from = {}
         self.failed = []
+        self.finished = []
 
     def create_running(self, doc: RequestDoc):
         self.created.append(doc)
 
-    def mark_completed(self, request_id: str):
+    def mark_completed(
+        self,
+        request_id: str,
+        usage: dict | None = None,
+        reused_from: str | None = None,
+    ):
         self.completed.append(request_id)
+        self.usage.append(usage)
+        self.reused_from[request_id] = reused_from
 
     def mark_failed(self, request_id: str, error: str):
         self.failed.append((request_id, error))
 
+    def finish(self, doc: RequestDoc):
+        self.finished.append(doc)
+
+    def get(self, request_id: str):
+        for doc in self.created:
+            if doc.request_id != request_id:
+                continue
+            status = doc.status
+            if request_id in self.completed:
+                status = "completed"
+            if any(r == request_id for r, _ in self.failed):
+                status = "failed"
+            return {**doc.model_dump(), "status": status}
+        return None
+
+    def find_completed(self, fingerprint: str, since):
+        matches = [
+            doc
+            for doc in self.created
+            if doc.fingerprint == fingerprint
+            and doc.request_id in self.completed
+            and doc.created_at >= since
+        ]
+        if not matches:
+            return None
+        return {"request_id": max(matches, key=lambda d: d.created_at).request_id}
+
 
 class DummyResultsRepo:
     def __init__(self):
@@ -38,6 +82,19 @@ class DummyResultsRepo:
             }
         )
 
+    def get(self, request_id: str):
+        for upsert in reversed(self.upserts):
+            if upsert["request_id"] == request_id:
+                return {**upsert, "paths": upsert["paths"].model_dump(mode="json")}
+        return None
+
+    def iter_paths(self, request_ids: list[str], horizons: list[str]):
+        for request_id in request_ids:
+            doc = self.get(request_id)
+            if doc and doc["error"] is None:
+                paths = {h: doc["paths"][h] for h in horizons}
+                yield {"request_id": request_id, "paths": paths}
+
 
 class DummyAgentRunsRepo:
     def __init__(self):
@@ -282,3 +339,467 @@ def test_generate_runner_failure():
 
     # runner request_id should match the one persisted
     assert call["request_id"] == request_id_str
+
+
+# Verifies that with consolidated writes a request writes its requests doc once, after its results, whether it completes or fails. (GraphRunner mocked)
+def test_consolidated_writes_finish_request_in_one_write():
+    # --- Arrange ---
+    requests_repo = DummyRequestsRepo()
+    results_repo = DummyResultsRepo()
+    metrics = {"scout": {"tavily_credits": 3}}
+    runners = [
+        FakeRunner(state={"metrics": metrics}),
+        FakeRunner(exc=RuntimeError("boom")),
+    ]
+
+    def service(runner: FakeRunner) -> LearningPathsService:
+        return LearningPathsService(
+            requests_repo=requests_repo,
+            agent_runs_repo=DummyAgentRunsRepo(),
+            results_repo=results_repo,
+            runner=runner,
+            consolidated_writes=True,
+        )
+
+    payload = LearningPathsRequest(query="ux design")
+
+    # --- Act ---
+    response = service(runners[0]).generate(payload)
+    with pytest.raises(RuntimeError):
+        service(runners[1]).generate(payload)
+
+    # --- Assert ---
+    assert requests_repo.created == []  # no running doc
+    assert requests_repo.completed == [] and requests_repo.failed == []
+
+    completed, failed = requests_repo.finished
+    assert completed.request_id == str(response.request_id)
+    assert completed.status == "completed"
+    assert completed.usage is not None
+    assert completed.fingerprint == request_fingerprint("ux design", None)
+    assert failed.status == "failed"
+    assert failed.error == "boom"
+
+    # one results write per request, same ids
+    assert [u["request_id"] for u in results_repo.upserts] == [
+        completed.request_id,
+        failed.request_id,
+    ]
+    assert results_repo.upserts[1]["error"] is not None
+
+
+# Verifies that job mode persists the running request on submit and that job_status follows it to completed / failed. (GraphRunner mocked)
+def test_job_status_follows_request_lifecycle():
+    # --- Arrange ---
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School",
+        duration="4 weeks",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    state: GraphState = {
+        "results": {"short_term": [program], "medium_term": [], "long_term": []},
+        "warnings": ["simulated warning"],
+    }
+    requests_repo = DummyRequestsRepo()
+    results_repo = DummyResultsRepo()
+    service = LearningPathsService(
+        requests_repo=requests_repo,
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=FakeRunner(state=state),
+    )
+    failing = LearningPathsService(
+        requests_repo=requests_repo,
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=FakeRunner(exc=RuntimeError("boom")),
+    )
+    payload = LearningPathsRequest(query="photography")
+
+    # --- Act ---
+    request_id, graph_payload = service.submit(payload)
+    running = service.job_status(str(request_id))
+    service.run(request_id, graph_payload)
+    completed = service.job_status(str(request_id))
+
+    failed_id, failed_payload = failing.submit(payload)
+    with pytest.raises(RuntimeError):
+        failing.run(failed_id, failed_payload)
+    failed = failing.job_status(str(failed_id))
+
+    # --- Assert ---
+    assert graph_payload == {"query": "photography", "prefs": None}
+    assert running.status == "running"
+    assert running.results is None
+
+    assert completed.status == "completed"
+    assert completed.results.short_term == [expected_api_program_from_graph(program)]
+    assert completed.warnings == ["simulated warning"]
+    assert completed.error is None
+
+    # the raw exception stays in requests.error
+    assert failed.status == "failed"
+    assert failed.error == "Processing failed"
+    assert failed.results is None
+
+    assert service.job_status(str(uuid.uuid4())) is None
+
+
+class DummyLeaseRepo:
+    def __init__(self, holder: str | None = None):
+        self.holder = holder
+        self.released = []
+
+    def acquire(self, key: str, owner: str, ttl_seconds: float) -> str:
+        self.holder = self.holder or owner
+        return self.holder
+
+    def release(self, key: str, owner: str):
+        self.released.append(owner)
+        if self.holder == owner:
+            self.holder = None
+
+
+# Verifies that identical concurrent requests share one graph run while each keeps its own request_id and requests doc. (GraphRunner mocked)
+def test_concurrent_identical_requests_share_one_graph_run():
+    # --- Arrange ---
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.coalescing import SingleFlight
+
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    release = threading.Event()
+
+    class BlockingRunner(FakeRunner):
+        def run(self, request_id: str, payload: InputPayload):
+            super().run(request_id, payload)
+            release.wait(timeout=5)
+            return {
+                "request_id": request_id,
+                "results": {
+                    "short_term": [program],
+                    "medium_term": [],
+                    "long_term": [],
+                },
+                "warnings": [],
+                "metrics": {"usage": {"scout": {"cost_usd": 0.01}}},
+            }
+
+    class CountingFlight(SingleFlight):
+        entered = 0
+
+        def do(self, key, fn):
+            CountingFlight.entered += 1
+            return super().do(key, fn)
+
+    runner = BlockingRunner()
+    requests_repo = DummyRequestsRepo()
+    results_repo = DummyResultsRepo()
+    service = LearningPathsService(
+        requests_repo=requests_repo,
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=runner,
+        coalescer=RequestCoalescer(flight=CountingFlight()),
+    )
+    queries = ["Photography", "  photography!", "PHOTOGRAPHY"]
+
+    # --- Act ---
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [
+            pool.submit(service.generate, LearningPathsRequest(query=q))
+            for q in queries
+        ]
+        while CountingFlight.entered < 3:
+            time.sleep(0.01)
+        time.sleep(0.05)  # let the followers reach the leader's call
+        release.set()
+        responses = [f.result() for f in futures]
+
+    # --- Assert ---
+    assert len(runner.calls) == 1
+    leader = runner.calls[0]["request_id"]
+
+    assert len({str(r.request_id) for r in responses}) == 3
+    for r in responses:
+        assert r.results.short_term == [expected_api_program_from_graph(program)]
+
+    assert sorted(requests_repo.completed) == sorted(
+        str(r.request_id) for r in responses
+    )
+    assert len(results_repo.upserts) == 3
+    for request_id, source in requests_repo.reused_from.items():
+        assert source == (None if request_id == leader else leader)
+
+
+# Verifies that with a Mongo lease held by another instance, the request waits for that instance's result instead of running the graph. (GraphRunner / repos mocked)
+def test_lease_held_elsewhere_reuses_the_holders_result():
+    # --- Arrange ---
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    requests_repo = DummyRequestsRepo()
+    results_repo = DummyResultsRepo()
+
+    # the other instance's request: running, then completed while we poll
+    other = RequestDoc.model_validate(
+        {
+            "request_id": "other-instance",
+            "created_at": "2026-01-01T00:00:00Z",
+            "status": "running",
+            "input": {"query": "photography"},
+        }
+    )
+    requests_repo.create_running(other)
+
+    def other_instance_finishes(seconds: float):
+        results_repo.upsert_result(
+            "other-instance",
+            Paths.model_validate({"short_term": [program.model_dump()]}),
+            ["from the other instance"],
+            None,
+        )
+        requests_repo.mark_completed("other-instance")
+
+    runner = FakeRunner(state={})
+    lease_repo = DummyLeaseRepo(holder="other-instance")
+    service = LearningPathsService(
+        requests_repo=requests_repo,
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=runner,
+        coalescer=RequestCoalescer(
+            lease_repo=lease_repo,
+            requests_repo=requests_repo,
+            results_repo=results_repo,
+            sleep=other_instance_finishes,
+        ),
+    )
+
+    # --- Act ---
+    response = service.generate(LearningPathsRequest(query="photography"))
+
+    # --- Assert ---
+    assert runner.calls == []
+    assert response.results.short_term == [expected_api_program_from_graph(program)]
+    assert response.warnings == ["from the other instance"]
+    assert requests_repo.reused_from[str(response.request_id)] == "other-instance"
+    assert lease_repo.released == []
+
+
+# Verifies that a completed result with the same normalized fingerprint is served again (flagged as cached) instead of re-running the graph. (GraphRunner mocked)
+def test_generate_reuses_fresh_result_for_same_fingerprint():
+    # --- Arrange ---
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    runner = FakeRunner(
+        state={
+            "results": {"short_term": [program], "medium_term": [], "long_term": []},
+            "warnings": ["simulated warning"],
+        }
+    )
+    requests_repo = DummyRequestsRepo()
+    results_repo = DummyResultsRepo()
+    service = LearningPathsService(
+        requests_repo=requests_repo,
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=runner,
+        result_max_age_s=3600,
+    )
+
+    # --- Act ---
+    first = service.generate(
+        LearningPathsRequest(
+            query="UX design, online",
+            prefs=LearningPrefs(format="online", city="NYC"),
+        )
+    )
+    second = service.generate(
+        LearningPathsRequest(
+            query="  ux DESIGN online! ",
+            prefs=LearningPrefs(city="nyc", format="online"),
+        )
+    )
+    other = service.generate(LearningPathsRequest(query="UX design"))
+
+    # --- Assert ---
+    assert request_fingerprint("UX design, online", {"goal": None}) == (
+        request_fingerprint("ux   design online", None)
+    )
+    assert request_fingerprint("UX design", None) != request_fingerprint(
+        "UX design", {"city": "NYC"}
+    )
+    assert requests_repo.created[0].fingerprint == requests_repo.created[1].fingerprint
+
+    assert len(runner.calls) == 2  # first + other
+    assert first.cached is False and other.cached is False
+    assert second.cached is True
+    assert second.request_id != first.request_id
+    assert second.results == first.results
+    assert second.warnings == ["simulated warning"]
+
+    assert requests_repo.reused_from[str(second.request_id)] == str(first.request_id)
+    assert requests_repo.usage[1] is None
+    assert [u["request_id"] for u in results_repo.upserts] == [
+        str(first.request_id),
+        str(second.request_id),
+        str(other.request_id),
+    ]
+
+
+# Verifies that the validation-free job payload (served with orjson) matches the response model, and that the ETag changes with the request status. (GraphRunner mocked)
+def test_job_payload_matches_response_model_and_etag_follows_status():
+    # --- Arrange ---
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School",
+        topics_covered=["exposure", "composition"],
+        cost_text="$99",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    service = LearningPathsService(
+        requests_repo=DummyRequestsRepo(),
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=DummyResultsRepo(),
+        runner=FakeRunner(
+            state={
+                "results": {
+                    "short_term": [program],
+                    "medium_term": [],
+                    "long_term": [],
+                },
+                "warnings": ["simulated warning"],
+            }
+        ),
+    )
+
+    # --- Act ---
+    request_id, graph_payload = service.submit(LearningPathsRequest(query="photo"))
+    running_doc = service.get_request(str(request_id))
+    service.run(request_id, graph_payload)
+    completed_doc = service.get_request(str(request_id))
+    payload = service.job_payload(completed_doc)
+
+    # --- Assert ---
+    assert payload == LearningPathsJobResponse.model_validate(payload).model_dump(
+        mode="json"
+    )
+    assert payload["results"]["short_term"][0]["cost"] == "$99"
+    assert payload["warnings"] == ["simulated warning"]
+
+    assert job_etag(running_doc) != job_etag(completed_doc)
+    assert job_etag(completed_doc) == job_etag(service.get_request(str(request_id)))
+
+
+# Verifies that exports stream every stored program of the requested horizon as CSV, JSON and NDJSON rows tagged with request_id, skipping failed requests. (GraphRunner mocked)
+def test_export_streams_stored_results_in_every_format():
+    # --- Arrange ---
+    program = ProgramRecordGraph(
+        program_name="Intro to Photography",
+        provider="Example School, Inc.",
+        topics_covered=["exposure", "composition"],
+        cost_text="$99",
+        source_link="https://example.com/photo",
+        citation="https://example.com/photo",
+    )
+    results_repo = DummyResultsRepo()
+    service = LearningPathsService(
+        requests_repo=DummyRequestsRepo(),
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=results_repo,
+        runner=FakeRunner(
+            state={
+                "results": {
+                    "short_term": [program],
+                    "medium_term": [],
+                    "long_term": [program],
+                },
+                "warnings": [],
+            }
+        ),
+    )
+    ok = service.generate(LearningPathsRequest(query="photo"))
+    service.runner = FakeRunner(exc=RuntimeError("boom"))
+    with pytest.raises(RuntimeError):
+        service.generate(LearningPathsRequest(query="video"))
+    failed_id = results_repo.upserts[-1]["request_id"]
+    exports = ExportService(results_repo=results_repo)
+    ids = [str(ok.request_id), failed_id]
+
+    # --- Act ---
+    csv_text = "".join(exports.export(ids, ["short_term"], "csv"))
+    json_rows = json.loads(
+        "".join(exports.export(ids, ["short_term", "long_term"], "json"))
+    )
+    ndjson_text = "".join(exports.export(ids, ["long_term"], "ndjson"))
+
+    # --- Assert ---
+    rows = list(csv.DictReader(io.StringIO(csv_text)))
+    assert len(rows) == 1
+    assert rows[0]["request_id"] == str(ok.request_id)
+    assert rows[0]["horizon"] == "short_term"
+    assert rows[0]["provider"] == "Example School, Inc."
+    assert rows[0]["topics_covered"] == "exposure; composition"
+    assert rows[0]["cost"] == "$99"
+
+    assert [r["horizon"] for r in json_rows] == ["short_term", "long_term"]
+    assert json_rows[0]["topics_covered"] == ["exposure", "composition"]
+
+    lines = ndjson_text.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["horizon"] == "long_term"
+
+
+# Verifies that an unreadable lease holder (acquire -> None) is not treated as our lease: the coalescer retries and only releases a lease it got. (GraphRunner / repos mocked)
+def test_unreadable_lease_holder_is_retried_before_running():
+    # --- Arrange ---
+    class ChurningLeaseRepo(DummyLeaseRepo):
+        def __init__(self):
+            super().__init__()
+            self.attempts = 0
+
+        def acquire(self, key: str, owner: str, ttl_seconds: float):
+            self.attempts += 1
+            return None if self.attempts == 1 else owner
+
+    lease_repo = ChurningLeaseRepo()
+    sleeps = []
+    runner = FakeRunner(state={"metrics": {}})
+    service = LearningPathsService(
+        requests_repo=DummyRequestsRepo(),
+        agent_runs_repo=DummyAgentRunsRepo(),
+        results_repo=DummyResultsRepo(),
+        runner=runner,
+        coalescer=RequestCoalescer(
+            lease_repo=lease_repo,
+            requests_repo=DummyRequestsRepo(),
+            results_repo=DummyResultsRepo(),
+            sleep=sleeps.append,
+        ),
+    )
+
+    # --- Act ---
+    response = service.generate(LearningPathsRequest(query="photography"))
+
+    # --- Assert ---
+    assert lease_repo.attempts == 2
+    assert len(sleeps) == 1
+    assert len(runner.calls) == 1
+    assert lease_repo.released == [str(response.request_id)]
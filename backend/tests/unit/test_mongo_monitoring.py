@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from app.db.monitoring import MongoMetrics, pool_options
+
+# ---------- Tests ----------
+
+
+# Verifies that the pool listener tracks checkout waits, connections in use and saturation, and the command listener per-command latency and failures. (pymongo events mocked)
+def test_listeners_record_checkout_waits_saturation_and_command_latency():
+    # --- Arrange ---
+    metrics = MongoMetrics(max_pool_size=4, slow_checkout_ms=50)
+    command_listener, pool_listener = metrics.listeners()
+
+    # --- Act ---
+    for wait_s in (0.001, 0.002, 0.080):  # three connections out, one slow wait
+        pool_listener.connection_check_out_started(SimpleNamespace())
+        pool_listener.connection_checked_out(SimpleNamespace(duration=wait_s))
+    pool_listener.connection_checked_in(SimpleNamespace())
+    pool_listener.connection_check_out_started(SimpleNamespace())
+    pool_listener.connection_check_out_failed(
+        SimpleNamespace(duration=0.5, reason="timeout")
+    )
+    command_listener.succeeded(
+        SimpleNamespace(command_name="find", duration_micros=2000)
+    )
+    command_listener.succeeded(
+        SimpleNamespace(command_name="find", duration_micros=4000)
+    )
+    command_listener.failed(
+        SimpleNamespace(command_name="insert", duration_micros=1000)
+    )
+    snapshot = metrics.snapshot()
+
+    # --- Assert ---
+    pool = snapshot["pool"]
+    assert pool["checkouts"] == 3
+    assert pool["checked_out"] == 2
+    assert pool["max_checked_out"] == 3
+    assert pool["waiting"] == 0
+    assert pool["checkout_failed"] == 1
+    assert pool["slow_checkouts"] == 2  # the 80 ms wait and the failed one
+    assert pool["saturation"] == 0.5
+    assert pool["peak_saturation"] == 0.75
+    assert pool["checkout_wait_ms"]["max"] == 80.0
+
+    assert snapshot["commands"]["find"]["count"] == 2
+    assert snapshot["commands"]["find"]["avg_ms"] == 3.0
+    assert snapshot["commands"]["insert"]["failed"] == 1
+
+
+# Verifies that pool sizing comes from MONGO_* env and optional timeouts are only passed when set.
+def test_pool_options_from_env(monkeypatch):
+    # --- Arrange ---
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "2")
+    monkeypatch.setenv("MONGO_MAX_IDLE_TIME_MS", "60000")
+    monkeypatch.delenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", raising=False)
+    monkeypatch.delenv("MONGO_MAX_CONNECTING", raising=False)
+
+    # --- Act ---
+    options = pool_options()
+
+    # --- Assert ---
+    assert options == {"maxPoolSize": 20, "minPoolSize": 2, "maxIdleTimeMS": 60000}
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+
+from app.db.repos import history_query
+from app.services.history import InvalidCursor, RequestHistoryService
+
+T0 = datetime(2026, 6, 1, 12, 0, 0)
+
+
+class FakeRequestsRepo:
+    # list_page in memory with the same keyset ordering as the Mongo query
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+        self.queries: list[dict] = []
+
+    def list_page(self, status, fingerprint, after, limit):
+        self.queries.append(history_query(status, fingerprint, after))
+        docs = [
+            d
+            for d in self.docs
+            if (status is None or d["status"] == status)
+            and (after is None or (d["created_at"], d["request_id"]) < after)
+        ]
+        docs.sort(key=lambda d: (d["created_at"], d["request_id"]), reverse=True)
+        return docs[:limit]
+
+    def get(self, request_id):
+        return next((d for d in self.docs if d["request_id"] == request_id), None)
+
+
+class FakeAgentRunsRepo:
+    def __init__(self, runs: dict[str, list[dict]]):
+        self.runs = runs
+
+    def list_for_request(self, request_id):
+        return self.runs.get(request_id, [])
+
+
+def make_request_doc(created_at: datetime, status: str = "completed") -> dict:
+    return {
+        "request_id": str(uuid4()),
+        "created_at": created_at,
+        "status": status,
+        "input": {"query": "photography", "prefs": {"format": "online"}},
+        "fingerprint": "fp",
+        "usage": {"cost_usd": 0.01},
+    }
+
+
+# ---------- Tests ----------
+
+
+# Verifies that following next_cursor walks every request exactly once, newest first, including requests sharing a created_at, and that a bad cursor is rejected. (Mongo mocked)
+def test_cursor_pages_through_all_requests_once():
+    # --- Arrange ---
+    # five requests, three of them created in the same millisecond
+    times = [T0, T0 + timedelta(seconds=1), T0 + timedelta(seconds=1)]
+    times += [T0 + timedelta(seconds=1), T0 + timedelta(seconds=2)]
+    docs = [make_request_doc(t) for t in times]
+    repo = FakeRequestsRepo(docs)
+    service = RequestHistoryService(
+        requests_repo=repo, agent_runs_repo=FakeAgentRunsRepo({})
+    )
+
+    # --- Act ---
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = service.page(cursor=cursor, limit=2)
+        seen.extend(page.items)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    # --- Assert ---
+    assert pages == 3
+    assert len({item.request_id for item in seen}) == 5
+    keys = [(item.created_at, str(item.request_id)) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert seen[0].query == "photography" and seen[0].cost_usd == 0.01
+    # pages after the first are keyset ranges, never skips
+    assert "$or" in repo.queries[1] and "$or" not in repo.queries[0]
+    with pytest.raises(InvalidCursor):
+        service.page(cursor="not-a-cursor")
+
+
+# Verifies that a request's runs come back in order, an existing request without runs gives an empty timeline and an unknown one None. (Mongo mocked)
+def test_runs_timeline_for_known_and_unknown_requests():
+    # --- Arrange ---
+    doc = make_request_doc(T0, status="running")
+    pending = make_request_doc(T0)
+    runs = [
+        {"agent_name": "scout", "started_at": T0, "output_summary": {"counts": {}}},
+        {"agent_name": "extract", "started_at": T0 + timedelta(seconds=3)},
+    ]
+    service = RequestHistoryService(
+        requests_repo=FakeRequestsRepo([doc, pending]),
+        agent_runs_repo=FakeAgentRunsRepo({doc["request_id"]: runs}),
+    )
+
+    # --- Act ---
+    timeline = service.runs(doc["request_id"])
+    empty = service.runs(pending["request_id"])
+    unknown = service.runs(str(uuid4()))
+
+    # --- Assert ---
+    assert timeline.request_id == UUID(doc["request_id"])
+    assert [r.agent_name for r in timeline.runs] == ["scout", "extract"]
+    assert empty is not None and empty.runs == []
+    assert unknown is None
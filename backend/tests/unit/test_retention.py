@@ -0,0 +1,252 @@
+import glob
+import gzip
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson import json_util
+import pytest
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.db.repos import LeaseRepo
+from app.db.retention import (
+    RetentionArchiver,
+    RetentionPolicy,
+    ensure_ttl_indexes,
+    zstandard,
+)
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def sort(self, key: str, direction: int) -> "FakeCursor":
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n: int) -> "FakeCursor":
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    # just the find / delete_many filters the archiver sends
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def find(self, query: dict) -> FakeCursor:
+        ((key, cond),) = query.items()
+        return FakeCursor([d for d in self.docs if d[key] < cond["$lt"]])
+
+    def delete_many(self, query: dict) -> None:
+        ids = set(query["_id"]["$in"])
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+
+
+class HeldLeaseRepo:
+    def acquire(self, key: str, owner: str, ttl_seconds: float) -> str:
+        return "other-instance"
+
+    def release(self, key: str, owner: str) -> None:
+        pass
+
+
+class ExpiringLeaseRepo:
+    # granted, then lost after `renewals` renewals (another instance took it)
+    def __init__(self, renewals: int):
+        self.renewals = renewals
+
+    def acquire(self, key: str, owner: str, ttl_seconds: float) -> str:
+        return owner
+
+    def renew(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        self.renewals -= 1
+        return self.renewals >= 0
+
+    def release(self, key: str, owner: str) -> None:
+        pass
+
+
+class ChurningLeaseCollection:
+    # the lease is always held, but released before its holder can be read
+    def __init__(self):
+        self.claims = 0
+
+    def update_one(self, query: dict, update: dict, upsert: bool) -> None:
+        self.claims += 1
+        raise DuplicateKeyError("E11000 duplicate key")
+
+    def find_one(self, query: dict, projection: dict) -> None:
+        return None
+
+    def delete_one(self, query: dict) -> None:
+        pass
+
+
+class ConflictingIndexCollection:
+    # create_index fails with `code`; index_information lists `indexes`
+    def __init__(self, code: int, indexes: dict):
+        self.code = code
+        self.indexes = indexes
+
+    def create_index(self, key: str, **kwargs) -> None:
+        raise OperationFailure("index conflict", code=self.code)
+
+    def index_information(self) -> dict:
+        return self.indexes
+
+
+class IndexDb(dict):
+    def __init__(self, collections: dict):
+        super().__init__(collections)
+        self.commands: list[tuple] = []
+
+    def command(self, *args, **kwargs) -> None:
+        self.commands.append((args, kwargs))
+
+
+def read_archive(path: str) -> list[dict]:
+    if path.endswith(".zst"):
+        with open(path, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+    else:
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+    return [json_util.loads(line) for line in data.decode().splitlines()]
+
+
+# ---------- Tests ----------
+
+
+# Verifies that documents past their retention age are written to compressed NDJSON batches, oldest first, before they are deleted, and newer ones are kept. (Mongo mocked)
+def test_archiver_moves_expired_documents_to_compressed_files(tmp_path):
+    # --- Arrange ---
+    runs = FakeCollection(
+        [
+            {"_id": i, "request_id": f"req_{i}", "started_at": NOW - timedelta(days=d)}
+            for i, d in enumerate([45, 31, 40, 2, 60])
+        ]
+    )
+    archiver = RetentionArchiver(
+        db={"agent_runs": runs},
+        policies=[RetentionPolicy("agent_runs", "started_at", 30)],
+        archive_dir=str(tmp_path),
+        batch_size=3,
+        clock=lambda: NOW,
+    )
+
+    # --- Act ---
+    archived = archiver.run_once()
+
+    # --- Assert ---
+    assert archived == {"agent_runs": 4}
+    assert [d["_id"] for d in runs.docs] == [3]  # 2 days old
+
+    pattern = os.path.join(tmp_path, "agent_runs", "**", "*.ndjson.*")
+    files = sorted(glob.glob(pattern, recursive=True))
+    assert len(files) == 2  # batches of 3 + 1
+    assert not glob.glob(os.path.join(tmp_path, "**", "*.part"), recursive=True)
+    restored = [doc for path in files for doc in read_archive(path)]
+    assert sorted(d["_id"] for d in restored) == [0, 1, 2, 4]
+    assert all(isinstance(d["started_at"], datetime) for d in restored)
+
+
+# Verifies that an instance that does not hold the archive lease leaves every document in place. (Mongo mocked)
+def test_archiver_skips_pass_when_another_instance_holds_the_lease(tmp_path):
+    # --- Arrange ---
+    requests = FakeCollection([{"_id": 1, "created_at": NOW - timedelta(days=400)}])
+    archiver = RetentionArchiver(
+        db={"requests": requests},
+        policies=[RetentionPolicy("requests", "created_at", 180)],
+        archive_dir=str(tmp_path),
+        lease_repo=HeldLeaseRepo(),
+        clock=lambda: NOW,
+    )
+
+    # --- Act ---
+    archived = archiver.run_once()
+
+    # --- Assert ---
+    assert archived == {}
+    assert len(requests.docs) == 1
+    assert os.listdir(tmp_path) == []
+
+
+# Verifies that a lease whose holder cannot be read is reported as not acquired, so the archiver does not run. (Mongo mocked)
+def test_unreadable_lease_holder_is_not_acquired(tmp_path):
+    # --- Arrange ---
+    leases = ChurningLeaseCollection()
+    requests = FakeCollection([{"_id": 1, "created_at": NOW - timedelta(days=400)}])
+    archiver = RetentionArchiver(
+        db={"requests": requests},
+        policies=[RetentionPolicy("requests", "created_at", 180)],
+        archive_dir=str(tmp_path),
+        lease_repo=LeaseRepo(leases),
+        clock=lambda: NOW,
+    )
+
+    # --- Act ---
+    holder = LeaseRepo(leases).acquire("retention:archive", "me", 60)
+    archived = archiver.run_once()
+
+    # --- Assert ---
+    assert holder is None
+    assert leases.claims == 6  # LEASE_ACQUIRE_ATTEMPTS per acquire
+    assert archived == {}
+    assert len(requests.docs) == 1
+
+
+# Verifies that only an options conflict on an existing TTL index of the same field is retuned with collMod, and other index errors are raised. (Mongo mocked)
+def test_ttl_index_conflicts_retune_only_same_field_ttl_indexes():
+    # --- Arrange ---
+    ttl = {"key": [("created_at", 1)], "expireAfterSeconds": 86400}
+    retunable = IndexDb(
+        {"requests": ConflictingIndexCollection(85, {"created_at_1": ttl})}
+    )
+    plain = {"key": [("created_at", 1)]}  # same field, not a TTL index
+    not_ttl = IndexDb({"requests": ConflictingIndexCollection(85, {"c": plain})})
+    other = IndexDb({"requests": ConflictingIndexCollection(13, {"created_at_1": ttl})})
+    policies = [RetentionPolicy("requests", "created_at", 30)]
+
+    # --- Act ---
+    ensure_ttl_indexes(retunable, policies, grace_days=0)
+
+    # --- Assert ---
+    assert retunable.commands == [
+        (
+            ("collMod", "requests"),
+            {"index": {"name": "created_at_1", "expireAfterSeconds": 30 * 86400}},
+        )
+    ]
+    for db in (not_ttl, other):
+        with pytest.raises(OperationFailure):
+            ensure_ttl_indexes(db, policies, grace_days=0)
+        assert db.commands == []
+
+
+# Verifies that the archiver renews its lease before each batch and stops the pass once the lease is lost. (Mongo mocked)
+def test_archiver_stops_when_its_lease_is_lost(tmp_path):
+    # --- Arrange ---
+    runs = FakeCollection(
+        [{"_id": i, "started_at": NOW - timedelta(days=40 + i)} for i in range(5)]
+    )
+    archiver = RetentionArchiver(
+        db={"agent_runs": runs},
+        policies=[RetentionPolicy("agent_runs", "started_at", 30)],
+        archive_dir=str(tmp_path),
+        batch_size=2,
+        lease_repo=ExpiringLeaseRepo(renewals=1),
+        clock=lambda: NOW,
+    )
+
+    # --- Act ---
+    archived = archiver.run_once()
+
+    # --- Assert ---
+    assert archived == {"agent_runs": 2}  # one batch, then the lease was gone
+    assert len(runs.docs) == 3
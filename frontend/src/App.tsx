@@ -3,28 +3,48 @@ import {LearningForm} from "./components/LearningForm";
 import {ResultsTables} from "./components/ResultsTables";
 import {Warnings} from "./components/Warnings";
 import {Spinner} from "./components/Spinner";
-import type {LearningPathsRequest, LearningPathsResponse} from "./types";
-import {fetchLearningPaths} from "./api/learningPaths";
+import type {LearningPathsRequest, LearningPathsResponse, Program} from "./types";
+import {streamLearningPaths} from "./api/learningPaths";
 
 type Status = "idle" | "loading" | "done" | "error";
 
+// what the pipeline is doing once a node has finished
+const NEXT_STEP: Record<string, string> = {
+    scout: "Extracting programs",
+    extract: "Organizing learning paths",
+    pipeline: "Organizing learning paths",
+};
+
 export default function App() {
     const [status, setStatus] = useState<Status>("idle");
     const [data, setData] = useState<LearningPathsResponse | null>(null);
     const [error, setError] = useState<string | null>(null);
+    const [step, setStep] = useState("Searching for learning programs");
+    const [partial, setPartial] = useState<Program[]>([]);
 
     const abortRef = useRef<AbortController | null>(null);
 
     async function handleSubmit(payload: LearningPathsRequest) {
         setStatus("loading");
         setError(null);
+        setData(null);
+        setStep("Searching for learning programs");
+        setPartial([]);
 
         abortRef.current?.abort();
         const controller = new AbortController();
         abortRef.current = controller;
 
         try {
-            const resp = await fetchLearningPaths(payload, controller.signal);
+            const resp = await streamLearningPaths(
+                payload,
+                {
+                    onNode: (progress) =>
+                        setStep((prev) => NEXT_STEP[progress.node] ?? prev),
+                    onProgram: (program) => setPartial((prev) => [...prev, program]),
+                },
+                controller.signal
+            );
             setData(resp);
             setStatus("done");
         } catch (e: any) {
@@ -64,10 +84,25 @@ export default function App() {
                         {status === "loading" && (
                             <div style={{display: "flex", alignItems: "center", gap: 8}}>
                                 <Spinner size={16}/>
-                                <div>Searching, extracting, and organizing learning paths…</div>
+                                <div>
+                                    {step}… {partial.length > 0 && `${partial.length} found so far`}
+                                </div>
                             </div>
                         )}
 
+                        {status === "loading" && partial.length > 0 && (
+                            <ul style={{margin: "10px 0 0", paddingLeft: 18}}>
+                                {partial.map((p, i) => (
+                                    <li key={i}>
+                                        <a href={p.source_link} target="_blank" rel="noreferrer">
+                                            {p.program_name}
+                                        </a>{" "}
+                                        <span style={{color: "#777"}}>— {p.provider}</span>
+                                    </li>
+                                ))}
+                            </ul>
+                        )}
+
 
                         {status === "error" && (
                             <div style={{color: "crimson"}}>
@@ -85,6 +120,7 @@ export default function App() {
 
                         <div style={{marginTop: 12, color: "#777", fontSize: 12}}>
                             request_id: {data.request_id}
+                            {data.cached && " (recent result for the same search)"}
                         </div>
                     </div>
                 )}
@@ -1,4 +1,8 @@
-import type {LearningPathsRequest, LearningPathsResponse} from "../types";
+import type {
+    LearningPathsRequest,
+    LearningPathsResponse,
+    LearningPathsStreamHandlers,
+} from "../types";
 
 const BASE_URL = import.meta.env.VITE_API_BASE_URL as string;
 
@@ -20,3 +24,55 @@ export async function fetchLearningPaths(
 
     return (await res.json()) as LearningPathsResponse;
 }
+
+// POST /api/learning-paths/stream answers with Server-Sent Events; EventSource
+// only does GET, so the stream is read from fetch. Resolves with the final
+// "results" event, progress goes to the handlers on the way.
+export async function streamLearningPaths(
+    payload: LearningPathsRequest,
+    handlers: LearningPathsStreamHandlers,
+    signal?: AbortSignal
+): Promise<LearningPathsResponse> {
+    const res = await fetch(`${BASE_URL}/api/learning-paths/stream`, {
+        method: "POST",
+        headers: {"Content-Type": "application/json", Accept: "text/event-stream"},
+        body: JSON.stringify(payload),
+        signal,
+    });
+
+    if (!res.ok || !res.body) {
+        const text = await res.text().catch(() => "");
+        throw new Error(`Backend error ${res.status}: ${text || res.statusText}`);
+    }
+
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) break;
+        buffer += value;
+
+        let end: number;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+            const body = JSON.parse(data);
+
+            if (event === "started") handlers.onStarted?.(body.request_id);
+            else if (event === "node") handlers.onNode?.(body);
+            else if (event === "program") handlers.onProgram?.(body);
+            else if (event === "results") return body as LearningPathsResponse;
+            else if (event === "error") throw new Error(`Backend error: ${body.detail}`);
+        }
+    }
+
+    throw new Error("Backend error: stream ended without results");
+}
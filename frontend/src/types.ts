@@ -34,4 +34,17 @@ export type LearningPathsResponse = {
     request_id: string;
     results: Results
     warnings: string[];
+    cached?: boolean;
+};
+
+export type NodeProgress = {
+    node: string;
+    warnings: string[];
+    counts: Record<string, number>;
+};
+
+export type LearningPathsStreamHandlers = {
+    onStarted?: (requestId: string) => void;
+    onNode?: (progress: NodeProgress) => void;
+    onProgram?: (program: Program) => void;
 };